@@ -0,0 +1,119 @@
+"""Distributions and trends of numeric test results for one hospital and test type.
+
+The database parses each result into test_results.result_value and result_unit (see
+app.models.test_result). A slice is fetched as one row per unit carrying its values
+and days packed as big-endian binary, so NumPy reads them without creating a Python
+object per result. Every statistic is then a vectorized pass over those arrays.
+Results in different units are never mixed, and results that are not numeric are
+only counted.
+"""
+from sqlalchemy import Date, Integer, LargeBinary, cast, distinct, literal, type_coerce
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import TestResult
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95)
+EPOCH = date(1970, 1, 1)
+# Wire formats of float8send and int4send
+VALUE_DTYPE = np.dtype(">f8")
+DAY_DTYPE = np.dtype(">i4")
+
+
+def _packed(column):
+    return func.string_agg(column, literal(b"", LargeBinary), type_=LargeBinary)
+
+
+def slice_query(hospital_id, test_type_id, patient_id=None, since: Optional[date] = None,
+                until: Optional[date] = None):
+    """One row per unit: packed values and days in matching order, plus counts."""
+    numeric = TestResult.result_value.isnot(None)
+    # Both are aggregated from the same rows in the same pass, so they line up
+    day = type_coerce(cast(TestResult.test_date, Date) - literal(EPOCH, Date), Integer)
+    query = select(
+        TestResult.result_unit.label("unit"),
+        _packed(func.float8send(TestResult.result_value)).filter(numeric).label("values"),
+        _packed(func.int4send(day)).filter(numeric).label("days"),
+        func.count(distinct(TestResult.patient_id)).filter(numeric).label("patients"),
+        func.count().filter(TestResult.result_value.is_(None)).label("non_numeric"),
+    ).filter(
+        TestResult.created_by_hospital_id == hospital_id,
+        TestResult.test_type_id == test_type_id,
+    )
+    if patient_id is not None:
+        query = query.filter(TestResult.patient_id == patient_id)
+    # test_date is a timestamp without time zone; until is exclusive
+    if since is not None:
+        query = query.filter(TestResult.test_date >= datetime.combine(since, time.min))
+    if until is not None:
+        query = query.filter(TestResult.test_date < datetime.combine(until, time.min))
+    return query.group_by(TestResult.result_unit)
+
+
+def daily_trend(values: np.ndarray, days: np.ndarray, window_days: int) -> dict:
+    """Per-day count and mean, and the mean over the trailing window_days calendar days."""
+    # Buckets over the whole calendar span, so no sort is needed; days without results drop out at the end
+    first_day = int(days.min())
+    counts = np.bincount(days - first_day)
+    sums = np.bincount(days - first_day, weights=values)
+    total = np.cumsum(sums)
+    seen = np.cumsum(counts)
+    total[window_days:] = total[window_days:] - total[:-window_days]
+    seen[window_days:] = seen[window_days:] - seen[:-window_days]
+    present = np.flatnonzero(counts)
+    return {
+        "days": present + first_day,
+        "counts": counts[present],
+        "means": sums[present] / counts[present],
+        "rolling_means": total[present] / seen[present],
+    }
+
+
+def unpack(values: bytes, days: bytes):
+    """The packed columns of a slice_query row as native arrays."""
+    return (
+        np.frombuffer(values, dtype=VALUE_DTYPE).astype(np.float64),
+        np.frombuffer(days, dtype=DAY_DTYPE).astype(np.int64),
+    )
+
+
+def summarize(values: np.ndarray, days: np.ndarray, low: Optional[float] = None,
+              high: Optional[float] = None, window_days: int = 7) -> dict:
+    percentiles = np.percentile(values, PERCENTILES)
+    trend = daily_trend(values, days, window_days)
+    return {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)},
+        "below_range": int(np.count_nonzero(values < low)) if low is not None else None,
+        "above_range": int(np.count_nonzero(values > high)) if high is not None else None,
+        "daily": [
+            {"day": EPOCH + timedelta(days=day), "count": count, "mean": mean, "rolling_mean": rolling}
+            for day, count, mean, rolling in zip(
+                trend["days"].tolist(), trend["counts"].tolist(),
+                trend["means"].tolist(), trend["rolling_means"].tolist(),
+            )
+        ],
+    }
+
+
+def summarize_slice(rows, low: Optional[float] = None, high: Optional[float] = None,
+                    window_days: int = 7) -> dict:
+    """Fold the rows of slice_query into per-unit summaries; CPU bound, run it off the event loop."""
+    units = []
+    non_numeric = 0
+    for row in rows:
+        non_numeric += row["non_numeric"]
+        if row["values"]:
+            units.append({
+                "unit": row["unit"],
+                "patients": row["patients"],
+                **summarize(*unpack(row["values"], row["days"]), low, high, window_days),
+            })
+    units.sort(key=lambda u: u["count"], reverse=True)
+    return {"non_numeric": non_numeric, "units": units}
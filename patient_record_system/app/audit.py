@@ -0,0 +1,168 @@
+"""Batched, asynchronous audit log of reads of patient records.
+
+Handlers call AuditLog.record, which only appends events to an in-memory buffer; a
+background task writes them to audit_events with one multi-row INSERT per batch. A
+batch is written once batch_size events are waiting or flush_interval_seconds after
+the first one arrived, whichever comes first.
+
+Events are never dropped. A failed write keeps its batch and is retried, and while
+the database is unavailable the buffer fills up to max_pending. After that, record()
+waits up to enqueue_timeout_seconds for room and then raises AuditLogSaturated, so a
+read that cannot be audited is refused (503) rather than served. stop() writes
+everything still buffered before the engine is disposed.
+"""
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.models import AuditEvent
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogSaturated(Exception):
+    pass
+
+
+class AuditLog:
+    def __init__(self, engine, max_pending: int = 10000, batch_size: int = 500,
+                 flush_interval_seconds: float = 1.0, enqueue_timeout_seconds: float = 1.0,
+                 retry_seconds: float = 1.0):
+        self.session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.max_pending = max_pending
+        # A full buffer must hold at least one full batch, or a writer waiting for room would wait out the interval
+        self.batch_size = min(batch_size, max_pending)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.enqueue_timeout_seconds = enqueue_timeout_seconds
+        self.retry_seconds = retry_seconds
+        self._pending = []
+        self._task = None
+        # Created by start() so they belong to the loop that runs the flusher
+        self._wakeup = None
+        self._room = None
+        self._flush_lock = None
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.max_flush_seconds = 0.0
+
+    async def record(self, actor_type: str, actor_id, action: str, patient_ids: Iterable = (None,),
+                     record_count: Optional[int] = None) -> None:
+        """Queue one event per patient read; patient_ids of (None,) records an access to no single patient."""
+        occurred_at = datetime.now(timezone.utc)
+        events = [
+            {
+                "occurred_at": occurred_at,
+                "actor_type": actor_type,
+                "actor_id": actor_id,
+                "action": action,
+                "patient_id": patient_id,
+                "record_count": record_count,
+            }
+            for patient_id in patient_ids
+        ]
+        if len(self._pending) + len(events) > self.max_pending:
+            await self._wait_for_room(len(events))
+        was_empty = not self._pending
+        self._pending.extend(events)
+        self.recorded += len(events)
+        if self._wakeup is not None and (was_empty or len(self._pending) >= self.batch_size):
+            self._wakeup.set()
+
+    async def _wait_for_room(self, count: int) -> None:
+        deadline = time.monotonic() + self.enqueue_timeout_seconds
+        while len(self._pending) + count > self.max_pending:
+            remaining = deadline - time.monotonic()
+            if self._task is None or remaining <= 0:
+                self.rejected += count
+                raise AuditLogSaturated()
+            self._room.clear()
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._room.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _write(self, batch: list) -> None:
+        async with self.session_factory() as db:
+            await db.execute(insert(AuditEvent), batch)
+            await db.commit()
+
+    async def flush(self, full_batches_only: bool = False) -> None:
+        """Write buffered events a batch at a time; a failed batch stays buffered."""
+        async with self._flush_lock:
+            while len(self._pending) >= (self.batch_size if full_batches_only else 1):
+                batch = self._pending[:self.batch_size]
+                start = time.perf_counter()
+                await self._write(batch)
+                self.max_flush_seconds = max(self.max_flush_seconds, time.perf_counter() - start)
+                # Only flush removes events, and always from the front
+                del self._pending[:len(batch)]
+                self.written += len(batch)
+                self.batches += 1
+                self._room.set()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            interval_elapsed = False
+            if len(self._pending) < self.batch_size:
+                # Give the batch until the interval is up to fill
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    interval_elapsed = True
+            try:
+                # Woken by a full batch: the remainder keeps waiting for its own interval
+                await self.flush(full_batches_only=not interval_elapsed)
+            except Exception:
+                self.failures += 1
+                logger.exception("Writing %d audit events failed; retrying", len(self._pending))
+                await asyncio.sleep(self.retry_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._room = asyncio.Event()
+            self._room.set()
+            self._flush_lock = asyncio.Lock()
+            if self._pending:
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Could not write %d audit events on shutdown", len(self._pending))
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
@@ -0,0 +1,81 @@
+from fastapi import HTTPException, status
+from itertools import islice
+import csv
+import io
+import json
+
+BULK_BATCH_SIZE = 1000
+TEST_RESULT_BATCH_SIZE = 5000
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+# CSV cells holding nested objects are JSON encoded
+CSV_JSON_COLUMNS = ("emergency_contact",)
+
+
+class RowError(Exception):
+    pass
+
+
+def _ndjson_rows(text: str):
+    row_number = 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+            yield row_number, row
+        except ValueError as e:
+            yield row_number, RowError(f"Invalid JSON: {e}")
+
+
+def _csv_rows(text: str, json_columns):
+    reader = csv.DictReader(io.StringIO(text))
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            raw = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # The reader cannot resynchronize, so nothing after a malformed record is read
+            yield row_number, RowError(f"Invalid CSV: {e}; later rows were not read")
+            return
+        row = {key: value for key, value in raw.items() if key and value not in (None, "")}
+        try:
+            for column in json_columns:
+                if column in row:
+                    row[column] = json.loads(row[column])
+            yield row_number, row
+        except ValueError as e:
+            yield row_number, RowError(f"Invalid JSON in CSV cell: {e}")
+
+
+def parse_bulk_rows(body: bytes, content_type: str, json_columns=CSV_JSON_COLUMNS):
+    """Yield (row_number, row dict or RowError) from an NDJSON or CSV request body."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Bulk upload must be NDJSON (application/x-ndjson) or CSV (text/csv)"
+        )
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be UTF-8")
+    if media_type in NDJSON_CONTENT_TYPES:
+        return _ndjson_rows(text)
+    return _csv_rows(text, json_columns)
+
+
+def validation_error_message(error) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+
+def chunked(iterable, size: int = BULK_BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
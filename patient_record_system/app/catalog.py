@@ -0,0 +1,113 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import TestType, CatalogVersion
+from typing import NamedTuple, Optional
+from uuid import UUID
+import asyncio
+import time
+
+TEST_TYPES_CATALOG = "test_types"
+
+
+class TestTypeEntry(NamedTuple):
+    test_type_id: UUID
+    name: str
+    description: Optional[str]
+
+
+def catalog_version_bump(name: str = TEST_TYPES_CATALOG):
+    """The upsert behind bump_catalog_version, for a write that runs it as a CTE of its own statement."""
+    stmt = pg_insert(CatalogVersion).values(name=name, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1, "updated_at": func.now()},
+    )
+
+
+async def bump_catalog_version(db: AsyncSession, name: str = TEST_TYPES_CATALOG) -> None:
+    """Signal every worker to reload the catalog; runs in the caller's transaction."""
+    await db.execute(catalog_version_bump(name))
+
+
+class TestTypeCatalog:
+    """Process-local copy of the test_types table.
+
+    The shared catalog_versions row is checked at most once per ttl_seconds; when another
+    worker has bumped it the whole table is reloaded. Unknown ids trigger at most one
+    forced reload per min_reload_interval so a bad client cannot turn misses into queries.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, min_reload_interval: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.min_reload_interval = min_reload_interval
+        self._entries = {}
+        self.version = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    async def _current_version(self, db: AsyncSession) -> int:
+        result = await db.execute(
+            select(CatalogVersion.version).filter(CatalogVersion.name == TEST_TYPES_CATALOG)
+        )
+        return result.scalar() or 0
+
+    async def load(self, db: AsyncSession) -> None:
+        async with self._lock:
+            await self._load(db)
+
+    async def _load(self, db: AsyncSession) -> None:
+        version = await self._current_version(db)
+        result = await db.execute(select(TestType.test_type_id, TestType.name, TestType.description))
+        self._entries = {row.test_type_id: TestTypeEntry(*row) for row in result}
+        self.version = version
+        self._checked_at = self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        if time.monotonic() - self._checked_at < self.ttl_seconds:
+            return
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.ttl_seconds:
+                return
+            if self.version is None or await self._current_version(db) != self.version:
+                await self._load(db)
+            else:
+                self._checked_at = time.monotonic()
+
+    async def get(self, db: AsyncSession, test_type_id) -> Optional[TestTypeEntry]:
+        try:
+            test_type_id = test_type_id if isinstance(test_type_id, UUID) else UUID(str(test_type_id))
+        except ValueError:
+            return None
+        await self.refresh_if_stale(db)
+        entry = self._entries.get(test_type_id)
+        if entry is None and time.monotonic() - self._loaded_at >= self.min_reload_interval:
+            async with self._lock:
+                # Misses that queued behind a reload use its result instead of starting another
+                if time.monotonic() - self._loaded_at >= self.min_reload_interval:
+                    await self._load(db)
+            entry = self._entries.get(test_type_id)
+        return entry
+
+    def name(self, test_type_id) -> Optional[str]:
+        entry = self._entries.get(test_type_id)
+        return entry.name if entry else None
+
+    def entries(self):
+        return sorted(self._entries.values(), key=lambda e: e.name)
+
+    def invalidate(self) -> None:
+        self.version = None
+        self._checked_at = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "version": self.version,
+            "ttl_seconds": self.ttl_seconds,
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,50 @@
+"""Conditional GET.
+
+A handler derives a strong ETag from a cheap fingerprint of the rows behind its
+response, such as a row count, max(created_at), max(updated_at) and the catalog
+versions it names things from, rather than from the rendered body. A request whose
+If-None-Match lists that tag gets an empty 304, so a repeat view costs the fingerprint
+query and nothing else. A 304 carries no record and is not audited.
+
+Each route has a Cache-Control policy. Patient data is private and always
+revalidated, so a shared cache never stores it and a browser never shows a stale copy.
+"""
+from fastapi import Request, Response
+import hashlib
+
+# Part of every tag; bump it when a response's shape changes so cached bodies are not reused
+ETAG_VERSION = 1
+
+CACHE_POLICIES = {
+    "patient_details": "private, no-cache",
+    "patient_test_results": "private, no-cache",
+    "hospital_patients": "private, no-cache",
+    "test_types": "public, no-cache",
+}
+
+
+def make_etag(route: str, *fingerprint) -> str:
+    digest = hashlib.blake2b(repr((ETAG_VERSION, route, fingerprint)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def cache_headers(route: str, *fingerprint) -> dict:
+    headers = {"ETag": make_etag(route, *fingerprint), "Cache-Control": CACHE_POLICIES[route]}
+    if CACHE_POLICIES[route].startswith("private"):
+        # Bodies differ per principal
+        headers["Vary"] = "Authorization"
+    return headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
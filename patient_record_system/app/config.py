@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+import os
+
+# Load environment variables
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_rates(name: str, default: tuple) -> tuple:
+    # "sqlalchemy.engine=0.01,httpx=0.1" -> (("sqlalchemy.engine", 0.01), ("httpx", 0.1))
+    value = os.getenv(name)
+    if value is None:
+        return default
+    rates = []
+    for item in value.split(","):
+        if item.strip():
+            logger_name, _, rate = item.partition("=")
+            rates.append((logger_name.strip(), float(rate)))
+    return tuple(rates)
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str
+    secret_key: str
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+
+    # Database engine and pool
+    sql_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 500
+
+    # Read replicas
+    database_replica_urls: tuple = ()
+    read_routing: str = "round_robin"
+    # Kept by the client in a cookie, so it holds across workers
+    read_your_writes_seconds: float = 5.0
+    replica_retry_seconds: float = 30.0
+
+    # Caches and executors
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_check_seconds: float = 5.0
+    principal_cache_max_entries: int = 10000
+    hashing_executor: str = "thread"
+    hashing_workers: int = os.cpu_count() or 1
+    hashing_queue_depth: int = 64
+    test_type_catalog_ttl_seconds: float = 30.0
+    consent_index_ttl_seconds: float = 5.0
+
+    # Rendered list responses; "memory" is per worker, "redis" is shared, "off" disables it
+    response_cache_backend: str = "memory"
+    response_cache_ttl_seconds: float = 30.0
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_max_entry_bytes: int = 1024 * 1024
+    response_cache_redis_url: str = ""
+
+    # Background repair of incrementally maintained health summaries; 0 disables it
+    summary_rebuild_interval_seconds: float = 6 * 3600
+
+    # Validate list responses against their Pydantic models before encoding
+    response_validation: bool = False
+
+    # Per-route request and database metrics served at /metrics
+    metrics_enabled: bool = True
+
+    # Logging; records below WARNING from the listed loggers are sampled at the given rates
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_sampling: tuple = ()
+    log_queue_size: int = 10000
+
+    # Reads of patient records are audited in batches; record() waits this long for room when the buffer is full
+    audit_max_pending: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval_seconds: float = 1.0
+    audit_enqueue_timeout_seconds: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise ValueError("DATABASE_URL not found in .env file")
+        defaults = cls(database_url=database_url, secret_key="")
+        return cls(
+            database_url=database_url,
+            secret_key=os.getenv("SECRET_KEY", "your-secret-key"),
+            access_token_expire_minutes=_env_int("ACCESS_TOKEN_EXPIRE_MINUTES", defaults.access_token_expire_minutes),
+            sql_echo=_env_bool("SQL_ECHO", defaults.sql_echo),
+            db_pool_size=_env_int("DB_POOL_SIZE", defaults.db_pool_size),
+            db_max_overflow=_env_int("DB_MAX_OVERFLOW", defaults.db_max_overflow),
+            db_pool_timeout=_env_float("DB_POOL_TIMEOUT", defaults.db_pool_timeout),
+            db_pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.db_pool_pre_ping),
+            db_pool_recycle=_env_int("DB_POOL_RECYCLE", defaults.db_pool_recycle),
+            db_statement_cache_size=_env_int("DB_STATEMENT_CACHE_SIZE", defaults.db_statement_cache_size),
+            database_replica_urls=tuple(
+                url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+            ),
+            read_routing=os.getenv("READ_ROUTING", defaults.read_routing),
+            read_your_writes_seconds=_env_float("READ_YOUR_WRITES_SECONDS", defaults.read_your_writes_seconds),
+            replica_retry_seconds=_env_float("REPLICA_RETRY_SECONDS", defaults.replica_retry_seconds),
+            principal_cache_ttl_seconds=_env_float("PRINCIPAL_CACHE_TTL_SECONDS", defaults.principal_cache_ttl_seconds),
+            principal_cache_check_seconds=_env_float(
+                "PRINCIPAL_CACHE_CHECK_SECONDS", defaults.principal_cache_check_seconds
+            ),
+            principal_cache_max_entries=_env_int("PRINCIPAL_CACHE_MAX_ENTRIES", defaults.principal_cache_max_entries),
+            hashing_executor=os.getenv("HASHING_EXECUTOR", defaults.hashing_executor),
+            hashing_workers=_env_int("HASHING_WORKERS", defaults.hashing_workers),
+            hashing_queue_depth=_env_int("HASHING_QUEUE_DEPTH", defaults.hashing_queue_depth),
+            test_type_catalog_ttl_seconds=_env_float(
+                "TEST_TYPE_CATALOG_TTL_SECONDS", defaults.test_type_catalog_ttl_seconds
+            ),
+            consent_index_ttl_seconds=_env_float("CONSENT_INDEX_TTL_SECONDS", defaults.consent_index_ttl_seconds),
+            response_cache_backend=os.getenv("RESPONSE_CACHE_BACKEND", defaults.response_cache_backend),
+            response_cache_ttl_seconds=_env_float("RESPONSE_CACHE_TTL_SECONDS", defaults.response_cache_ttl_seconds),
+            response_cache_max_bytes=_env_int("RESPONSE_CACHE_MAX_BYTES", defaults.response_cache_max_bytes),
+            response_cache_max_entry_bytes=_env_int(
+                "RESPONSE_CACHE_MAX_ENTRY_BYTES", defaults.response_cache_max_entry_bytes
+            ),
+            response_cache_redis_url=os.getenv("RESPONSE_CACHE_REDIS_URL", defaults.response_cache_redis_url),
+            summary_rebuild_interval_seconds=_env_float(
+                "SUMMARY_REBUILD_INTERVAL_SECONDS", defaults.summary_rebuild_interval_seconds
+            ),
+            response_validation=_env_bool("RESPONSE_VALIDATION", defaults.response_validation),
+            metrics_enabled=_env_bool("METRICS_ENABLED", defaults.metrics_enabled),
+            log_level=os.getenv("LOG_LEVEL", defaults.log_level).upper(),
+            log_format=os.getenv("LOG_FORMAT", defaults.log_format),
+            log_sampling=_env_rates("LOG_SAMPLING", defaults.log_sampling),
+            log_queue_size=_env_int("LOG_QUEUE_SIZE", defaults.log_queue_size),
+            audit_max_pending=_env_int("AUDIT_MAX_PENDING", defaults.audit_max_pending),
+            audit_batch_size=_env_int("AUDIT_BATCH_SIZE", defaults.audit_batch_size),
+            audit_flush_interval_seconds=_env_float(
+                "AUDIT_FLUSH_INTERVAL_SECONDS", defaults.audit_flush_interval_seconds
+            ),
+            audit_enqueue_timeout_seconds=_env_float(
+                "AUDIT_ENQUEUE_TIMEOUT_SECONDS", defaults.audit_enqueue_timeout_seconds
+            ),
+        )
+
+
+settings = Settings.from_env()
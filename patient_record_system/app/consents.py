@@ -0,0 +1,197 @@
+from sqlalchemy import or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import Change, Consent, CatalogVersion
+from app.sync import START, completed_before
+from datetime import datetime
+from typing import Optional
+import asyncio
+import math
+import time
+
+CONSENTS_CATALOG = "consents"
+
+# Consent access types that let another hospital read a patient's record
+READ_ACCESS_TYPES = ("view", "edit")
+
+
+CONSENT_COLUMNS = (
+    Consent.consent_id, Consent.hospital_id, Consent.patient_id,
+    Consent.granted_at, Consent.expires_at, Consent.revoked_at,
+)
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    return value.timestamp() if value is not None else math.inf
+
+
+def _in_force():
+    return (
+        Consent.hospital_id.is_not(None),
+        Consent.access_type.in_(READ_ACCESS_TYPES),
+        or_(Consent.revoked_at.is_(None), Consent.revoked_at > func.now()),
+        or_(Consent.expires_at.is_(None), Consent.expires_at > func.now()),
+    )
+
+
+class ConsentIndex:
+    """Process-local index of consents that have not ended, keyed by (hospital_id, patient_id).
+
+    Each key maps to the (start, end) epoch intervals of its consents, where end is the
+    earlier of expires_at and revoked_at, so an access check is a dict lookup and a couple
+    of float comparisons. At most once per ttl_seconds the index reads the consent rows of
+    the change log (migration 0009) past its position and re-reads only those consents, so
+    a grant or revoke costs each worker one row rather than a reload. As in app.sync, only
+    changes of completed transactions are read, so a late commit is never skipped.
+
+    Everything is reloaded when the consents catalog_versions row is bumped (by loads that
+    bypass the API), when more than max_changes are waiting, and every
+    full_reload_seconds to drop consents that have since ended. The worker that made a
+    change passes its id to invalidate() and sees it on its next check.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, full_reload_seconds: float = 3600.0, max_changes: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.max_changes = max_changes
+        self._intervals = {}
+        # key -> {consent_id: interval} and consent_id -> key, to rebuild a key's intervals
+        self._by_key = {}
+        self._keys = {}
+        self._pending = set()
+        self.version = None
+        self.position = START
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+        self.updates = 0
+        self.checks = 0
+        self.allowed = 0
+
+    async def _current_version(self, db: AsyncSession) -> int:
+        result = await db.execute(
+            select(CatalogVersion.version).filter(CatalogVersion.name == CONSENTS_CATALOG)
+        )
+        return result.scalar() or 0
+
+    async def load(self, db: AsyncSession) -> None:
+        async with self._lock:
+            self._checked_at = time.monotonic()
+            await self._load(db)
+
+    async def _load(self, db: AsyncSession) -> None:
+        version = await self._current_version(db)
+        # Read before the consents, so every change up to it is already in what they return
+        result = await db.execute(
+            select(Change.txid, Change.change_id)
+            .filter(Change.entity == "consent", Change.txid < completed_before())
+            .order_by(Change.txid.desc(), Change.change_id.desc())
+            .limit(1)
+        )
+        position = tuple(result.first() or START)
+        result = await db.execute(select(*CONSENT_COLUMNS).filter(*_in_force()))
+        self._intervals, self._by_key, self._keys = {}, {}, {}
+        self._merge((), result)
+        self.version = version
+        self.position = position
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def _apply_changes(self, db: AsyncSession) -> bool:
+        """Re-read the consents changed since position; False if there are too many to do one by one."""
+        pending, self._pending = self._pending, set()
+        result = await db.execute(
+            select(Change.txid, Change.change_id, Change.entity_id)
+            .filter(
+                Change.entity == "consent",
+                tuple_(Change.txid, Change.change_id) > tuple_(*self.position),
+                Change.txid < completed_before(),
+            )
+            .order_by(Change.txid, Change.change_id)
+            .limit(self.max_changes + 1)
+        )
+        changes = result.all()
+        if len(changes) > self.max_changes:
+            return False
+        consent_ids = pending | {change.entity_id for change in changes}
+        if consent_ids:
+            result = await db.execute(
+                select(*CONSENT_COLUMNS).filter(Consent.consent_id.in_(consent_ids), *_in_force())
+            )
+            self._merge(consent_ids, result)
+            self.updates += 1
+        if changes:
+            self.position = (changes[-1].txid, changes[-1].change_id)
+        return True
+
+    def _merge(self, consent_ids, rows) -> None:
+        """Drop consent_ids, then add rows (the consents still in force)."""
+        touched = set()
+        for consent_id in consent_ids:
+            key = self._keys.pop(consent_id, None)
+            if key is not None:
+                del self._by_key[key][consent_id]
+                touched.add(key)
+        for consent_id, hospital_id, patient_id, granted_at, expires_at, revoked_at in rows:
+            key = (hospital_id, patient_id)
+            start = granted_at.timestamp() if granted_at is not None else -math.inf
+            self._by_key.setdefault(key, {})[consent_id] = (start, min(_epoch(expires_at), _epoch(revoked_at)))
+            self._keys[consent_id] = key
+            touched.add(key)
+        for key in touched:
+            consents = self._by_key.get(key)
+            if consents:
+                self._intervals[key] = tuple(consents.values())
+            else:
+                self._by_key.pop(key, None)
+                self._intervals.pop(key, None)
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        if time.monotonic() - self._checked_at < self.ttl_seconds:
+            return
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.ttl_seconds:
+                return
+            # Set first, so an invalidate() that arrives while this runs forces another check
+            self._checked_at = time.monotonic()
+            if (
+                self.version is None
+                or time.monotonic() - self._loaded_at >= self.full_reload_seconds
+                or await self._current_version(db) != self.version
+                or not await self._apply_changes(db)
+            ):
+                await self._load(db)
+
+    def allows(self, hospital_id, patient_id, at: Optional[float] = None) -> bool:
+        """Whether hospital_id holds a consent to read patient_id that is in force at `at` (epoch)."""
+        self.checks += 1
+        intervals = self._intervals.get((hospital_id, patient_id))
+        if not intervals:
+            return False
+        now = time.time() if at is None else at
+        if any(start <= now < end for start, end in intervals):
+            self.allowed += 1
+            return True
+        return False
+
+    async def check(self, db: AsyncSession, hospital_id, patient_id) -> bool:
+        await self.refresh_if_stale(db)
+        return self.allows(hospital_id, patient_id)
+
+    def invalidate(self, *consent_ids) -> None:
+        self._pending.update(consent_ids)
+        self._checked_at = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "pairs": len(self._intervals),
+            "version": self.version,
+            "position": list(self.position),
+            "ttl_seconds": self.ttl_seconds,
+            "reloads": self.reloads,
+            "updates": self.updates,
+            "checks": self.checks,
+            "allowed": self.allowed,
+        }
@@ -1,14 +1,275 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.engine import make_url
+from sqlalchemy import exc
+from bisect import bisect_left
+from itertools import count
+from threading import Lock
+from typing import Optional
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from app.config import settings
+from app.metrics import instrument_engine, record_pool_wait
+import asyncio
+import logging
+import math
+import time
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_async_engine(DATABASE_URL, echo=True)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolWaitStats:
+    """Time spent waiting for a pooled connection; a growing tail means the pool is the bottleneck."""
+
+    def __init__(self, buckets=POOL_WAIT_BUCKETS):
+        self.buckets = buckets
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.checkouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.checkouts += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            cumulative, histogram = 0, {}
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                cumulative += count
+                histogram[f"le_{bound}"] = cumulative
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": self.total_seconds,
+                "mean_wait_seconds": self.total_seconds / self.checkouts if self.checkouts else 0.0,
+                "max_wait_seconds": self.max_seconds,
+                "wait_histogram": histogram,
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_wait_stats.timed_out()
+            raise
+        waited = time.perf_counter() - start
+        pool_wait_stats.observe(waited)
+        record_pool_wait(waited)
+        return connection
+
+
+def create_engine(url: str = None, **overrides) -> AsyncEngine:
+    """Build an async engine from settings; every engine in the project goes through here."""
+    url = make_url(url or settings.database_url)
+    if settings.sql_echo:
+        # Not echo=True: that attaches its own stderr handler, written to on the event loop thread
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    options = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    if "poolclass" not in overrides:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    if settings.metrics_enabled:
+        instrument_engine(engine)
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checked_in=pool.checkedin(),
+        )
+    return status
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.in_flight = 0
+        self.failed_until = 0.0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.failed_until <= time.monotonic()
+
+
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+
+
+class ReadRouter:
+    """Picks a replica for read-only sessions.
+
+    Replicas that fail to connect are skipped for retry_seconds. A successful write sets a
+    cookie holding the wall-clock time read_your_writes_seconds ahead; while it has not
+    passed, that client's reads go to the primary so it never sees a replica that is
+    behind its own write. The marker travels with the client, so it holds whichever
+    worker serves the next read. Clients that drop cookies read from replicas right away.
+    """
+
+    def __init__(self, replicas, strategy: str = "round_robin", retry_seconds: float = 30.0,
+                 read_your_writes_seconds: float = 5.0):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown read routing strategy: {strategy}")
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.retry_seconds = retry_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._counter = count()
+        self.primary_reads = 0
+        self.sticky_reads = 0
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_busy":
+            return min(healthy, key=lambda r: r.in_flight)
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_failed(self, replica: Replica) -> None:
+        replica.failures += 1
+        replica.failed_until = time.monotonic() + self.retry_seconds
+        logger.warning("Replica %s unavailable, routing reads to the primary", replica.name)
+
+    def write_marker(self) -> Optional[str]:
+        """Cookie value for a client that has just written; None when stickiness is off."""
+        if not self.replicas or self.read_your_writes_seconds <= 0:
+            return None
+        return f"{time.time() + self.read_your_writes_seconds:.3f}"
+
+    def is_sticky(self, marker: Optional[str]) -> bool:
+        try:
+            expires_at = float(marker) if marker else 0.0
+        except ValueError:
+            return False
+        now = time.time()
+        # Workers may disagree on the time by a little; a marker much further out was not set by write_marker
+        return now < expires_at <= now + self.read_your_writes_seconds + 1
+
+    def stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "replicas": [
+                {"name": r.name, "healthy": r.healthy, "in_flight": r.in_flight, "failures": r.failures}
+                for r in self.replicas
+            ],
+        }
+
+
+class ReadYourWritesMiddleware:
+    """Sets the read-your-writes cookie on every successful non-GET response."""
+
+    def __init__(self, app, router: ReadRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS") or not self.router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                marker = self.router.write_marker()
+                if marker is not None:
+                    MutableHeaders(scope=message).append(
+                        "set-cookie",
+                        f"{READ_YOUR_WRITES_COOKIE}={marker}; Max-Age={math.ceil(self.router.read_your_writes_seconds)}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def session_factory_for(session: AsyncSession):
+    """A factory bound to the same engine as session, for work that outlives the request."""
+    return sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+engine = create_engine()
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_router = ReadRouter(
+    [Replica(f"replica-{i}", create_engine(url)) for i, url in enumerate(settings.database_replica_urls)],
+    strategy=settings.read_routing,
+    retry_seconds=settings.replica_retry_seconds,
+    read_your_writes_seconds=settings.read_your_writes_seconds,
+)
+
+def reads_primary(session: AsyncSession) -> bool:
+    """False for a session get_read_db routed to a replica, which may lag the primary."""
+    return "replica" not in session.info
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db(request: Request):
+    replica = None
+    if read_router.is_sticky(request.cookies.get(READ_YOUR_WRITES_COOKIE)):
+        read_router.sticky_reads += 1
+    else:
+        replica = read_router.choose()
+    if replica is not None:
+        session = replica.session_factory()
+        try:
+            # Check out eagerly so an unreachable replica falls back before the handler runs
+            await session.connection()
+        except (OSError, asyncio.TimeoutError, exc.DBAPIError):
+            await session.close()
+            read_router.mark_failed(replica)
+            replica = None
+    if replica is None:
+        read_router.primary_reads += 1
+        session = AsyncSessionLocal()
+    else:
+        replica.in_flight += 1
+        session.info["replica"] = replica.name
+    try:
+        async with session:
+            yield session
+    finally:
+        if replica is not None:
+            replica.in_flight -= 1
@@ -0,0 +1,198 @@
+"""Logging that keeps formatting and I/O off the event loop.
+
+The root logger gets a single QueueHandler. On the calling thread a record is only
+sampled, has its message merged and is put on a bounded queue; a QueueListener thread
+redacts, renders (JSON lines by default) and writes it. Records at WARNING and above
+are never sampled out. When the queue is full the record is dropped and counted
+rather than blocking the caller.
+"""
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import copy
+import logging
+import queue
+import random
+import re
+import sys
+import orjson
+
+REDACTED = "[REDACTED]"
+SENSITIVE_FIELDS = frozenset((
+    "password", "password_hash", "secret", "secret_key", "token", "access_token", "authorization",
+))
+# key=value / key: value pairs in free-text messages
+SENSITIVE_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(SENSITIVE_FIELDS, key=len, reverse=True)) + r")(\s*[=:]\s*)('[^']*'|\"[^\"]*\"|[^\s,;&]+)",
+    re.IGNORECASE,
+)
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def redact_text(text: str) -> str:
+    return SENSITIVE_PATTERN.sub(lambda m: f"{m.group(1)}{m.group(2)}{REDACTED}", text)
+
+
+def redact_value(key: str, value):
+    if key.lower() in SENSITIVE_FIELDS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: redact_value(str(k), v) for k, v in value.items()}
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+def extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING, per logger.
+
+    rates maps logger names to the fraction kept; a rate applies to the logger and its
+    children, the most specific name wins, and unlisted loggers keep everything.
+    """
+
+    def __init__(self, rates=None, random_source=random.random):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._random = random_source
+        self._by_logger = {}
+        self.sampled_out = 0
+
+    def rate_for(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or self._random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class RedactionFilter(logging.Filter):
+    """Masks credential fields in the message and extra fields; runs on the listener thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact_text(record.getMessage())
+        record.args = None
+        for key, value in extra_fields(record).items():
+            setattr(record, key, redact_value(key, value))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **extra_fields(record),
+        }
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return orjson.dumps(entry, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments may change after the call returns, so the message is merged here; the
+        # traceback becomes text because exc_info does not survive the trip to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The stop sentinel must not be dropped like a record when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    def __init__(self, level="INFO", fmt="json", sampling=None, queue_size: int = 10000, stream=None):
+        if fmt not in ("json", "text"):
+            raise ValueError(f"Unknown log format: {fmt}")
+        self.level = level
+        self.queue = queue.Queue(queue_size)
+        self.sampler = SamplingFilter(sampling)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.sampler)
+        output = logging.StreamHandler(sys.stderr if stream is None else stream)
+        output.addFilter(RedactionFilter())
+        output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+        self.listener = _Listener(self.queue, output, respect_handler_level=True)
+
+    def install(self) -> None:
+        """Make this pipeline the root logger's only handler."""
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(self.level)
+        root.addHandler(self.handler)
+        self.start()
+
+    def start(self) -> None:
+        if self.listener._thread is None:
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Write out everything queued so far and stop the listener thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.listener._thread is not None,
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+            "sampling": self.sampler.rates,
+        }
+
+
+def configure_logging(settings, stream=None) -> LogPipeline:
+    pipeline = LogPipeline(
+        level=settings.log_level,
+        fmt=settings.log_format,
+        sampling=dict(settings.log_sampling),
+        queue_size=settings.log_queue_size,
+        stream=stream,
+    )
+    pipeline.install()
+    return pipeline
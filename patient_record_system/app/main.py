@@ -1,56 +1,143 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status, Form
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.future import select
-from pydantic import BaseModel
-from typing import List, Optional
-import os
-from dotenv import load_dotenv
-from app.models import Base, Hospital, User, Patient, TestResult, TestType
-from app.schemas import TestResultCreate
+from sqlalchemy import func, insert, literal, tuple_, update
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Optional
+from app.config import settings
+from app.database import (
+    AsyncSessionLocal,
+    ReadYourWritesMiddleware,
+    engine,
+    get_db,
+    get_read_db,
+    pool_status,
+    pool_wait_stats,
+    read_router,
+    reads_primary,
+    session_factory_for,
+)
+from app.models import (
+    Hospital, User, Patient, TestResult, TestType, Note, HealthSummary, Consent, AuditEvent,
+    HospitalTotals, PatientRegistrationsMonthly, TestResultsDaily,
+)
+from app.migrations import check_schema
+from app.schemas import TestResultCreate, TestResultBulkCreate
+from app.principal_cache import PRINCIPALS_CATALOG, PrincipalCache
+from app.response_cache import create_response_cache
+from app.hashing import HashingExecutor, HashingPoolSaturated
+from app.audit import AuditLog, AuditLogSaturated
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    ndjson_response,
+)
+from app.logs import configure_logging
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics, render_pool
+from app.serialization import ORJSONResponse, RowSerializer, columns_for
+from app.catalog import TestTypeCatalog, bump_catalog_version, catalog_version_bump
+from app.consents import READ_ACCESS_TYPES, ConsentIndex
+from app.timeline import as_utc, timeline_query
+from app.summary import SummaryRebuildJob, apply_note, apply_test_results, summary_delta_for_inserted
+from app.analytics import slice_query, summarize_slice
+from app.conditional import cache_headers, etag_matches, not_modified
+from app.sync import START as SYNC_START, changes_query, fold_changes
+from app.rollups import (
+    apply_patient_registrations,
+    apply_test_result_counts,
+    patient_rollups_for_inserted,
+    test_result_rollups_for_inserted,
+)
+from app.search import NOTE_CANDIDATES, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, PatientSearch
+from app.bulk import TEST_RESULT_BATCH_SIZE, RowError, chunked, parse_bulk_rows, validation_error_message
 from contextlib import asynccontextmanager
-from uuid import UUID
-from datetime import datetime, date, timedelta
-from passlib.context import CryptContext
+from uuid import UUID, uuid4
+from datetime import datetime, date, timedelta, timezone
 from jose import JWTError, jwt
+import asyncio
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Records are formatted and written by a background thread
+log_pipeline = configure_logging(settings)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Password hashing runs off the event loop
+hashing_executor = HashingExecutor(
+    kind=settings.hashing_executor,
+    max_workers=settings.hashing_workers,
+    max_queue=settings.hashing_queue_depth,
+)
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL not found in .env file")
+# JWT
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Initialize database
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Authenticated principals, keyed by token type and subject
+principal_cache = PrincipalCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+    check_seconds=settings.principal_cache_check_seconds,
+)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Rendered pages of the busiest lists, invalidated by the writes that change them
+response_cache = create_response_cache(
+    settings.response_cache_backend,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    max_bytes=settings.response_cache_max_bytes,
+    max_entry_bytes=settings.response_cache_max_entry_bytes,
+    redis_url=settings.response_cache_redis_url,
+)
 
-# JWT
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Test types are validated and named from memory
+test_type_catalog = TestTypeCatalog(ttl_seconds=settings.test_type_catalog_ttl_seconds)
+
+# Cross-hospital read access is checked against consents held in memory
+consent_index = ConsentIndex(ttl_seconds=settings.consent_index_ttl_seconds)
+
+# Trigram or full-text name matching, depending on what the database provides
+patient_search = PatientSearch()
+
+# Health summaries are maintained by deltas on write; this repairs any drift
+summary_rebuild_job = SummaryRebuildJob(engine, interval_seconds=settings.summary_rebuild_interval_seconds)
+
+# Reads of patient records are recorded off the request path and written in batches
+audit_log = AuditLog(
+    engine,
+    max_pending=settings.audit_max_pending,
+    batch_size=settings.audit_batch_size,
+    flush_interval_seconds=settings.audit_flush_interval_seconds,
+    enqueue_timeout_seconds=settings.audit_enqueue_timeout_seconds,
+)
 
 # Lifespan for database setup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # The schema is owned by app.migrations; refuse to serve against an outdated database
+    await check_schema(engine)
+    async with AsyncSessionLocal() as db:
+        await test_type_catalog.load(db)
+        await consent_index.load(db)
+        await patient_search.detect(db)
+    log_pipeline.start()
+    summary_rebuild_job.start()
+    audit_log.start()
     yield
+    await summary_rebuild_job.stop()
+    # Everything still buffered is written before the pool goes away
+    await audit_log.stop()
+    hashing_executor.shutdown()
+    await response_cache.close()
     await engine.dispose()
+    log_pipeline.stop()
 
 # FastAPI app
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -59,19 +146,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+app.add_middleware(ReadYourWritesMiddleware, router=read_router)
+# Outermost, so the measured latency covers the whole middleware stack
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
-# Database dependency
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_pool_saturated_handler(request: Request, exc: HashingPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(AuditLogSaturated)
+async def audit_log_saturated_handler(request: Request, exc: AuditLogSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Access cannot be audited right now, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 # JWT functions
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 async def get_current_hospital(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -81,17 +184,22 @@ async def get_current_hospital(token: str = Depends(oauth2_scheme), db: AsyncSes
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         hospital_id: str = payload.get("sub")
         login_type: str = payload.get("type")
         if hospital_id is None or login_type != "hospital":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    await principal_cache.refresh_if_stale(db)
+    hospital = principal_cache.get("hospital", hospital_id)
+    if hospital is not None:
+        return hospital
     result = await db.execute(select(Hospital).filter(Hospital.hospital_id == hospital_id))
     hospital = result.scalars().first()
     if hospital is None:
         raise credentials_exception
+    principal_cache.set("hospital", hospital_id, hospital)
     return hospital
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -101,17 +209,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: str = payload.get("sub")
         login_type: str = payload.get("type")
         if user_id is None or login_type != "user":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    await principal_cache.refresh_if_stale(db)
+    user = principal_cache.get("user", user_id)
+    if user is not None:
+        return user
     result = await db.execute(select(User).filter(User.user_id == user_id))
     user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    principal_cache.set("user", user_id, user)
     return user
 
 async def get_current_patient(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -121,17 +234,22 @@ async def get_current_patient(token: str = Depends(oauth2_scheme), db: AsyncSess
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         patient_id: str = payload.get("sub")
         login_type: str = payload.get("type")
         if patient_id is None or login_type != "patient":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    await principal_cache.refresh_if_stale(db)
+    patient = principal_cache.get("patient", patient_id)
+    if patient is not None:
+        return patient
     result = await db.execute(select(Patient).filter(Patient.patient_id == patient_id))
     patient = result.scalars().first()
     if patient is None:
         raise credentials_exception
+    principal_cache.set("patient", patient_id, patient)
     return patient
 
 # Pydantic models
@@ -155,10 +273,6 @@ class HospitalResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        json_encoders = {
-            UUID: str,
-            datetime: lambda v: v.isoformat(),
-        }
 
 class UserCreate(BaseModel):
     email: str
@@ -180,10 +294,6 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        json_encoders = {
-            UUID: str,
-            datetime: lambda v: v.isoformat(),
-        }
 
 class PatientCreate(BaseModel):
     user_id: str
@@ -195,7 +305,7 @@ class PatientCreate(BaseModel):
     created_by_hospital_id: str
 
 class PatientUpdate(BaseModel):
-    dob: Optional[str] = None
+    dob: Optional[date] = None
     gender: Optional[str] = None
     contact_phone: Optional[str] = None
     emergency_contact: Optional[dict] = None
@@ -214,11 +324,23 @@ class PatientResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        json_encoders = {
-            UUID: str,
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat(),
-        }
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: str
+    unique_id: Optional[str] = None
+    patient_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+class BulkPatientResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BulkRowResult]
+
+class BulkTestResultResponse(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[BulkRowResult]
 
 class TestResultResponse(BaseModel):
     test_result_id: UUID
@@ -229,19 +351,228 @@ class TestResultResponse(BaseModel):
     created_by_hospital_id: UUID
     created_at: datetime
     updated_at: Optional[datetime]
+    result_value: Optional[float] = None
+    result_unit: Optional[str] = None
+    test_type_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class TimelineEntry(BaseModel):
+    kind: str
+    entry_id: UUID
+    occurred_at: datetime
+    data: dict
+
+class TimelineResponse(BaseModel):
+    patient: PatientResponse
+    entries: List[TimelineEntry]
+
+class NoteCreate(BaseModel):
+    content: str
+
+class NoteResponse(BaseModel):
+    note_id: UUID
+    patient_id: UUID
+    user_id: Optional[UUID]
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ConsentCreate(BaseModel):
+    hospital_id: UUID
+    access_type: str = "view"
+    expires_at: Optional[datetime] = None
+
+class ConsentResponse(BaseModel):
+    consent_id: UUID
+    patient_id: UUID
+    hospital_id: UUID
+    user_id: Optional[UUID]
+    access_type: str
+    granted_at: datetime
+    expires_at: Optional[datetime]
+    revoked_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class LatestTestResult(BaseModel):
+    test_type_id: UUID
+    test_type_name: Optional[str] = None
+    test_result_id: UUID
+    result: str
+    test_date: date
+
+class HealthSummaryResponse(BaseModel):
+    patient_id: UUID
+    diagnoses: Optional[Any] = None
+    medications: Optional[Any] = None
+    allergies: Optional[Any] = None
+    test_result_count: int = 0
+    note_count: int = 0
+    last_test_date: Optional[date] = None
+    last_note_at: Optional[datetime] = None
+    latest_results: List[LatestTestResult] = []
+    last_updated: Optional[datetime] = None
+
+class SearchHit(BaseModel):
+    kind: str
+    hit_id: UUID
+    patient_id: UUID
+    score: float
+    unique_id: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    contact_phone: Optional[str]
+    snippet: Optional[str]
+
+class DailyTrendPoint(BaseModel):
+    day: date
+    count: int
+    mean: float
+    rolling_mean: float
+
+class UnitDistribution(BaseModel):
+    unit: Optional[str]
+    count: int
+    patients: int
+    min: float
+    max: float
+    mean: float
+    std: float
+    percentiles: dict
+    below_range: Optional[int] = None
+    above_range: Optional[int] = None
+    daily: List[DailyTrendPoint]
+
+class TestTypeAnalyticsResponse(BaseModel):
+    test_type_id: UUID
+    test_type_name: str
+    patient_id: Optional[UUID] = None
+    non_numeric: int
+    units: List[UnitDistribution]
+
+class MonthlyCount(BaseModel):
+    month: date
+    count: int
+
+class DailyTestResultCount(BaseModel):
+    day: date
+    test_type_id: UUID
+    test_type_name: Optional[str] = None
+    count: int
+
+class HospitalStatsResponse(BaseModel):
+    hospital_id: UUID
+    patient_count: int
+    test_result_count: int
+    patients_per_month: List[MonthlyCount]
+    test_results_per_day: List[DailyTestResultCount]
+
+class SyncConsent(ConsentResponse):
+    # The column is nullable, and sync sends rows as stored
+    hospital_id: Optional[UUID]
+
+class SyncTombstone(BaseModel):
+    entity: str
+    entity_id: UUID
+    deleted_at: datetime
+
+class SyncResponse(BaseModel):
+    patients: List[PatientResponse]
+    test_results: List[TestResultResponse]
+    notes: List[NoteResponse]
+    consents: List[SyncConsent]
+    tombstones: List[SyncTombstone]
+    # Pass as ?since= on the next call; keep calling while has_more is set
+    next_token: str
+    has_more: bool
+
+class TestTypeCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+
+class TestTypeResponse(BaseModel):
+    test_type_id: UUID
+    name: str
+    description: Optional[str]
+
+class AuditEventResponse(BaseModel):
+    event_id: int
+    occurred_at: datetime
+    actor_type: str
+    actor_id: UUID
+    action: str
+    patient_id: Optional[UUID]
+    record_count: Optional[int]
 
     class Config:
         from_attributes = True
-        json_encoders = {
-            UUID: str,
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat(),
-        }
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+def _test_result_row(row: dict) -> dict:
+    # test_date is stored as a timestamp but exposed as a date
+    row["test_date"] = row["test_date"].date()
+    row["test_type_name"] = test_type_catalog.name(row["test_type_id"])
+    return row
+
+async def can_read_patient(db: AsyncSession, hospital: Hospital, patient_id, created_by_hospital_id) -> bool:
+    # The owning hospital always can; others need a consent in force, checked from memory
+    if created_by_hospital_id == hospital.hospital_id:
+        return True
+    return await consent_index.check(db, hospital.hospital_id, patient_id)
+
+def health_summary_response(patient_id: UUID, summary: Optional[HealthSummary]) -> HealthSummaryResponse:
+    if summary is None:
+        return HealthSummaryResponse(patient_id=patient_id)
+    latest_results = sorted(
+        (
+            LatestTestResult(
+                test_type_id=test_type_id,
+                test_type_name=test_type_catalog.name(UUID(test_type_id)),
+                test_result_id=entry["test_result_id"],
+                result=entry["result"],
+                test_date=datetime.fromisoformat(entry["test_date"]).date(),
+            )
+            for test_type_id, entry in summary.latest_results.items()
+        ),
+        key=lambda r: r.test_date,
+        reverse=True,
+    )
+    return HealthSummaryResponse(
+        patient_id=patient_id,
+        diagnoses=summary.diagnoses,
+        medications=summary.medications,
+        allergies=summary.allergies,
+        test_result_count=summary.test_result_count,
+        note_count=summary.note_count,
+        last_test_date=summary.last_test_date.date() if summary.last_test_date else None,
+        last_note_at=summary.last_note_at,
+        latest_results=latest_results,
+        last_updated=summary.last_updated,
+    )
+
+# List endpoints select these columns and encode the rows directly
+HOSPITAL_COLUMNS = columns_for(HospitalResponse, Hospital)
+PATIENT_COLUMNS = columns_for(PatientResponse, Patient)
+TEST_RESULT_COLUMNS = columns_for(TestResultResponse, TestResult)
+AUDIT_EVENT_COLUMNS = columns_for(AuditEventResponse, AuditEvent)
+NOTE_COLUMNS = columns_for(NoteResponse, Note)
+CONSENT_COLUMNS = columns_for(ConsentResponse, Consent)
+hospital_serializer = RowSerializer(HospitalResponse, validate=settings.response_validation)
+patient_serializer = RowSerializer(PatientResponse, validate=settings.response_validation)
+test_result_serializer = RowSerializer(
+    TestResultResponse, validate=settings.response_validation, transform=_test_result_row
+)
+search_hit_serializer = RowSerializer(SearchHit, validate=settings.response_validation)
+audit_event_serializer = RowSerializer(AuditEventResponse, validate=settings.response_validation)
+
 # Token endpoint
 @app.post("/token", response_model=Token)
 async def login(
@@ -250,7 +581,7 @@ async def login(
     password: str = Form(...),
     db: AsyncSession = Depends(get_db)
 ):
-    logger.debug(f"Received form data: grant_type={grant_type}, username={username}, password={password}")
+    logger.debug("Token request", extra={"grant_type": grant_type, "username": username})
     
     if not grant_type or not username or not password:
         raise HTTPException(
@@ -265,7 +596,7 @@ async def login(
     if grant_type == "hospital":
         result = await db.execute(select(Hospital).filter(Hospital.license_number == username))
         entity = result.scalars().first()
-        if not entity or not pwd_context.verify(password, entity.password_hash):
+        if not entity or not await hashing_executor.verify(password, entity.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect license number or password",
@@ -275,7 +606,7 @@ async def login(
     elif grant_type == "user":
         result = await db.execute(select(User).filter(User.email == username))
         entity = result.scalars().first()
-        if not entity or not pwd_context.verify(password, entity.password_hash):
+        if not entity or not await hashing_executor.verify(password, entity.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -293,7 +624,7 @@ async def login(
             )
         user_result = await db.execute(select(User).filter(User.user_id == entity.user_id))
         user = user_result.scalars().first()
-        if not user or not pwd_context.verify(password, user.password_hash):
+        if not user or not await hashing_executor.verify(password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect password",
@@ -309,35 +640,210 @@ async def login(
 
 # Endpoints (unchanged)
 @app.get("/hospitals/", response_model=List[HospitalResponse])
-async def list_hospitals(db: AsyncSession = Depends(get_db), current_hospital: Hospital = Depends(get_current_hospital)):
-    result = await db.execute(select(Hospital))
-    hospitals = result.scalars().all()
-    return hospitals
+async def list_hospitals(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_hospital: Hospital = Depends(get_current_hospital)
+):
+    # Every hospital gets the same list, so the principal is not part of the key
+    cache_key = await response_cache.key("hospitals", "all", query=request.query_params.multi_items())
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached.response()
+    result = await db.execute(select(*HOSPITAL_COLUMNS))
+    response = hospital_serializer.response(hospital_serializer.rows(result.mappings()))
+    # A replica may not have applied the write that bumped the generation yet
+    if reads_primary(db):
+        await response_cache.set(cache_key, response.body)
+    return response
 
 @app.post("/hospitals/", response_model=HospitalResponse, status_code=201)
 async def create_hospital(hospital: HospitalCreate, db: AsyncSession = Depends(get_db)):
     db_hospital = Hospital(
         **hospital.dict(exclude={"password"}),
-        password_hash=pwd_context.hash(hospital.password)
+        password_hash=await hashing_executor.hash(hospital.password)
     )
     db.add(db_hospital)
     await db.commit()
     await db.refresh(db_hospital)
+    await response_cache.invalidate("hospitals", "all")
     return db_hospital
 
 
+@app.get(
+    "/hospitals/search",
+    response_model=List[SearchHit],
+    description=f"Best-first patient and note matches for q. Notes are ranked among the newest "
+                f"{NOTE_CANDIDATES} that match q; older matching notes are not returned.",
+)
+async def search_hospital_records(
+    q: str = Query(..., min_length=2, max_length=200),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=SEARCH_MAX_LIMIT),
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    keyset = decode_cursor(cursor, (float, str, UUID)) if cursor else None
+    page_size = limit or SEARCH_DEFAULT_LIMIT
+    result = await db.execute(patient_search.query(current_hospital.hospital_id, q.strip(), keyset, page_size + 1))
+    hits = result.mappings().all()
+    headers = {}
+    if len(hits) > page_size:
+        hits = hits[:page_size]
+        last = hits[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["score"], last["kind"], last["hit_id"])
+    # Hits carry names, phone numbers and note text, so the page is audited like a list
+    await audit_log.record(
+        "hospital", current_hospital.hospital_id, "patient.search", list(dict.fromkeys(hit["patient_id"] for hit in hits))
+    )
+    return search_hit_serializer.response(search_hit_serializer.rows(hits), headers)
+
+def hospital_patients_query(hospital_id, unique_id: Optional[str] = None, keyset: Optional[tuple] = None):
+    """A hospital's patients in (created_at, patient_id) order, after keyset if given."""
+    query = select(*PATIENT_COLUMNS).filter(Patient.created_by_hospital_id == hospital_id)
+    if unique_id:
+        query = query.filter(Patient.unique_id == unique_id)
+    if keyset is not None:
+        created_at, patient_id = keyset
+        query = query.filter(tuple_(Patient.created_at, Patient.patient_id) > tuple_(created_at, patient_id))
+    return query.order_by(Patient.created_at, Patient.patient_id)
+
 @app.get("/hospitals/patients/", response_model=List[PatientResponse])
 async def list_hospital_patients(
+    request: Request,
     unique_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
     current_hospital: Hospital = Depends(get_current_hospital),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Patient).filter(Patient.created_by_hospital_id == current_hospital.hospital_id)
-    if unique_id:
-        query = query.filter(Patient.unique_id == unique_id)
-    result = await db.execute(query)
-    patients = result.scalars().all()
-    return patients
+    keyset = decode_cursor(cursor, (datetime, UUID)) if cursor else None
+    query = hospital_patients_query(current_hospital.hospital_id, unique_id, keyset)
+    if stream:
+        # Each batch is audited before it is sent, so an export that stops early records only what was read
+        async def audit_batch(rows):
+            await audit_log.record(
+                "hospital", current_hospital.hospital_id, "patient.export", [row["patient_id"] for row in rows]
+            )
+        return ndjson_response(
+            session_factory_for(db), query.limit(limit) if limit else query, patient_serializer, on_batch=audit_batch
+        )
+    hospital_id = current_hospital.hospital_id
+    cache_key = await response_cache.key(
+        "hospital_patients", hospital_id, hospital_id, request.query_params.multi_items()
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        # A hit needs no query at all, not even the fingerprint
+        if etag_matches(request, cached.headers["ETag"]):
+            return not_modified(cached.headers)
+        patient_ids = [UUID(patient_id) for patient_id in cached.meta["patient_ids"]]
+        response = cached.response()
+    else:
+        # Any page changes only if a patient of the hospital was added or updated; each part is an index lookup
+        fingerprint = await db.execute(select(
+            select(HospitalTotals.patient_count).filter(HospitalTotals.hospital_id == hospital_id).scalar_subquery(),
+            select(func.max(Patient.created_at)).filter(Patient.created_by_hospital_id == hospital_id).scalar_subquery(),
+            select(func.max(Patient.updated_at)).filter(Patient.created_by_hospital_id == hospital_id).scalar_subquery(),
+        ))
+        headers = cache_headers("hospital_patients", hospital_id, *fingerprint.one())
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        page_size = limit or DEFAULT_PAGE_SIZE
+        result = await db.execute(query.limit(page_size + 1))
+        patients = result.mappings().all()
+        if len(patients) > page_size:
+            patients = patients[:page_size]
+            last = patients[-1]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last["created_at"], last["patient_id"])
+        patient_ids = [patient["patient_id"] for patient in patients]
+        response = patient_serializer.response(patient_serializer.rows(patients), headers)
+        if reads_primary(db):
+            await response_cache.set(cache_key, response.body, headers, {"patient_ids": patient_ids})
+    # Hits are audited like any other read
+    await audit_log.record("hospital", hospital_id, "patient.list", patient_ids)
+    return response
+
+# Dashboards read rollups only, never the source tables
+STATS_MAX_DAYS = 366
+
+@app.get("/hospitals/stats", response_model=HospitalStatsResponse)
+async def get_hospital_stats(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    months: int = Query(12, ge=1, le=120),
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Daily counts for [since, until), 30 days up to today by default; registrations for the
+    # last `months` months
+    today = datetime.now(timezone.utc).date()
+    until = until or today + timedelta(days=1)
+    since = since or until - timedelta(days=30)
+    if not timedelta(0) < until - since <= timedelta(days=STATS_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"since must be before until and at most {STATS_MAX_DAYS} days apart"
+        )
+    hospital_id = current_hospital.hospital_id
+    first_month_index = today.year * 12 + today.month - months
+    first_month = date(first_month_index // 12, first_month_index % 12 + 1, 1)
+    totals = await db.execute(
+        select(HospitalTotals.patient_count, HospitalTotals.test_result_count)
+        .filter(HospitalTotals.hospital_id == hospital_id)
+    )
+    totals = totals.first()
+    registrations = await db.execute(
+        select(PatientRegistrationsMonthly.month, PatientRegistrationsMonthly.patient_count.label("count"))
+        .filter(
+            PatientRegistrationsMonthly.hospital_id == hospital_id,
+            PatientRegistrationsMonthly.month >= first_month,
+        )
+        .order_by(PatientRegistrationsMonthly.month)
+    )
+    daily = await db.execute(
+        select(TestResultsDaily.day, TestResultsDaily.test_type_id, TestResultsDaily.result_count.label("count"))
+        .filter(TestResultsDaily.hospital_id == hospital_id, TestResultsDaily.day >= since, TestResultsDaily.day < until)
+        .order_by(TestResultsDaily.day, TestResultsDaily.test_type_id)
+    )
+    return {
+        "hospital_id": hospital_id,
+        "patient_count": totals.patient_count if totals else 0,
+        "test_result_count": totals.test_result_count if totals else 0,
+        "patients_per_month": [dict(row) for row in registrations.mappings()],
+        "test_results_per_day": [
+            {**row, "test_type_name": test_type_catalog.name(row["test_type_id"])} for row in daily.mappings()
+        ],
+    }
+
+@app.get("/hospitals/analytics/test_types/{test_type_id}", response_model=TestTypeAnalyticsResponse)
+async def get_test_type_analytics(
+    test_type_id: UUID,
+    patient_id: Optional[UUID] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    low: Optional[float] = None,
+    high: Optional[float] = None,
+    window_days: int = Query(7, ge=1, le=365),
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Results this hospital recorded; patient_id narrows the slice to one patient's trend
+    test_type = await test_type_catalog.get(db, test_type_id)
+    if test_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test type not found"
+        )
+    result = await db.execute(slice_query(
+        current_hospital.hospital_id, test_type_id, patient_id=patient_id, since=since, until=until
+    ))
+    rows = result.mappings().all()
+    if patient_id is not None:
+        await audit_log.record("hospital", current_hospital.hospital_id, "test_results.analytics", [patient_id])
+    summary = await asyncio.to_thread(summarize_slice, rows, low, high, window_days)
+    return {"test_type_id": test_type_id, "test_type_name": test_type.name, "patient_id": patient_id, **summary}
 
 @app.post("/hospitals/patients/", response_model=PatientResponse, status_code=status.HTTP_201_CREATED)
 async def create_hospital_patient(
@@ -351,21 +857,135 @@ async def create_hospital_patient(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Cannot create patient for another hospital"
         )
-    # Check if unique_id already exists
-    existing_patient = await db.execute(
-        select(Patient).filter(Patient.unique_id == patient.unique_id)
+    # The unique constraint is the duplicate check, so concurrent registrations cannot both succeed;
+    # the dashboard rollups count the new patient in the same statement
+    values = patient.dict()
+    # Column defaults are not applied inside a CTE, so the key is generated here
+    values.update(
+        patient_id=uuid4(), user_id=UUID(patient.user_id), created_by_hospital_id=current_hospital.hospital_id
+    )
+    inserted = (
+        pg_insert(Patient)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[Patient.unique_id])
+        .returning(*PATIENT_COLUMNS)
+        .cte("inserted")
     )
-    if existing_patient.scalars().first():
+    query = select(inserted)
+    for i, rollup in enumerate(patient_rollups_for_inserted(inserted)):
+        query = query.add_cte(rollup.cte(f"rollup_{i}"))
+    result = await db.execute(query)
+    created = result.mappings().first()
+    if created is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Patient with this unique_id already exists"
         )
-    # Create new patient
-    db_patient = Patient(**patient.dict())
-    db.add(db_patient)
     await db.commit()
-    await db.refresh(db_patient)
-    return db_patient
+    await response_cache.invalidate("hospital_patients", current_hospital.hospital_id)
+    return dict(created)
+
+async def _insert_patient_batch(db: AsyncSession, batch, hospital_id: UUID, seen_unique_ids: set):
+    results = {}
+    candidates = {}
+    for row_number, row in batch:
+        if isinstance(row, RowError):
+            results[row_number] = BulkRowResult(row=row_number, status="rejected", error=str(row))
+            continue
+        row.setdefault("created_by_hospital_id", str(hospital_id))
+        try:
+            patient = PatientCreate(**row)
+            user_id = UUID(patient.user_id)
+            if UUID(patient.created_by_hospital_id) != hospital_id:
+                raise ValueError("Cannot create patient for another hospital")
+        except ValidationError as e:
+            results[row_number] = BulkRowResult(
+                row=row_number, status="rejected", unique_id=row.get("unique_id"), error=validation_error_message(e)
+            )
+            continue
+        except ValueError as e:
+            results[row_number] = BulkRowResult(
+                row=row_number, status="rejected", unique_id=row.get("unique_id"), error=str(e)
+            )
+            continue
+        if patient.unique_id in seen_unique_ids:
+            results[row_number] = BulkRowResult(
+                row=row_number, status="rejected", unique_id=patient.unique_id,
+                error="Duplicate unique_id in upload"
+            )
+            continue
+        seen_unique_ids.add(patient.unique_id)
+        values = patient.dict()
+        values.update(user_id=user_id, created_by_hospital_id=hospital_id)
+        candidates[row_number] = values
+
+    # One set-based lookup per batch for existing unique_ids and for the referenced users
+    if candidates:
+        existing = await db.execute(
+            select(Patient.unique_id).filter(Patient.unique_id.in_([v["unique_id"] for v in candidates.values()]))
+        )
+        existing_unique_ids = set(existing.scalars().all())
+        known = await db.execute(
+            select(User.user_id).filter(User.user_id.in_({v["user_id"] for v in candidates.values()}))
+        )
+        known_user_ids = set(known.scalars().all())
+        for row_number, values in list(candidates.items()):
+            error = None
+            if values["unique_id"] in existing_unique_ids:
+                error = "Patient with this unique_id already exists"
+            elif values["user_id"] not in known_user_ids:
+                error = "Unknown user_id"
+            if error:
+                results[row_number] = BulkRowResult(
+                    row=row_number, status="rejected", unique_id=values["unique_id"], error=error
+                )
+                del candidates[row_number]
+
+    if candidates:
+        # ON CONFLICT DO NOTHING covers rows a concurrent writer registered after the lookup
+        inserted = await db.execute(
+            pg_insert(Patient.__table__)
+            .on_conflict_do_nothing(index_elements=["unique_id"])
+            .returning(
+                Patient.__table__.c.unique_id,
+                Patient.__table__.c.patient_id,
+                Patient.__table__.c.created_by_hospital_id,
+                Patient.__table__.c.created_at,
+            ),
+            list(candidates.values()),
+        )
+        inserted_rows = inserted.mappings().all()
+        await apply_patient_registrations(db, inserted_rows)
+        inserted_ids = {row["unique_id"]: row["patient_id"] for row in inserted_rows}
+        for row_number, values in candidates.items():
+            patient_id = inserted_ids.get(values["unique_id"])
+            if patient_id is None:
+                results[row_number] = BulkRowResult(
+                    row=row_number, status="rejected", unique_id=values["unique_id"],
+                    error="Patient with this unique_id already exists"
+                )
+            else:
+                results[row_number] = BulkRowResult(
+                    row=row_number, status="accepted", unique_id=values["unique_id"], patient_id=patient_id
+                )
+    return [results[row_number] for row_number, _ in batch]
+
+@app.post("/hospitals/patients/bulk", response_model=BulkPatientResponse)
+async def bulk_create_hospital_patients(
+    request: Request,
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_db)
+):
+    rows = parse_bulk_rows(await request.body(), request.headers.get("content-type", ""))
+    results = []
+    seen_unique_ids = set()
+    for batch in chunked(rows):
+        results += await _insert_patient_batch(db, batch, current_hospital.hospital_id, seen_unique_ids)
+        await db.commit()
+    accepted = sum(1 for r in results if r.status == "accepted")
+    if accepted:
+        await response_cache.invalidate("hospital_patients", current_hospital.hospital_id)
+    return BulkPatientResponse(accepted=accepted, rejected=len(results) - accepted, results=results)
 
 @app.patch("/hospitals/patients/{patient_id}", response_model=PatientResponse)
 async def update_hospital_patient(
@@ -374,24 +994,54 @@ async def update_hospital_patient(
     current_hospital: Hospital = Depends(get_current_hospital),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
-        select(Patient).filter(
-            Patient.patient_id == patient_id,
-            Patient.created_by_hospital_id == current_hospital.hospital_id
+    owned = (Patient.patient_id == patient_id, Patient.created_by_hospital_id == current_hospital.hospital_id)
+    update_data = patient_update.dict(exclude_unset=True)
+    if update_data:
+        result = await db.execute(
+            update(Patient)
+            .filter(*owned)
+            .values(**update_data)
+            .returning(*PATIENT_COLUMNS)
+            # Other workers drop their cached principals when they next check the version
+            .add_cte(catalog_version_bump(PRINCIPALS_CATALOG).cte("principals_version"))
+            .execution_options(synchronize_session=False)
         )
-    )
-    db_patient = result.scalars().first()
-    if not db_patient:
+    else:
+        result = await db.execute(select(*PATIENT_COLUMNS).filter(*owned))
+    updated = result.mappings().first()
+    if updated is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient not found or not associated with this hospital"
         )
-    update_data = patient_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_patient, key, value)
     await db.commit()
-    await db.refresh(db_patient)
-    return db_patient
+    principal_cache.invalidate("patient", updated["patient_id"])
+    await response_cache.invalidate("hospital_patients", current_hospital.hospital_id)
+    return dict(updated)
+
+def test_result_insert_query(patient_id, hospital_id, test_type_id, result: str, test_date: date):
+    """Insert a test result only if the patient belongs to hospital_id and fold it into the
+    patient's health summary and the dashboard rollups, all in one statement."""
+    inserted = (
+        insert(TestResult)
+        .from_select(
+            ["test_result_id", "patient_id", "test_type_id", "result", "test_date", "created_by_hospital_id"],
+            select(
+                literal(uuid4(), TestResult.test_result_id.type),
+                Patient.patient_id,
+                literal(test_type_id, TestResult.test_type_id.type),
+                literal(result, TestResult.result.type),
+                literal(datetime.combine(test_date, datetime.min.time()), TestResult.test_date.type),
+                Patient.created_by_hospital_id,
+            ).filter(Patient.patient_id == patient_id, Patient.created_by_hospital_id == hospital_id)
+        )
+        .returning(*TEST_RESULT_COLUMNS)
+        .cte("inserted")
+    )
+    query = select(inserted).add_cte(summary_delta_for_inserted(inserted).cte("summary"))
+    for i, rollup in enumerate(test_result_rollups_for_inserted(inserted)):
+        query = query.add_cte(rollup.cte(f"rollup_{i}"))
+    return query
 
 @app.post(
     "/hospitals/patients/{patient_id}/test_results/",
@@ -404,51 +1054,529 @@ async def create_test_result(
     current_hospital: Hospital = Depends(get_current_hospital),
     db: AsyncSession = Depends(get_db)
 ):
-    # Verify patient exists and belongs to this hospital
+    owned = (Patient.patient_id == patient_id, Patient.created_by_hospital_id == current_hospital.hospital_id)
+    # Test types are checked from memory
+    test_type = await test_type_catalog.get(db, test_result.test_type_id)
+    if not test_type:
+        # An unknown patient is still reported ahead of an unknown test type
+        result = await db.execute(select(Patient.patient_id).filter(*owned))
+        if result.scalar() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Patient not found or not associated with this hospital"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid test_type_id"
+        )
+    result = await db.execute(test_result_insert_query(
+        patient_id, current_hospital.hospital_id, test_type.test_type_id, test_result.result, test_result.test_date
+    ))
+    created = result.mappings().first()
+    if created is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found or not associated with this hospital"
+        )
+    await db.commit()
+    await response_cache.invalidate("patient_test_results", created["patient_id"])
+    return _test_result_row(dict(created))
+
+@app.post(
+    "/hospitals/patients/{patient_id}/notes",
+    response_model=NoteResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_note(
+    patient_id: UUID,
+    note: NoteCreate,
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_db)
+):
     result = await db.execute(
-        select(Patient).filter(
+        select(Patient.patient_id).filter(
             Patient.patient_id == patient_id,
             Patient.created_by_hospital_id == current_hospital.hospital_id
         )
     )
-    patient = result.scalars().first()
-    if not patient:
+    if result.scalar() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient not found or not associated with this hospital"
         )
-    # Verify test_type_id exists
+    db_note = Note(patient_id=patient_id, content=note.content, created_at=datetime.now(timezone.utc))
+    db.add(db_note)
+    await apply_note(db, patient_id, db_note.created_at)
+    await db.commit()
+    return db_note
+
+@app.get("/hospitals/patients/{patient_id}/summary", response_model=HealthSummaryResponse)
+async def get_hospital_patient_summary(
+    patient_id: UUID,
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # One indexed lookup: the summary is maintained on write, never recomputed here
     result = await db.execute(
-        select(TestType).filter(TestType.test_type_id == test_result.test_type_id)
+        select(Patient.created_by_hospital_id, HealthSummary)
+        .outerjoin(HealthSummary, HealthSummary.patient_id == Patient.patient_id)
+        .filter(Patient.patient_id == patient_id)
     )
-    test_type = result.scalars().first()
-    if not test_type:
+    row = result.first()
+    if row is None or not await can_read_patient(db, current_hospital, patient_id, row.created_by_hospital_id):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid test_type_id"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found or not associated with this hospital"
         )
-    # Create test result
-    db_test_result = TestResult(
-        patient_id=patient_id,
-        test_type_id=test_result.test_type_id,
-        result=test_result.result,
-        test_date=test_result.test_date,
-        created_by_hospital_id=current_hospital.hospital_id
+    await audit_log.record("hospital", current_hospital.hospital_id, "summary.read", [patient_id])
+    return health_summary_response(patient_id, row.HealthSummary)
+
+async def get_readable_patient(db: AsyncSession, patient_id: UUID, hospital: Hospital):
+    result = await db.execute(select(*PATIENT_COLUMNS).filter(Patient.patient_id == patient_id))
+    patient = result.mappings().first()
+    if not patient or not await can_read_patient(db, hospital, patient_id, patient["created_by_hospital_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found or not associated with this hospital"
+        )
+    return patient
+
+@app.get("/hospitals/patients/{patient_id}", response_model=PatientResponse)
+async def get_hospital_patient(
+    patient_id: UUID,
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    patient = await get_readable_patient(db, patient_id, current_hospital)
+    await audit_log.record("hospital", current_hospital.hospital_id, "patient.read", [patient_id])
+    return dict(patient)
+
+@app.get("/hospitals/patients/{patient_id}/timeline", response_model=TimelineResponse)
+async def get_patient_timeline(
+    patient_id: UUID,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    patient = await get_readable_patient(db, patient_id, current_hospital)
+    page_size = limit or DEFAULT_PAGE_SIZE
+    keyset = decode_cursor(cursor, (datetime, UUID)) if cursor else None
+    # One UNION ALL over every source, newest first
+    result = await db.execute(timeline_query(
+        patient_id,
+        since=as_utc(since) if since else None,
+        until=as_utc(until) if until else None,
+        cursor=keyset,
+        limit=page_size + 1,
+    ))
+    entries = [dict(row) for row in result.mappings()]
+    headers = {}
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        last = entries[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["occurred_at"], last["entry_id"])
+    await audit_log.record(
+        "hospital", current_hospital.hospital_id, "timeline.read", [patient_id], record_count=len(entries)
     )
-    db.add(db_test_result)
+    for entry in entries:
+        if entry["kind"] == "test_result":
+            entry["data"]["test_type_name"] = test_type_catalog.name(UUID(entry["data"]["test_type_id"]))
+    content = {"patient": dict(patient), "entries": entries}
+    if settings.response_validation:
+        content = TimelineResponse.model_validate(content).model_dump(mode="json")
+    return ORJSONResponse(content, headers=headers)
+
+async def _insert_test_result_batch(db: AsyncSession, batch, hospital_id: UUID):
+    errors = []
+    candidates = []
+    for row_number, row in batch:
+        if isinstance(row, RowError):
+            errors.append(BulkRowResult(row=row_number, status="rejected", error=str(row)))
+            continue
+        try:
+            item = TestResultBulkCreate(**row)
+            candidates.append((row_number, {
+                "test_result_id": uuid4(),
+                "patient_id": UUID(item.patient_id),
+                "test_type_id": UUID(item.test_type_id),
+                "result": item.result,
+                "test_date": item.test_date,
+                "created_by_hospital_id": hospital_id,
+            }))
+        except ValidationError as e:
+            errors.append(BulkRowResult(row=row_number, status="rejected", error=validation_error_message(e)))
+        except ValueError as e:
+            errors.append(BulkRowResult(row=row_number, status="rejected", error=str(e)))
+
+    # One ownership query and one test type query per batch
+    if candidates:
+        owned = await db.execute(
+            select(Patient.patient_id).filter(
+                Patient.patient_id.in_({v["patient_id"] for _, v in candidates}),
+                Patient.created_by_hospital_id == hospital_id
+            )
+        )
+        owned_patient_ids = set(owned.scalars().all())
+        known_test_type_ids = {
+            test_type_id for test_type_id in {v["test_type_id"] for _, v in candidates}
+            if await test_type_catalog.get(db, test_type_id)
+        }
+        valid = []
+        for row_number, values in candidates:
+            if values["patient_id"] not in owned_patient_ids:
+                errors.append(BulkRowResult(
+                    row=row_number, status="rejected", patient_id=values["patient_id"],
+                    error="Patient not found or not associated with this hospital"
+                ))
+            elif values["test_type_id"] not in known_test_type_ids:
+                errors.append(BulkRowResult(
+                    row=row_number, status="rejected", patient_id=values["patient_id"], error="Invalid test_type_id"
+                ))
+            else:
+                valid.append(values)
+        if valid:
+            await db.execute(TestResult.__table__.insert(), valid)
+            await apply_test_results(db, valid)
+            await apply_test_result_counts(db, valid)
+        return valid, errors
+    return [], errors
+
+@app.post("/hospitals/test_results/bulk", response_model=BulkTestResultResponse)
+async def bulk_create_test_results(
+    request: Request,
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_db)
+):
+    rows = parse_bulk_rows(await request.body(), request.headers.get("content-type", ""), json_columns=())
+    accepted = 0
+    patient_ids = set()
+    errors = []
+    # Valid rows from every batch are written in a single transaction
+    for batch in chunked(rows, TEST_RESULT_BATCH_SIZE):
+        batch_accepted, batch_errors = await _insert_test_result_batch(db, batch, current_hospital.hospital_id)
+        accepted += len(batch_accepted)
+        patient_ids.update(values["patient_id"] for values in batch_accepted)
+        errors += batch_errors
     await db.commit()
-    await db.refresh(db_test_result)
-    return db_test_result
+    await response_cache.invalidate("patient_test_results", *sorted(patient_ids))
+    errors.sort(key=lambda e: e.row)
+    return BulkTestResultResponse(accepted=accepted, rejected=len(errors), errors=errors)
+
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 5000
+
+@app.get("/sync", response_model=SyncResponse)
+async def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(SYNC_DEFAULT_LIMIT, ge=1, le=SYNC_MAX_LIMIT),
+    current_hospital: Hospital = Depends(get_current_hospital),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Without a token every row of the hospital is sent once, as a change
+    position = decode_cursor(since, (int, int)) if since else SYNC_START
+    result = await db.execute(changes_query(current_hospital.hospital_id, position, limit + 1))
+    page = fold_changes(result.mappings().all(), position, limit)
+    # Rows are read as they are now; one changed again since is sent again on a later page
+    sources = {
+        "patient": (PATIENT_COLUMNS, Patient.patient_id),
+        "test_result": (TEST_RESULT_COLUMNS, TestResult.test_result_id),
+        "note": (NOTE_COLUMNS, Note.note_id),
+        "consent": (CONSENT_COLUMNS, Consent.consent_id),
+    }
+    rows = {entity: [] for entity in sources}
+    for entity, (columns, key) in sources.items():
+        if page.upserted[entity]:
+            result = await db.execute(select(*columns).filter(key.in_(page.upserted[entity])))
+            rows[entity] = [dict(row) for row in result.mappings()]
+    # One event per patient whose record, results, notes or consents were sent
+    patient_ids = {row["patient_id"] for entity_rows in rows.values() for row in entity_rows}
+    if patient_ids:
+        await audit_log.record("hospital", current_hospital.hospital_id, "patient.sync", list(patient_ids))
+    return {
+        "patients": rows["patient"],
+        "test_results": [_test_result_row(row) for row in rows["test_result"]],
+        "notes": rows["note"],
+        "consents": rows["consent"],
+        "tombstones": [
+            {"entity": entity, "entity_id": entity_id, "deleted_at": deleted_at}
+            for entity, entity_id, deleted_at in page.deleted
+        ],
+        "next_token": encode_cursor(*page.position),
+        "has_more": page.has_more,
+    }
 
 @app.get("/patients/me/", response_model=PatientResponse)
-async def get_patient_details(current_patient: Patient = Depends(get_current_patient)):
-    return current_patient
+async def get_patient_details(
+    request: Request,
+    response: Response,
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # The cached principal may predate an update made on another worker, so body and ETag come from the row
+    result = await db.execute(select(*PATIENT_COLUMNS).filter(Patient.patient_id == current_patient.patient_id))
+    patient = result.mappings().one()
+    headers = cache_headers("patient_details", patient["patient_id"], patient["created_at"], patient["updated_at"])
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    await audit_log.record("patient", current_patient.user_id, "patient.read", [current_patient.patient_id])
+    response.headers.update(headers)
+    return dict(patient)
+
+@app.get("/patients/me/summary", response_model=HealthSummaryResponse)
+async def get_patient_summary(
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(select(HealthSummary).filter(HealthSummary.patient_id == current_patient.patient_id))
+    await audit_log.record("patient", current_patient.user_id, "summary.read", [current_patient.patient_id])
+    return health_summary_response(current_patient.patient_id, result.scalars().first())
+
+@app.get("/patients/me/consents", response_model=List[ConsentResponse])
+async def list_patient_consents(
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(Consent).filter(Consent.patient_id == current_patient.patient_id).order_by(Consent.granted_at.desc())
+    )
+    return result.scalars().all()
+
+@app.post("/patients/me/consents", response_model=ConsentResponse, status_code=status.HTTP_201_CREATED)
+async def grant_consent(
+    consent: ConsentCreate,
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_db)
+):
+    if consent.access_type not in READ_ACCESS_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"access_type must be one of {', '.join(READ_ACCESS_TYPES)}"
+        )
+    result = await db.execute(select(Hospital.hospital_id).filter(Hospital.hospital_id == consent.hospital_id))
+    if result.scalar() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Hospital not found"
+        )
+    db_consent = Consent(
+        patient_id=current_patient.patient_id,
+        hospital_id=consent.hospital_id,
+        user_id=current_patient.user_id,
+        access_type=consent.access_type,
+        granted_at=datetime.now(timezone.utc),
+        expires_at=consent.expires_at,
+    )
+    db.add(db_consent)
+    await db.commit()
+    # Other workers pick the grant up from the change log
+    consent_index.invalidate(db_consent.consent_id)
+    return db_consent
+
+@app.delete("/patients/me/consents/{consent_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_consent(
+    consent_id: UUID,
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        update(Consent)
+        .where(
+            Consent.consent_id == consent_id,
+            Consent.patient_id == current_patient.patient_id,
+            Consent.revoked_at.is_(None)
+        )
+        .values(revoked_at=func.now())
+        .returning(Consent.consent_id)
+    )
+    if result.scalar() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Consent not found or already revoked"
+        )
+    await db.commit()
+    consent_index.invalidate(consent_id)
+
+def patient_test_results_query(patient_id, keyset: Optional[tuple] = None):
+    """A patient's test results in (test_date, test_result_id) order, after keyset if given."""
+    query = select(*TEST_RESULT_COLUMNS).filter(TestResult.patient_id == patient_id)
+    if keyset is not None:
+        test_date, test_result_id = keyset
+        query = query.filter(tuple_(TestResult.test_date, TestResult.test_result_id) > tuple_(test_date, test_result_id))
+    return query.order_by(TestResult.test_date, TestResult.test_result_id)
 
 @app.get("/patients/test_results/", response_model=List[TestResultResponse])
-async def get_patient_test_results(current_patient: Patient = Depends(get_current_patient), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(TestResult).filter(TestResult.patient_id == current_patient.patient_id))
-    test_results = result.scalars().all()
-    return test_results
+async def get_patient_test_results(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_patient: Patient = Depends(get_current_patient),
+    db: AsyncSession = Depends(get_read_db)
+):
+    keyset = decode_cursor(cursor, (datetime, UUID)) if cursor else None
+    query = patient_test_results_query(current_patient.patient_id, keyset)
+    if stream:
+        async def audit_batch(rows):
+            await audit_log.record(
+                "patient", current_patient.user_id, "test_results.export", [current_patient.patient_id],
+                record_count=len(rows),
+            )
+        return ndjson_response(
+            session_factory_for(db), query.limit(limit) if limit else query, test_result_serializer,
+            on_batch=audit_batch,
+        )
+    patient_id = current_patient.patient_id
+    # Test type names come from the catalog, so its version is part of both the key and the fingerprint
+    cache_key = await response_cache.key(
+        "patient_test_results", patient_id, patient_id, request.query_params.multi_items(),
+        vary=(test_type_catalog.version,),
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        if etag_matches(request, cached.headers["ETag"]):
+            return not_modified(cached.headers)
+        record_count = cached.meta["record_count"]
+        response = cached.response()
+    else:
+        fingerprint = await db.execute(
+            select(func.count(), func.max(TestResult.created_at), func.max(TestResult.updated_at))
+            .filter(TestResult.patient_id == patient_id)
+        )
+        headers = cache_headers("patient_test_results", patient_id, test_type_catalog.version, *fingerprint.one())
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        page_size = limit or DEFAULT_PAGE_SIZE
+        result = await db.execute(query.limit(page_size + 1))
+        test_results = result.mappings().all()
+        if len(test_results) > page_size:
+            test_results = test_results[:page_size]
+            last = test_results[-1]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last["test_date"], last["test_result_id"])
+        record_count = len(test_results)
+        response = test_result_serializer.response(test_result_serializer.rows(test_results), headers)
+        if reads_primary(db):
+            await response_cache.set(cache_key, response.body, headers, {"record_count": record_count})
+    await audit_log.record(
+        "patient", current_patient.user_id, "test_results.read", [patient_id], record_count=record_count,
+    )
+    return response
+
+# Test type catalog management
+async def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+@app.get("/test_types/", response_model=List[TestTypeResponse])
+async def list_test_types(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    await test_type_catalog.refresh_if_stale(db)
+    headers = cache_headers("test_types", test_type_catalog.version)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+    return [entry._asdict() for entry in test_type_catalog.entries()]
+
+@app.post("/test_types/", response_model=TestTypeResponse, status_code=status.HTTP_201_CREATED)
+async def create_test_type(
+    test_type: TestTypeCreate,
+    current_admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    db_test_type = TestType(**test_type.dict())
+    db.add(db_test_type)
+    await bump_catalog_version(db)
+    await db.commit()
+    await db.refresh(db_test_type)
+    test_type_catalog.invalidate()
+    return db_test_type
+
+@app.post("/test_types/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+async def invalidate_test_types(
+    current_admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    await bump_catalog_version(db)
+    await db.commit()
+    test_type_catalog.invalidate()
+
+@app.get("/audit/events", response_model=List[AuditEventResponse])
+async def list_audit_events(
+    patient_id: Optional[UUID] = None,
+    actor_id: Optional[UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    current_admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Newest first; every filter is served by an index on (column, occurred_at) or the BRIN on occurred_at
+    query = select(*AUDIT_EVENT_COLUMNS)
+    if patient_id:
+        query = query.filter(AuditEvent.patient_id == patient_id)
+    if actor_id:
+        query = query.filter(AuditEvent.actor_id == actor_id)
+    if since:
+        query = query.filter(AuditEvent.occurred_at >= as_utc(since))
+    if until:
+        query = query.filter(AuditEvent.occurred_at < as_utc(until))
+    if cursor:
+        occurred_at, event_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(tuple_(AuditEvent.occurred_at, AuditEvent.event_id) < tuple_(occurred_at, event_id))
+    page_size = limit or DEFAULT_PAGE_SIZE
+    result = await db.execute(
+        query.order_by(AuditEvent.occurred_at.desc(), AuditEvent.event_id.desc()).limit(page_size + 1)
+    )
+    events = result.mappings().all()
+    headers = {}
+    if len(events) > page_size:
+        events = events[:page_size]
+        last = events[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["occurred_at"], last["event_id"])
+    return audit_event_serializer.response(audit_event_serializer.rows(events), headers)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/health/hashing")
+async def hashing_stats():
+    return hashing_executor.stats()
+
+@app.get("/health/db")
+async def db_stats():
+    return {**pool_status(engine), **pool_wait_stats.stats(), "reads": read_router.stats()}
+
+@app.get("/health/logging")
+async def logging_stats():
+    return log_pipeline.stats()
+
+@app.get("/health/audit")
+async def audit_log_stats():
+    return audit_log.stats()
+
+@app.get("/health/summaries")
+async def summary_rebuild_stats():
+    return summary_rebuild_job.stats()
+
+@app.get("/health/cache")
+async def cache_stats():
+    return {
+        "principals": principal_cache.stats(),
+        "responses": response_cache.stats(),
+        "test_types": test_type_catalog.stats(),
+        "consents": consent_index.stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(
+        metrics.render() + render_pool(pool_status(engine), pool_wait_stats.stats()),
+        media_type=METRICS_CONTENT_TYPE,
+    )
@@ -0,0 +1,236 @@
+"""Per-route request and database metrics in the Prometheus text format.
+
+MetricsMiddleware gives every HTTP request a RequestStats in a context variable; the
+cursor events installed by instrument_engine and the instrumented pool add the
+request's queries, DB time, rows returned and pool checkout wait to it. When the
+response finishes, the totals are folded into the series for (method, route template,
+status class), so label cardinality is bounded by the route table rather than by URLs.
+
+Recording is a handful of additions per query and per request; histograms are only
+turned into text when /metrics is scraped. All updates happen on the event loop thread.
+"""
+from contextvars import ContextVar
+from bisect import bisect_left
+from sqlalchemy import event
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+UNMATCHED_ROUTE = "unmatched"
+# A guard against label explosion should a route ever be built from request data
+MAX_SERIES = 1000
+OVERFLOW_ROUTE = "other"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "rows", "pool_wait_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+
+
+_current_request = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteSeries:
+    __slots__ = ("duration", "queries", "db_seconds", "rows", "pool_wait_seconds")
+
+    def __init__(self):
+        self.duration = Histogram(REQUEST_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+
+
+class Metrics:
+    def __init__(self):
+        self.series = {}
+        # Every statement, including those run outside a request (background jobs, startup)
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def observe_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        key = (method if method in METHODS else "OTHER", route, f"{status_code // 100}xx")
+        series = self.series.get(key)
+        if series is None:
+            if len(self.series) >= MAX_SERIES:
+                key = (key[0], OVERFLOW_ROUTE, key[2])
+                series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = RouteSeries()
+        series.duration.observe(seconds)
+        series.queries.observe(stats.queries)
+        series.db_seconds += stats.db_seconds
+        series.rows += stats.rows
+        series.pool_wait_seconds += stats.pool_wait_seconds
+
+    def observe_query(self, seconds: float, rows: int) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+            stats.rows += rows
+
+    def reset(self) -> None:
+        self.series.clear()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def render(self) -> str:
+        lines = []
+        labelled = sorted(self.series.items())
+        _histogram(lines, "http_request_duration_seconds", "Request latency by route.",
+                   ((labels, series.duration) for labels, series in labelled))
+        _histogram(lines, "http_request_db_queries", "Database statements per request.",
+                   ((labels, series.queries) for labels, series in labelled))
+        _counter(lines, "http_request_db_seconds_total", "Time spent executing statements for requests.",
+                 ((labels, series.db_seconds) for labels, series in labelled))
+        _counter(lines, "http_request_db_rows_total", "Rows returned by statements for requests.",
+                 ((labels, series.rows) for labels, series in labelled))
+        _counter(lines, "http_request_pool_wait_seconds_total", "Time requests waited for a pooled connection.",
+                 ((labels, series.pool_wait_seconds) for labels, series in labelled))
+        _counter(lines, "db_queries_total", "Statements executed by this process.", [((), self.queries)])
+        _counter(lines, "db_query_seconds_total", "Time spent executing statements.", [((), self.db_seconds)])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+REQUEST_LABELS = ("method", "route", "status")
+
+
+def _header(lines, name, kind, help_text) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _samples(lines, name, kind, help_text, samples, label_names=REQUEST_LABELS) -> None:
+    _header(lines, name, kind, help_text)
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+
+
+def _counter(lines, name, help_text, samples, label_names=REQUEST_LABELS) -> None:
+    _samples(lines, name, "counter", help_text, samples, label_names)
+
+
+def _bucket_label(bound: float) -> str:
+    return 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+
+
+def _histogram(lines, name, help_text, samples, label_names=REQUEST_LABELS) -> None:
+    _header(lines, name, "histogram", help_text)
+    for labels, histogram in samples:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(label_names, labels, _bucket_label(bound))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {histogram.count}")
+
+
+def render_pool(status: dict, wait: dict) -> str:
+    """The primary pool's gauges and checkout wait histogram (from pool_status and PoolWaitStats)."""
+    lines = []
+    for key in ("size", "checked_out", "overflow", "checked_in"):
+        if key in status:
+            _samples(lines, f"db_pool_{key}", "gauge", f"Pool {key.replace('_', ' ')}.", [((), status[key])], ())
+    _header(lines, "db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+    # PoolWaitStats already reports cumulative counts keyed by upper bound
+    for key, cumulative in wait["wait_histogram"].items():
+        lines.append(f"db_pool_checkout_wait_seconds_bucket{{{_bucket_label(float(key[len('le_'):]))}}} {cumulative}")
+    lines.append(f"db_pool_checkout_wait_seconds_sum {wait['total_wait_seconds']}")
+    lines.append(f"db_pool_checkout_wait_seconds_count {wait['checkouts']}")
+    _counter(lines, "db_pool_checkout_timeouts_total", "Checkouts that hit the pool timeout.",
+             [((), wait["timeouts"])], ())
+    return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current_request.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement the engine runs and count the rows it returns."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        # rowcount is the number of rows fetched for statements that return rows
+        rows = cursor.rowcount if cursor.description is not None and cursor.rowcount > 0 else 0
+        metrics.observe_query(seconds, rows)
+
+
+class MetricsMiddleware:
+    """Times each HTTP request and files it, with its DB work, under the matched route template."""
+
+    def __init__(self, app, metrics: Metrics = metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            # The router stores the matched route in the scope; its path is the template
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.metrics.observe_request(scope["method"], route, status_code, time.perf_counter() - start, stats)
@@ -0,0 +1,96 @@
+"""Versioned schema migrations.
+
+Each module in MIGRATIONS is applied once, in order, inside its own transaction and
+recorded in schema_migrations. Run them with ``python -m app.migrations upgrade``;
+the app itself only checks that the database is at HEAD on startup.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.migrations import (
+    m0001_baseline,
+    m0002_hot_path_indexes,
+    m0003_health_summary_counters,
+    m0004_search_indexes,
+    m0005_audit_events,
+    m0006_test_result_values,
+    m0007_dashboard_rollups,
+    m0008_conditional_get,
+    m0009_sync_change_log,
+    m0010_consent_changes,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_hot_path_indexes,
+    m0003_health_summary_counters,
+    m0004_search_indexes,
+    m0005_audit_events,
+    m0006_test_result_values,
+    m0007_dashboard_rollups,
+    m0008_conditional_get,
+    m0009_sync_change_log,
+    m0010_consent_changes,
+]
+HEAD = len(MIGRATIONS)
+
+# Serializes concurrent upgrade runs (e.g. several workers deploying at once)
+MIGRATION_LOCK_ID = 7_310_001
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+async def _ensure_version_table(conn) -> None:
+    await conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER NOT NULL PRIMARY KEY,
+            description VARCHAR NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+        """
+    ))
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        exists = await conn.scalar(text("SELECT to_regclass('schema_migrations') IS NOT NULL"))
+        if not exists:
+            return 0
+        return await conn.scalar(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))
+
+
+async def upgrade(engine: AsyncEngine, target: int = HEAD) -> int:
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        await _ensure_version_table(conn)
+    version = await current_version(engine)
+    for number, migration in enumerate(MIGRATIONS[version:target], start=version + 1):
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            applied = await conn.scalar(
+                text("SELECT count(*) FROM schema_migrations WHERE version = :version"), {"version": number}
+            )
+            if applied:
+                continue
+            logger.info("Applying migration %04d: %s", number, migration.DESCRIPTION)
+            for statement in migration.STATEMENTS:
+                await conn.exec_driver_sql(statement)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": number, "description": migration.DESCRIPTION},
+            )
+    return await current_version(engine)
+
+
+async def check_schema(engine: AsyncEngine) -> None:
+    version = await current_version(engine)
+    if version != HEAD:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, expected {HEAD}; "
+            "run `python -m app.migrations upgrade`"
+        )
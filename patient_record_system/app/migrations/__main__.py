@@ -0,0 +1,22 @@
+import argparse
+import asyncio
+from app.database import engine
+from app.migrations import HEAD, current_version, upgrade
+
+
+async def main(args):
+    try:
+        if args.command == "upgrade":
+            version = await upgrade(engine, args.target)
+            print(f"Database schema at version {version} (head {HEAD})")
+        else:
+            print(f"Database schema at version {await current_version(engine)} (head {HEAD})")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("command", choices=["upgrade", "current"])
+    parser.add_argument("--target", type=int, default=HEAD, help="version to upgrade to")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+# Tables as previously created by Base.metadata.create_all; IF NOT EXISTS adopts those databases
+DESCRIPTION = "baseline schema"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS hospitals (
+        hospital_id UUID NOT NULL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        license_number VARCHAR NOT NULL UNIQUE,
+        address JSON NOT NULL,
+        contact_email VARCHAR,
+        contact_phone VARCHAR,
+        password_hash VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id UUID NOT NULL PRIMARY KEY,
+        email VARCHAR NOT NULL UNIQUE,
+        password_hash VARCHAR NOT NULL,
+        role VARCHAR NOT NULL,
+        hospital_id UUID REFERENCES hospitals (hospital_id),
+        first_name VARCHAR,
+        last_name VARCHAR,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        patient_id UUID NOT NULL PRIMARY KEY,
+        user_id UUID NOT NULL REFERENCES users (user_id),
+        unique_id VARCHAR NOT NULL UNIQUE,
+        dob DATE NOT NULL,
+        gender VARCHAR,
+        contact_phone VARCHAR,
+        emergency_contact JSON,
+        created_by_hospital_id UUID NOT NULL REFERENCES hospitals (hospital_id),
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS test_types (
+        test_type_id UUID NOT NULL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        description VARCHAR,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS test_results (
+        test_result_id UUID NOT NULL PRIMARY KEY,
+        patient_id UUID NOT NULL REFERENCES patients (patient_id),
+        test_type_id UUID NOT NULL REFERENCES test_types (test_type_id),
+        result VARCHAR NOT NULL,
+        test_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        created_by_hospital_id UUID NOT NULL REFERENCES hospitals (hospital_id),
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS consents (
+        consent_id UUID NOT NULL PRIMARY KEY,
+        patient_id UUID REFERENCES patients (patient_id),
+        hospital_id UUID REFERENCES hospitals (hospital_id),
+        user_id UUID REFERENCES users (user_id),
+        access_type VARCHAR(20) NOT NULL,
+        granted_at TIMESTAMP WITH TIME ZONE,
+        expires_at TIMESTAMP WITH TIME ZONE,
+        revoked_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS health_summaries (
+        summary_id UUID NOT NULL PRIMARY KEY,
+        patient_id UUID UNIQUE REFERENCES patients (patient_id),
+        diagnoses JSON,
+        medications JSON,
+        allergies JSON,
+        last_updated TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS notes (
+        note_id UUID NOT NULL PRIMARY KEY,
+        patient_id UUID REFERENCES patients (patient_id),
+        user_id UUID REFERENCES users (user_id),
+        content VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS catalog_versions (
+        name VARCHAR NOT NULL PRIMARY KEY,
+        version INTEGER NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    )
+    """,
+]
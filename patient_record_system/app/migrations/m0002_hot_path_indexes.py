@@ -0,0 +1,13 @@
+# Indexes for the columns the endpoints filter and page on
+DESCRIPTION = "hot path indexes"
+
+INDEXES = {
+    "ix_patients_hospital_unique_id": "patients (created_by_hospital_id, unique_id)",
+    "ix_patients_hospital_created_at": "patients (created_by_hospital_id, created_at, patient_id)",
+    "ix_test_results_patient_test_date": "test_results (patient_id, test_date DESC, test_result_id DESC)",
+    "ix_test_results_created_by_hospital_id": "test_results (created_by_hospital_id)",
+    "ix_consents_patient_id": "consents (patient_id)",
+    "ix_notes_patient_created_at": "notes (patient_id, created_at)",
+}
+
+STATEMENTS = [f"CREATE INDEX IF NOT EXISTS {name} ON {definition}" for name, definition in INDEXES.items()]
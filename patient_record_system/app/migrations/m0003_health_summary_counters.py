@@ -0,0 +1,13 @@
+# Counters and per-test-type latest results kept up to date by app.summary
+DESCRIPTION = "incremental health summary columns"
+
+STATEMENTS = [
+    """
+    ALTER TABLE health_summaries
+        ADD COLUMN IF NOT EXISTS test_result_count INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS latest_results JSONB NOT NULL DEFAULT '{}'::jsonb,
+        ADD COLUMN IF NOT EXISTS last_test_date TIMESTAMP WITHOUT TIME ZONE,
+        ADD COLUMN IF NOT EXISTS note_count INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS last_note_at TIMESTAMP WITH TIME ZONE
+    """,
+]
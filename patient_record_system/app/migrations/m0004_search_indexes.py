@@ -0,0 +1,37 @@
+# Indexes behind GET /hospitals/search. pg_trgm is optional: without it (or without the
+# privilege to create it) name search falls back to the full-text prefix index.
+DESCRIPTION = "search indexes"
+
+STATEMENTS = [
+    """
+    ALTER TABLE notes
+        ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_notes_content_tsv ON notes USING gin (content_tsv)",
+    """
+    CREATE INDEX IF NOT EXISTS ix_users_name_fts ON users
+        USING gin (to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '')))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_patients_hospital_unique_id_prefix ON patients
+        (created_by_hospital_id, unique_id text_pattern_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_patients_hospital_phone_digits ON patients
+        (created_by_hospital_id, regexp_replace(contact_phone, '[^0-9]', '', 'g') text_pattern_ops)
+    """,
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users
+                USING gin ((coalesce(first_name, '') || ' ' || coalesce(last_name, '')) gin_trgm_ops);
+        END IF;
+    EXCEPTION WHEN insufficient_privilege THEN
+        RAISE NOTICE 'pg_trgm unavailable; name search uses full-text prefix matching';
+    END
+    $$
+    """,
+]
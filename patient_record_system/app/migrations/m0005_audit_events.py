@@ -0,0 +1,20 @@
+# Append-only log of reads of patient records, written in batches by app.audit
+DESCRIPTION = "audit events"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS audit_events (
+        event_id BIGINT GENERATED ALWAYS AS IDENTITY NOT NULL,
+        occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        actor_type VARCHAR NOT NULL,
+        actor_id UUID NOT NULL,
+        action VARCHAR NOT NULL,
+        patient_id UUID,
+        record_count INTEGER,
+        PRIMARY KEY (event_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_audit_events_occurred_at ON audit_events USING brin (occurred_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_events_patient_occurred_at ON audit_events (patient_id, occurred_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_events_actor_occurred_at ON audit_events (actor_id, occurred_at)",
+]
@@ -0,0 +1,17 @@
+# Numeric results and their units, parsed by the database for app.analytics. Adding
+# stored generated columns rewrites test_results once, under an exclusive lock.
+DESCRIPTION = "parsed test result values"
+
+STATEMENTS = [
+    """
+    ALTER TABLE test_results
+        ADD COLUMN IF NOT EXISTS result_value DOUBLE PRECISION
+        GENERATED ALWAYS AS (((regexp_match(result, '^[[:space:]]*([-+]?[0-9]{1,15}(?:[.][0-9]{1,15})?(?:[eE][-+]?[0-9]{1,2})?)[[:space:]]*([^[:space:]0-9/.,+-][^[:space:]]{0,31})?[[:space:]]*$'))[1])::double precision) STORED,
+        ADD COLUMN IF NOT EXISTS result_unit VARCHAR
+        GENERATED ALWAYS AS ((regexp_match(result, '^[[:space:]]*([-+]?[0-9]{1,15}(?:[.][0-9]{1,15})?(?:[eE][-+]?[0-9]{1,2})?)[[:space:]]*([^[:space:]0-9/.,+-][^[:space:]]{0,31})?[[:space:]]*$'))[2]) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_test_results_hospital_type_date ON test_results
+        (created_by_hospital_id, test_type_id, test_date) INCLUDE (result_value, result_unit)
+    """,
+]
@@ -0,0 +1,56 @@
+# Dashboard counters maintained on write by app.rollups, backfilled from the source tables
+DESCRIPTION = "dashboard rollups"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS hospital_totals (
+        hospital_id UUID NOT NULL,
+        patient_count BIGINT DEFAULT 0 NOT NULL,
+        test_result_count BIGINT DEFAULT 0 NOT NULL,
+        PRIMARY KEY (hospital_id),
+        FOREIGN KEY(hospital_id) REFERENCES hospitals (hospital_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS patient_registrations_monthly (
+        hospital_id UUID NOT NULL,
+        month DATE NOT NULL,
+        patient_count BIGINT NOT NULL,
+        PRIMARY KEY (hospital_id, month),
+        FOREIGN KEY(hospital_id) REFERENCES hospitals (hospital_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS test_results_daily (
+        hospital_id UUID NOT NULL,
+        day DATE NOT NULL,
+        test_type_id UUID NOT NULL,
+        result_count BIGINT NOT NULL,
+        PRIMARY KEY (hospital_id, day, test_type_id),
+        FOREIGN KEY(hospital_id) REFERENCES hospitals (hospital_id),
+        FOREIGN KEY(test_type_id) REFERENCES test_types (test_type_id)
+    )
+    """,
+    """
+    INSERT INTO hospital_totals (hospital_id, patient_count, test_result_count)
+    SELECT h.hospital_id,
+           (SELECT count(*) FROM patients WHERE created_by_hospital_id = h.hospital_id),
+           (SELECT count(*) FROM test_results WHERE created_by_hospital_id = h.hospital_id)
+    FROM hospitals AS h
+    ON CONFLICT (hospital_id) DO NOTHING
+    """,
+    """
+    INSERT INTO patient_registrations_monthly (hospital_id, month, patient_count)
+    SELECT created_by_hospital_id, date_trunc('month', created_at AT TIME ZONE 'UTC')::date, count(*)
+    FROM patients WHERE created_at IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (hospital_id, month) DO NOTHING
+    """,
+    """
+    INSERT INTO test_results_daily (hospital_id, day, test_type_id, result_count)
+    SELECT created_by_hospital_id, test_date::date, test_type_id, count(*)
+    FROM test_results
+    GROUP BY 1, 2, 3
+    ON CONFLICT (hospital_id, day, test_type_id) DO NOTHING
+    """,
+]
@@ -0,0 +1,9 @@
+# Backs the fingerprint query of the hospital patient list's ETag
+DESCRIPTION = "conditional get"
+
+STATEMENTS = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_patients_hospital_updated_at ON patients
+        (created_by_hospital_id, updated_at)
+    """,
+]
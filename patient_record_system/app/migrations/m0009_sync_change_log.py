@@ -0,0 +1,99 @@
+# Change log behind GET /sync (see app.sync): a row per write of a patient, test result,
+# note or consent, appended by triggers. Existing rows are backfilled as one change each.
+DESCRIPTION = "sync change log"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS changes (
+        change_id BIGSERIAL NOT NULL,
+        hospital_id UUID NOT NULL,
+        entity VARCHAR(20) NOT NULL,
+        entity_id UUID NOT NULL,
+        deleted BOOLEAN DEFAULT false NOT NULL,
+        txid BIGINT DEFAULT (pg_current_xact_id())::text::bigint NOT NULL,
+        changed_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (change_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_changes_hospital_txid ON changes (hospital_id, txid, change_id)",
+    """
+    INSERT INTO changes (hospital_id, entity, entity_id)
+    SELECT created_by_hospital_id, 'patient', patient_id FROM patients
+    WHERE NOT EXISTS (SELECT 1 FROM changes WHERE entity = 'patient')
+    """,
+    """
+    INSERT INTO changes (hospital_id, entity, entity_id)
+    SELECT created_by_hospital_id, 'test_result', test_result_id FROM test_results
+    WHERE NOT EXISTS (SELECT 1 FROM changes WHERE entity = 'test_result')
+    """,
+    """
+    INSERT INTO changes (hospital_id, entity, entity_id)
+    SELECT p.created_by_hospital_id, 'note', n.note_id FROM notes AS n JOIN patients AS p USING (patient_id)
+    WHERE NOT EXISTS (SELECT 1 FROM changes WHERE entity = 'note')
+    """,
+    """
+    INSERT INTO changes (hospital_id, entity, entity_id)
+    SELECT p.created_by_hospital_id, 'consent', c.consent_id FROM consents AS c JOIN patients AS p USING (patient_id)
+    WHERE NOT EXISTS (SELECT 1 FROM changes WHERE entity = 'consent')
+    """,
+    """
+    CREATE OR REPLACE FUNCTION record_patient_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO changes (hospital_id, entity, entity_id, deleted)
+        VALUES (coalesce(NEW.created_by_hospital_id, OLD.created_by_hospital_id), 'patient',
+                coalesce(NEW.patient_id, OLD.patient_id), TG_OP = 'DELETE');
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION record_test_result_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO changes (hospital_id, entity, entity_id, deleted)
+        VALUES (coalesce(NEW.created_by_hospital_id, OLD.created_by_hospital_id), 'test_result',
+                coalesce(NEW.test_result_id, OLD.test_result_id), TG_OP = 'DELETE');
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION record_note_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO changes (hospital_id, entity, entity_id, deleted)
+        SELECT p.created_by_hospital_id, 'note', coalesce(NEW.note_id, OLD.note_id), TG_OP = 'DELETE'
+        FROM patients AS p WHERE p.patient_id = coalesce(NEW.patient_id, OLD.patient_id);
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION record_consent_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO changes (hospital_id, entity, entity_id, deleted)
+        SELECT p.created_by_hospital_id, 'consent', coalesce(NEW.consent_id, OLD.consent_id), TG_OP = 'DELETE'
+        FROM patients AS p WHERE p.patient_id = coalesce(NEW.patient_id, OLD.patient_id);
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS patients_record_change ON patients",
+    """
+    CREATE TRIGGER patients_record_change AFTER INSERT OR UPDATE OR DELETE ON patients
+        FOR EACH ROW EXECUTE FUNCTION record_patient_change()
+    """,
+    "DROP TRIGGER IF EXISTS test_results_record_change ON test_results",
+    """
+    CREATE TRIGGER test_results_record_change AFTER INSERT OR UPDATE OR DELETE ON test_results
+        FOR EACH ROW EXECUTE FUNCTION record_test_result_change()
+    """,
+    "DROP TRIGGER IF EXISTS notes_record_change ON notes",
+    """
+    CREATE TRIGGER notes_record_change AFTER INSERT OR UPDATE OR DELETE ON notes
+        FOR EACH ROW EXECUTE FUNCTION record_note_change()
+    """,
+    "DROP TRIGGER IF EXISTS consents_record_change ON consents",
+    """
+    CREATE TRIGGER consents_record_change AFTER INSERT OR UPDATE OR DELETE ON consents
+        FOR EACH ROW EXECUTE FUNCTION record_consent_change()
+    """,
+]
@@ -0,0 +1,9 @@
+# Lets each worker's consent index read only the consent changes since its last check (see app.consents)
+DESCRIPTION = "consent change index"
+
+STATEMENTS = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_changes_consent_txid ON changes (txid, change_id)
+        WHERE entity = 'consent'
+    """,
+]
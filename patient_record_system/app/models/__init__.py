@@ -6,4 +6,8 @@ from .test_type import TestType
 from .test_result import TestResult
 from .consent import Consent
 from .health_summary import HealthSummary
-from .note import Note
\ No newline at end of file
+from .note import Note
+from .catalog_version import CatalogVersion
+from .audit_event import AuditEvent
+from .rollups import HospitalTotals, PatientRegistrationsMonthly, TestResultsDaily
+from .change import Change
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+class AuditEvent(Base):
+    """One read of protected health information; rows are only ever appended, by app.audit."""
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        # Rows arrive in time order, so a BRIN index covers time-range scans at a tiny size
+        Index("ix_audit_events_occurred_at", "occurred_at", postgresql_using="brin"),
+        Index("ix_audit_events_patient_occurred_at", "patient_id", "occurred_at"),
+        Index("ix_audit_events_actor_occurred_at", "actor_id", "occurred_at"),
+    )
+    event_id = Column(BigInteger, Identity(always=True), primary_key=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    actor_type = Column(String, nullable=False)
+    actor_id = Column(UUID(as_uuid=True), nullable=False)
+    action = Column(String, nullable=False)
+    # No foreign key: the log must outlive, and never block changes to, the records it mentions
+    patient_id = Column(UUID(as_uuid=True))
+    record_count = Column(Integer)
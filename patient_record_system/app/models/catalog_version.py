@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from app.models.base import Base
+from sqlalchemy.sql import func
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, String, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+from sqlalchemy.sql import func
+
+class Change(Base):
+    # Appended by the triggers of migration 0009 on every write of a patient, test result,
+    # note or consent; there is no ORM write path
+    __tablename__ = "changes"
+    change_id = Column(BigInteger, primary_key=True)
+    # No foreign keys: rows outlive what they describe, as tombstones
+    hospital_id = Column(UUID(as_uuid=True), nullable=False)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted = Column(Boolean, nullable=False, server_default=text("false"))
+    # The writing transaction; app.sync orders by it to never skip a late commit
+    txid = Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id())::text::bigint"))
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+Index("ix_changes_hospital_txid", Change.hospital_id, Change.txid, Change.change_id)
+Index("ix_changes_consent_txid", Change.txid, Change.change_id, postgresql_where=Change.entity == "consent")
@@ -7,7 +7,7 @@ import uuid
 class Consent(Base):
     __tablename__ = "consents"
     consent_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.patient_id"))
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.patient_id"), index=True)
     hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"))
     access_type = Column(String(20), nullable=False)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, JSON, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, JSON, DateTime, ForeignKey, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.models.base import Base
 from datetime import datetime
 import uuid
@@ -11,4 +11,10 @@ class HealthSummary(Base):
     diagnoses = Column(JSON)
     medications = Column(JSON)
     allergies = Column(JSON)
-    last_updated = Column(DateTime(timezone=True), default=datetime.utcnow)
\ No newline at end of file
+    last_updated = Column(DateTime(timezone=True), default=datetime.utcnow)
+    # Maintained incrementally by app.summary, which also advances last_updated
+    test_result_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    latest_results = Column(JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb"))
+    last_test_date = Column(DateTime)
+    note_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    last_note_at = Column(DateTime(timezone=True))
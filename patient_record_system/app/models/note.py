@@ -1,13 +1,18 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Computed, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from app.models.base import Base
 from datetime import datetime
 import uuid
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_patient_created_at", "patient_id", "created_at"),
+        Index("ix_notes_content_tsv", "content_tsv", postgresql_using="gin"),
+    )
     note_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.patient_id"))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"))
     content = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    content_tsv = Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True))
\ No newline at end of file
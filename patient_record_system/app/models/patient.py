@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, String, Date, JSON, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 from datetime import datetime
@@ -7,6 +7,23 @@ import uuid
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_hospital_unique_id", "created_by_hospital_id", "unique_id"),
+        Index("ix_patients_hospital_created_at", "created_by_hospital_id", "created_at", "patient_id"),
+        # max(updated_at) per hospital for the patient list's ETag
+        Index("ix_patients_hospital_updated_at", "created_by_hospital_id", "updated_at"),
+        Index(
+            "ix_patients_hospital_unique_id_prefix",
+            "created_by_hospital_id",
+            "unique_id",
+            postgresql_ops={"unique_id": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_patients_hospital_phone_digits",
+            "created_by_hospital_id",
+            text("regexp_replace(contact_phone, '[^0-9]', '', 'g') text_pattern_ops"),
+        ),
+    )
     patient_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False)
     unique_id = Column(String, unique=True, nullable=False)
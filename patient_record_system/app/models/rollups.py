@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+# Dashboard counters maintained on write by app.rollups; every row is a sum of deltas
+
+class HospitalTotals(Base):
+    __tablename__ = "hospital_totals"
+    hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"), primary_key=True)
+    patient_count = Column(BigInteger, nullable=False, default=0, server_default=text("0"))
+    test_result_count = Column(BigInteger, nullable=False, default=0, server_default=text("0"))
+
+class PatientRegistrationsMonthly(Base):
+    __tablename__ = "patient_registrations_monthly"
+    hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"), primary_key=True)
+    # First day of the month, in UTC
+    month = Column(Date, primary_key=True)
+    patient_count = Column(BigInteger, nullable=False)
+
+class TestResultsDaily(Base):
+    __tablename__ = "test_results_daily"
+    hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    test_type_id = Column(UUID(as_uuid=True), ForeignKey("test_types.test_type_id"), primary_key=True)
+    result_count = Column(BigInteger, nullable=False)
@@ -1,10 +1,18 @@
-from sqlalchemy import Column, String, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Computed, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 from datetime import datetime
 from sqlalchemy.sql import func
 import uuid
 
+# "5.4 mmol/L", "7", "98 %": a plain number, optionally followed by a single unit token.
+# Ranges, ratios ("120/80"), comparators ("<0.5") and words are left unparsed. Digits
+# are bounded so the cast to double precision can never overflow and fail the insert.
+NUMERIC_RESULT_PATTERN = (
+    r"^[[:space:]]*([-+]?[0-9]{1,15}(?:[.][0-9]{1,15})?(?:[eE][-+]?[0-9]{1,2})?)[[:space:]]*"
+    r"([^[:space:]0-9/.,+-][^[:space:]]{0,31})?[[:space:]]*$"
+)
+
 class TestResult(Base):
     __tablename__ = "test_results"
     test_result_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -12,6 +20,30 @@ class TestResult(Base):
     test_type_id = Column(UUID(as_uuid=True), ForeignKey("test_types.test_type_id"), nullable=False)
     result = Column(String, nullable=False)
     test_date = Column(DateTime, nullable=False)
-    created_by_hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"), nullable=False)
+    created_by_hospital_id = Column(UUID(as_uuid=True), ForeignKey("hospitals.hospital_id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Parsed by the database on every write, whichever path the row came in by
+    result_value = Column(
+        Float(precision=53),
+        Computed(f"((regexp_match(result, '{NUMERIC_RESULT_PATTERN}'))[1])::double precision", persisted=True),
+    )
+    result_unit = Column(
+        String,
+        Computed(f"(regexp_match(result, '{NUMERIC_RESULT_PATTERN}'))[2]", persisted=True),
+    )
+
+Index(
+    "ix_test_results_patient_test_date",
+    TestResult.patient_id,
+    TestResult.test_date.desc(),
+    TestResult.test_result_id.desc(),
+)
+# Analytics read a (hospital, test type) slice with an index-only scan
+Index(
+    "ix_test_results_hospital_type_date",
+    TestResult.created_by_hospital_id,
+    TestResult.test_type_id,
+    TestResult.test_date,
+    postgresql_include=["result_value", "result_unit"],
+)
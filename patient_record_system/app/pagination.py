@@ -0,0 +1,53 @@
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from uuid import UUID
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else str(v) for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: tuple) -> tuple:
+    """Decode an opaque cursor back into typed keyset values, e.g. (datetime, UUID)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for type_, value in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def ndjson_response(session_factory, query, serializer, batch_size: int = STREAM_BATCH_SIZE,
+                    on_batch=None) -> StreamingResponse:
+    """Stream column rows as NDJSON from a server-side cursor, one batch in memory at a time.
+
+    on_batch, if given, is awaited with each batch of row mappings before it is sent; an
+    exception from it ends the stream there.
+    """
+    async def rows():
+        # The request's session may be closed before the body is sent, so the stream owns its own
+        async with session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            async for partition in result.mappings().partitions():
+                if on_batch is not None:
+                    await on_batch(partition)
+                yield serializer.render_lines(serializer.rows(partition))
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
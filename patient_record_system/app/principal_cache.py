@@ -0,0 +1,101 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models import CatalogVersion
+from collections import OrderedDict
+from threading import Lock
+import time
+
+PRINCIPALS_CATALOG = "principals"
+
+
+class PrincipalCache:
+    """LRU + TTL cache for authenticated principals keyed by (token type, subject).
+
+    invalidate() only reaches this worker's copy. A write that changes a principal also
+    bumps the principals catalog_versions row, which every worker checks at most once per
+    check_seconds and then drops all of its entries; other workers serve the old
+    principal for at most that long.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0, check_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, principal_type: str, subject: str):
+        if not self.enabled:
+            return None
+        key = (principal_type, str(subject))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def set(self, principal_type: str, subject: str, principal) -> None:
+        if not self.enabled:
+            return
+        key = (principal_type, str(subject))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        if not self.enabled or time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        # Claimed before the query so concurrent requests do not all check
+        self._checked_at = time.monotonic()
+        result = await db.execute(
+            select(CatalogVersion.version).filter(CatalogVersion.name == PRINCIPALS_CATALOG)
+        )
+        version = result.scalar() or 0
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def invalidate(self, principal_type: str, subject) -> None:
+        with self._lock:
+            if self._entries.pop((principal_type, str(subject)), None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
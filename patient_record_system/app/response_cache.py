@@ -0,0 +1,286 @@
+"""Cache of rendered JSON responses for read-heavy list endpoints.
+
+An entry is keyed by route, invalidation scope, principal and query string. Each
+(route, scope) pair has a generation counter that is part of the key; a write bumps
+the generation of every scope it changes, so the old entries are never read again and
+age out of the backend. A handler computes its key before it queries, so a page read
+concurrently with a write is stored under the generation it was read at. Pages read
+from a replica are served but never stored: the replica may not have applied the write
+that bumped the generation, and a stale entry would outlive the read-your-writes window.
+
+A write bumps its scopes BUMP_BATCH_SIZE at a time, one backend call (one Redis round
+trip) per batch, so a bulk write that touches many patients does not wait on a round
+trip per patient. A generation counter expires once it has been neither read nor bumped for
+generation_ttl_seconds, which is longer than any entry keyed by it can live, so the
+counters of idle scopes go away and one that restarts at zero never meets an entry
+from its previous run.
+
+MemoryBackend keeps entries in-process, in LRU order, bounded by their total size in
+bytes. Its invalidations are seen only by the worker that made them, so with several
+workers use RedisBackend (RESPONSE_CACHE_BACKEND=redis, needs the redis package) or a
+short ttl_seconds. A failing backend is counted and treated as a miss; it never fails
+the request.
+"""
+from fastapi import Response
+from app.serialization import dumps
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Iterable, List, Optional
+import hashlib
+import logging
+import orjson
+import time
+
+logger = logging.getLogger(__name__)
+
+BUMP_BATCH_SIZE = 1000
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # key -> (generation, expires_at), ordered by last use so expired ones are at the front
+        self._generations = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    async def generation(self, key: str, ttl_seconds: float) -> int:
+        with self._lock:
+            entry = self._generations.pop(key, None)
+            if entry is None or entry[1] <= time.monotonic():
+                return 0
+            self._generations[key] = (entry[0], time.monotonic() + ttl_seconds)
+            return entry[0]
+
+    async def bump_many(self, keys: List[str], ttl_seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            while self._generations:
+                key, (_, expires_at) = next(iter(self._generations.items()))
+                if expires_at > now:
+                    break
+                del self._generations[key]
+            for key in keys:
+                generation, _ = self._generations.pop(key, (0, 0.0))
+                self._generations[key] = (generation + 1, now + ttl_seconds)
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._entries),
+                "generations": len(self._generations),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class RedisBackend:
+    """Shared by every worker; client is a redis.asyncio client or anything with its get/getex/set/pipeline."""
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package") from e
+        return cls(redis.asyncio.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self.client.set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def generation(self, key: str, ttl_seconds: float) -> int:
+        return int(await self.client.getex(key, px=max(1, int(ttl_seconds * 1000))) or 0)
+
+    async def bump_many(self, keys: List[str], ttl_seconds: float) -> None:
+        ttl_ms = max(1, int(ttl_seconds * 1000))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(key)
+                pipe.pexpire(key, ttl_ms)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None)
+        if close is not None:
+            await close()
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: dict
+    # Whatever the handler needs to serve a hit without querying, e.g. the ids to audit
+    meta: dict = field(default_factory=dict)
+
+    def response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl_seconds: float = 30.0, max_entry_bytes: int = 1024 * 1024,
+                 namespace: str = "responses"):
+        # No backend disables the cache: key() returns None and every lookup misses
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self.namespace = namespace
+        # Longer than an entry can outlive the last read of its generation
+        self.generation_ttl_seconds = ttl_seconds * 2 + 60
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.too_large = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl_seconds > 0
+
+    def _generation_key(self, route: str, scope) -> str:
+        return f"{self.namespace}:gen:{route}:{scope}"
+
+    async def key(self, route: str, scope, principal=None, query: Iterable = (), vary: tuple = ()) -> Optional[str]:
+        """Key for one response of route; principal is None only when every caller gets the same body."""
+        if not self.enabled:
+            return None
+        try:
+            generation = await self.backend.generation(
+                self._generation_key(route, scope), self.generation_ttl_seconds
+            )
+        except Exception:
+            self._failed("generation lookup")
+            return None
+        digest = hashlib.blake2b(
+            repr((str(principal), sorted(query), vary)).encode(), digest_size=16
+        ).hexdigest()
+        return f"{self.namespace}:{route}:{scope}:{generation}:{digest}"
+
+    async def get(self, key: Optional[str]) -> Optional[CachedResponse]:
+        if key is None:
+            return None
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            self._failed("get")
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        envelope, _, body = value.partition(b"\n")
+        envelope = orjson.loads(envelope)
+        return CachedResponse(body, envelope["headers"], envelope["meta"])
+
+    async def set(self, key: Optional[str], body: bytes, headers: Optional[dict] = None,
+                  meta: Optional[dict] = None) -> None:
+        if key is None:
+            return
+        if len(body) > self.max_entry_bytes:
+            self.too_large += 1
+            return
+        value = dumps({"headers": headers or {}, "meta": meta or {}}) + b"\n" + body
+        try:
+            await self.backend.set(key, value, self.ttl_seconds)
+        except Exception:
+            self._failed("set")
+            return
+        self.stores += 1
+
+    async def invalidate(self, route: str, *scopes) -> None:
+        """Drop every cached response of route for the given scopes; call after the write commits."""
+        if not self.enabled:
+            return
+        keys = [self._generation_key(route, scope) for scope in scopes]
+        for start in range(0, len(keys), BUMP_BATCH_SIZE):
+            batch = keys[start:start + BUMP_BATCH_SIZE]
+            try:
+                await self.backend.bump_many(batch, self.generation_ttl_seconds)
+            except Exception:
+                # Stale entries for these scopes live out their ttl
+                self._failed("invalidate")
+                continue
+            self.invalidations += len(batch)
+
+    def _failed(self, operation: str) -> None:
+        self.errors += 1
+        logger.warning("Response cache %s failed", operation, exc_info=True)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **(self.backend.stats() if self.backend is not None else {"backend": None}),
+            "ttl_seconds": self.ttl_seconds,
+            "max_entry_bytes": self.max_entry_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "too_large": self.too_large,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def create_response_cache(backend: str, ttl_seconds: float, max_bytes: int, max_entry_bytes: int,
+                          redis_url: Optional[str] = None) -> ResponseCache:
+    if backend == "memory":
+        return ResponseCache(MemoryBackend(max_bytes), ttl_seconds, max_entry_bytes)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("RESPONSE_CACHE_REDIS_URL is required when RESPONSE_CACHE_BACKEND=redis")
+        return ResponseCache(RedisBackend.from_url(redis_url), ttl_seconds, max_entry_bytes)
+    if backend == "off":
+        return ResponseCache(None, ttl_seconds, max_entry_bytes)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {backend!r}; expected memory, redis or off")
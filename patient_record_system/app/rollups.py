@@ -0,0 +1,231 @@
+"""Dashboard rollups maintained on write.
+
+hospital_totals, patient_registrations_monthly and test_results_daily hold counts that
+would otherwise need full scans of patients and test_results. Every write that adds
+patients or test results updates them in its own transaction, either by attaching the
+*_for_inserted statements as CTEs or by calling apply_* with the inserted rows. Reads
+are then primary key lookups and range scans whose cost does not grow with the tables.
+
+Writers always update a hospital's totals row before its detail rows. rebuild_rollups
+locks the totals row first, so a rebuild and concurrent deltas serialize per hospital.
+
+    python -m app.rollups rebuild [--hospital-id ID ...]
+"""
+from sqlalchemy import Date, cast, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
+from app.models import Hospital, HospitalTotals, PatientRegistrationsMonthly, TestResultsDaily
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+import argparse
+import asyncio
+
+
+def _add_counts(stmt, model, count_column: str):
+    """Upsert that adds the incoming count to the stored one."""
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in model.__table__.primary_key],
+        set_={count_column: getattr(model, count_column) + getattr(stmt.excluded, count_column)},
+    )
+
+
+def _registration_month(created_at: datetime) -> date:
+    return created_at.astimezone(timezone.utc).date().replace(day=1)
+
+
+def _result_day(test_date) -> date:
+    return test_date.date() if isinstance(test_date, datetime) else test_date
+
+
+def patient_rollups_for_inserted(inserted) -> list:
+    """Statements that count `inserted`, a CTE of new patients rows; attach them in this order."""
+    hospital_id = inserted.c.created_by_hospital_id
+    month = cast(func.date_trunc("month", func.timezone("UTC", inserted.c.created_at)), Date)
+    totals = pg_insert(HospitalTotals).from_select(
+        ["hospital_id", "patient_count"],
+        select(hospital_id, func.count()).group_by(hospital_id),
+        include_defaults=False,
+    )
+    monthly = pg_insert(PatientRegistrationsMonthly).from_select(
+        ["hospital_id", "month", "patient_count"],
+        select(hospital_id, month, func.count()).group_by(hospital_id, month),
+    )
+    return [
+        _add_counts(totals, HospitalTotals, "patient_count"),
+        _add_counts(monthly, PatientRegistrationsMonthly, "patient_count"),
+    ]
+
+
+def test_result_rollups_for_inserted(inserted) -> list:
+    """Statements that count `inserted`, a CTE of new test_results rows; attach them in this order."""
+    hospital_id = inserted.c.created_by_hospital_id
+    day = cast(inserted.c.test_date, Date)
+    totals = pg_insert(HospitalTotals).from_select(
+        ["hospital_id", "test_result_count"],
+        select(hospital_id, func.count()).group_by(hospital_id),
+        include_defaults=False,
+    )
+    daily = pg_insert(TestResultsDaily).from_select(
+        ["hospital_id", "day", "test_type_id", "result_count"],
+        select(hospital_id, day, inserted.c.test_type_id, func.count())
+        .group_by(hospital_id, day, inserted.c.test_type_id),
+    )
+    return [
+        _add_counts(totals, HospitalTotals, "test_result_count"),
+        _add_counts(daily, TestResultsDaily, "result_count"),
+    ]
+
+
+async def apply_patient_registrations(db, patients: Iterable[dict]) -> None:
+    """Count newly inserted patients (created_by_hospital_id, created_at); runs in the caller's transaction."""
+    months = Counter((p["created_by_hospital_id"], _registration_month(p["created_at"])) for p in patients)
+    if not months:
+        return
+    totals = Counter()
+    for (hospital_id, _), count in months.items():
+        totals[hospital_id] += count
+    # Sorted so concurrent writers lock rollup rows in the same order
+    await db.execute(_add_counts(pg_insert(HospitalTotals).values([
+        {"hospital_id": hospital_id, "patient_count": count} for hospital_id, count in sorted(totals.items())
+    ]), HospitalTotals, "patient_count"))
+    await db.execute(_add_counts(pg_insert(PatientRegistrationsMonthly).values([
+        {"hospital_id": hospital_id, "month": month, "patient_count": count}
+        for (hospital_id, month), count in sorted(months.items())
+    ]), PatientRegistrationsMonthly, "patient_count"))
+
+
+async def apply_test_result_counts(db, results: Iterable[dict]) -> None:
+    """Count newly inserted test results (created_by_hospital_id, test_type_id, test_date); runs in the caller's transaction."""
+    days = Counter(
+        (r["created_by_hospital_id"], _result_day(r["test_date"]), r["test_type_id"]) for r in results
+    )
+    if not days:
+        return
+    totals = Counter()
+    for (hospital_id, _, _), count in days.items():
+        totals[hospital_id] += count
+    await db.execute(_add_counts(pg_insert(HospitalTotals).values([
+        {"hospital_id": hospital_id, "test_result_count": count} for hospital_id, count in sorted(totals.items())
+    ]), HospitalTotals, "test_result_count"))
+    await db.execute(_add_counts(pg_insert(TestResultsDaily).values([
+        {"hospital_id": hospital_id, "day": day, "test_type_id": test_type_id, "result_count": count}
+        for (hospital_id, day, test_type_id), count in sorted(days.items())
+    ]), TestResultsDaily, "result_count"))
+
+
+# Recompute one hospital's rollups from the source tables; only rows that drifted are written
+REBUILD_STATEMENTS = [
+    text(
+        """
+        WITH fresh AS (
+            SELECT date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month, count(*) AS patient_count
+            FROM patients WHERE created_by_hospital_id = CAST(:hospital_id AS uuid) AND created_at IS NOT NULL
+            GROUP BY 1
+        ), upserted AS (
+            INSERT INTO patient_registrations_monthly (hospital_id, month, patient_count)
+            SELECT CAST(:hospital_id AS uuid), month, patient_count FROM fresh
+            ON CONFLICT (hospital_id, month) DO UPDATE SET patient_count = excluded.patient_count
+            WHERE patient_registrations_monthly.patient_count <> excluded.patient_count
+            RETURNING 1
+        ), deleted AS (
+            DELETE FROM patient_registrations_monthly AS r
+            WHERE r.hospital_id = CAST(:hospital_id AS uuid)
+              AND NOT EXISTS (SELECT 1 FROM fresh WHERE fresh.month = r.month)
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM upserted) + (SELECT count(*) FROM deleted)
+        """
+    ),
+    text(
+        """
+        WITH fresh AS (
+            SELECT test_date::date AS day, test_type_id, count(*) AS result_count
+            FROM test_results WHERE created_by_hospital_id = CAST(:hospital_id AS uuid)
+            GROUP BY 1, 2
+        ), upserted AS (
+            INSERT INTO test_results_daily (hospital_id, day, test_type_id, result_count)
+            SELECT CAST(:hospital_id AS uuid), day, test_type_id, result_count FROM fresh
+            ON CONFLICT (hospital_id, day, test_type_id) DO UPDATE SET result_count = excluded.result_count
+            WHERE test_results_daily.result_count <> excluded.result_count
+            RETURNING 1
+        ), deleted AS (
+            DELETE FROM test_results_daily AS r
+            WHERE r.hospital_id = CAST(:hospital_id AS uuid) AND NOT EXISTS (
+                SELECT 1 FROM fresh WHERE fresh.day = r.day AND fresh.test_type_id = r.test_type_id
+            )
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM upserted) + (SELECT count(*) FROM deleted)
+        """
+    ),
+    text(
+        """
+        WITH fresh AS (
+            SELECT (SELECT count(*) FROM patients WHERE created_by_hospital_id = CAST(:hospital_id AS uuid)) AS patient_count,
+                   (SELECT count(*) FROM test_results WHERE created_by_hospital_id = CAST(:hospital_id AS uuid)) AS test_result_count
+        ), updated AS (
+            UPDATE hospital_totals AS t
+            SET patient_count = fresh.patient_count, test_result_count = fresh.test_result_count
+            FROM fresh
+            WHERE t.hospital_id = CAST(:hospital_id AS uuid)
+              AND (t.patient_count, t.test_result_count) IS DISTINCT FROM (fresh.patient_count, fresh.test_result_count)
+            RETURNING 1
+        )
+        SELECT count(*) FROM updated
+        """
+    ),
+]
+
+
+async def _rebuild_hospital(session_factory, hospital_id) -> int:
+    async with session_factory() as db:
+        async with db.begin():
+            # Every writer updates this row first, so holding it waits out in-flight deltas
+            # (their rows are then visible below) and holds back new ones until we commit
+            await db.execute(
+                pg_insert(HospitalTotals).values(hospital_id=hospital_id)
+                .on_conflict_do_nothing(index_elements=[HospitalTotals.hospital_id])
+            )
+            await db.execute(
+                select(HospitalTotals.hospital_id).filter(HospitalTotals.hospital_id == hospital_id).with_for_update()
+            )
+            repaired = 0
+            for statement in REBUILD_STATEMENTS:
+                repaired += await db.scalar(statement, {"hospital_id": hospital_id})
+            return repaired
+
+
+async def rebuild_rollups(session_factory, hospital_ids: Optional[list] = None) -> dict:
+    """Recompute rollups for hospital_ids (default: every hospital), one transaction per hospital."""
+    if hospital_ids is None:
+        async with session_factory() as db:
+            result = await db.execute(select(Hospital.hospital_id).order_by(Hospital.hospital_id))
+            hospital_ids = list(result.scalars().all())
+    repaired = 0
+    for hospital_id in sorted(set(hospital_ids)):
+        repaired += await _rebuild_hospital(session_factory, hospital_id)
+    return {"hospitals": len(set(hospital_ids)), "repaired": repaired}
+
+
+async def main(args):
+    from app.database import engine
+
+    try:
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        hospital_ids = [UUID(value) for value in args.hospital_id] if args.hospital_id else None
+        result = await rebuild_rollups(session_factory, hospital_ids)
+        print(f"Rebuilt rollups for {result['hospitals']} hospitals, {result['repaired']} rows repaired")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--hospital-id", action="append", help="rebuild only these hospitals (repeatable)")
+    asyncio.run(main(parser.parse_args()))
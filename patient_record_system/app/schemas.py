@@ -67,6 +67,9 @@ class TestResultCreate(BaseModel):
     result: str
     test_date: date
 
+class TestResultBulkCreate(TestResultCreate):
+    patient_id: str
+
 class TestResultResponse(BaseModel):
     test_result_id: str
     patient_id: str
@@ -0,0 +1,148 @@
+"""Ranked search over a hospital's patients and their clinical notes.
+
+Every kind of match is a separate UNION ALL branch so each one can use its own index
+(migration 0004):
+
+- unique_id prefix: btree text_pattern_ops on (created_by_hospital_id, unique_id)
+- phone digits prefix: btree on (created_by_hospital_id, digits of contact_phone)
+- name: pg_trgm similarity when the trigram index exists, otherwise prefix terms
+  against the full-text index on first_name || last_name
+- note text: the GIN index on notes.content_tsv, ranked with ts_rank
+
+A patient matched by several branches keeps its best score. Only the newest
+NOTE_CANDIDATES notes matching a query are ranked (ties broken by note_id, so the set
+is the same on every page), which keeps common words from costing ts_rank over a large
+share of the table. Index expressions are written out
+literally (not as bound parameters) so the planner can match them.
+"""
+from sqlalchemy import Float, String, cast, literal, literal_column, text, tuple_, union_all
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import Note, Patient, User
+from typing import Optional
+from uuid import UUID
+import re
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+MIN_PHONE_DIGITS = 3
+NOTE_CANDIDATES = 1000
+
+UNIQUE_ID_SCORE = 1.0
+PHONE_SCORE = 0.9
+
+NAME_EXPRESSION = "coalesce(users.first_name, '') || ' ' || coalesce(users.last_name, '')"
+NAME_VECTOR = f"to_tsvector('simple', {NAME_EXPRESSION})"
+PHONE_DIGITS = "regexp_replace(patients.contact_phone, '[^0-9]', '', 'g')"
+
+
+def _like_prefix(value: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", value) + "%"
+
+
+def _prefix_tsquery(q: str) -> Optional[str]:
+    # "jan smi" -> "jan:* & smi:*"; only word characters reach to_tsquery
+    terms = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{term}:*" for term in terms) if terms else None
+
+
+class PatientSearch:
+    def __init__(self):
+        self.trigram = False
+
+    async def detect(self, db) -> None:
+        """Use trigram name matching only if migration 0004 managed to create its index."""
+        result = await db.execute(text("SELECT to_regclass('ix_users_name_trgm') IS NOT NULL"))
+        self.trigram = bool(result.scalar())
+
+    def _hit(self, kind: str, hit_id, patient_id, score):
+        return select(
+            literal(kind, String).label("kind"),
+            hit_id.label("hit_id"),
+            patient_id.label("patient_id"),
+            cast(score, Float).label("score"),
+        )
+
+    def _patient_branches(self, hospital_id: UUID, q: str) -> list:
+        owned = Patient.created_by_hospital_id == hospital_id
+        branches = [
+            self._hit("patient", Patient.patient_id, Patient.patient_id, literal(UNIQUE_ID_SCORE))
+            .filter(owned, Patient.unique_id.like(_like_prefix(q), escape="\\")),
+        ]
+        digits = re.sub(r"\D", "", q)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            branches.append(
+                self._hit("patient", Patient.patient_id, Patient.patient_id, literal(PHONE_SCORE))
+                .filter(owned, literal_column(PHONE_DIGITS).like(_like_prefix(digits), escape="\\"))
+            )
+        name = literal_column(NAME_EXPRESSION)
+        if self.trigram:
+            name_score, name_match = func.similarity(name, q), name.op("%")(q)
+        else:
+            prefix_query = _prefix_tsquery(q)
+            if prefix_query is not None:
+                tsquery = func.to_tsquery(literal_column("'simple'"), prefix_query)
+                name_score = func.ts_rank(literal_column(NAME_VECTOR), tsquery)
+                name_match = literal_column(NAME_VECTOR).op("@@")(tsquery)
+            else:
+                name_match = None
+        if name_match is not None:
+            branches.append(
+                self._hit("patient", Patient.patient_id, Patient.patient_id, name_score)
+                .select_from(User)
+                .join(Patient, Patient.user_id == User.user_id)
+                .filter(owned, name_match)
+            )
+        return branches
+
+    def _note_hits(self, hospital_id: UUID, q: str):
+        note_query = func.websearch_to_tsquery(literal_column("'english'"), q)
+        # Common terms can match a large share of all notes; only rank the newest candidates
+        candidates = (
+            select(Note.note_id, Note.patient_id, Note.content_tsv)
+            .join(Patient, Patient.patient_id == Note.patient_id)
+            .filter(Patient.created_by_hospital_id == hospital_id, Note.content_tsv.op("@@")(note_query))
+            .order_by(Note.created_at.desc(), Note.note_id)
+            .limit(NOTE_CANDIDATES)
+            .subquery("candidates")
+        )
+        return self._hit(
+            "note", candidates.c.note_id, candidates.c.patient_id, func.ts_rank(candidates.c.content_tsv, note_query)
+        )
+
+    def query(self, hospital_id: UUID, q: str, cursor: Optional[tuple] = None, limit: int = SEARCH_DEFAULT_LIMIT):
+        """Best-first hits for q, one row per patient or note; cursor is the last (score, kind, hit_id)."""
+        patient_hits = union_all(*self._patient_branches(hospital_id, q)).subquery("patient_hits")
+        hits = union_all(
+            select(
+                patient_hits.c.kind,
+                patient_hits.c.hit_id,
+                patient_hits.c.patient_id,
+                func.max(patient_hits.c.score).label("score"),
+            ).group_by(patient_hits.c.kind, patient_hits.c.hit_id, patient_hits.c.patient_id),
+            self._note_hits(hospital_id, q),
+        ).subquery("hits")
+        page = select(hits)
+        if cursor is not None:
+            page = page.filter(tuple_(hits.c.score, hits.c.kind, hits.c.hit_id) < tuple_(*cursor))
+        page = page.order_by(hits.c.score.desc(), hits.c.kind.desc(), hits.c.hit_id.desc()).limit(limit).subquery("page")
+        # Names and snippets are only fetched for the rows on this page
+        note_query = func.websearch_to_tsquery(literal_column("'english'"), q)
+        return (
+            select(
+                page.c.kind,
+                page.c.hit_id,
+                page.c.patient_id,
+                page.c.score,
+                Patient.unique_id,
+                User.first_name,
+                User.last_name,
+                Patient.contact_phone,
+                func.ts_headline(literal_column("'english'"), Note.content, note_query).label("snippet"),
+            )
+            .select_from(page)
+            .join(Patient, Patient.patient_id == page.c.patient_id)
+            .outerjoin(User, User.user_id == Patient.user_id)
+            .outerjoin(Note, (page.c.kind == "note") & (Note.note_id == page.c.hit_id))
+            .order_by(page.c.score.desc(), page.c.kind.desc(), page.c.hit_id.desc())
+        )
@@ -0,0 +1,320 @@
+"""Incrementally maintained health summaries.
+
+Writes that add test results or notes call apply_test_results / apply_note in their own
+transaction. Those apply a delta to the patient's health_summaries row with a single
+upsert, so reading a summary is one indexed row lookup however long the history is.
+
+rebuild_summaries recomputes the same columns from the source tables to repair drift
+(rows written outside the API, failed deltas); SummaryRebuildJob runs it periodically.
+"""
+from sqlalchemy import String, cast, literal, text
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
+from app.models import HealthSummary, Patient
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID, uuid4
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_REBUILD_BATCH_SIZE = 500
+
+# Only one worker rebuilds at a time
+SUMMARY_REBUILD_LOCK_ID = 7_310_002
+
+
+def _as_timestamp(value) -> datetime:
+    # test_date is accepted as a date but stored as a timestamp
+    return value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+
+
+def _latest_entry(result, test_date: datetime) -> dict:
+    # Same shape and timestamp format as the jsonb built by REBUILD_SQL, so entries compare as strings
+    return {
+        "test_result_id": str(result["test_result_id"]),
+        "result": result["result"],
+        "test_date": test_date.isoformat(timespec="microseconds"),
+    }
+
+
+def _is_newer(entry: dict, other: dict) -> bool:
+    return (entry["test_date"], entry["test_result_id"]) > (other["test_date"], other["test_result_id"])
+
+
+# Keep the incoming latest result for a test type only if it is newer than the stored one
+MERGE_LATEST_RESULTS = text(
+    """
+    health_summaries.latest_results || coalesce((
+        SELECT jsonb_object_agg(incoming.key, incoming.value)
+        FROM jsonb_each(excluded.latest_results) AS incoming
+        WHERE NOT health_summaries.latest_results ? incoming.key
+           OR (incoming.value ->> 'test_date', incoming.value ->> 'test_result_id')
+              > (health_summaries.latest_results -> incoming.key ->> 'test_date',
+                 health_summaries.latest_results -> incoming.key ->> 'test_result_id')
+    ), '{}'::jsonb)
+    """
+)
+
+
+async def apply_test_results(db, results: Iterable[dict]) -> None:
+    """Fold newly inserted test results into their patients' summaries; one statement per call.
+
+    Each result needs patient_id, test_type_id, test_result_id, result and test_date.
+    Runs in the caller's transaction.
+    """
+    deltas = {}
+    for result in results:
+        delta = deltas.setdefault(result["patient_id"], {"count": 0, "latest": {}, "last_test_date": None})
+        delta["count"] += 1
+        test_date = _as_timestamp(result["test_date"])
+        if delta["last_test_date"] is None or test_date > delta["last_test_date"]:
+            delta["last_test_date"] = test_date
+        key = str(result["test_type_id"])
+        entry = _latest_entry(result, test_date)
+        if key not in delta["latest"] or _is_newer(entry, delta["latest"][key]):
+            delta["latest"][key] = entry
+    if not deltas:
+        return
+    stmt = pg_insert(HealthSummary).values([
+        {
+            "summary_id": uuid4(),
+            "patient_id": patient_id,
+            "test_result_count": delta["count"],
+            "latest_results": delta["latest"],
+            "last_test_date": delta["last_test_date"],
+            "last_updated": func.now(),
+        }
+        # Sorted so concurrent batches lock summary rows in the same order
+        for patient_id, delta in sorted(deltas.items())
+    ])
+    await db.execute(_merge_test_result_deltas(stmt))
+
+
+def _merge_test_result_deltas(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[HealthSummary.patient_id],
+        set_={
+            "test_result_count": HealthSummary.test_result_count + stmt.excluded.test_result_count,
+            "latest_results": MERGE_LATEST_RESULTS,
+            "last_test_date": func.greatest(HealthSummary.last_test_date, stmt.excluded.last_test_date),
+            "last_updated": func.now(),
+        },
+    )
+
+
+def summary_delta_for_inserted(inserted):
+    """apply_test_results as an INSERT ... SELECT over `inserted`, a CTE of new test_results rows.
+
+    For writes that insert and fold the result into the summary in a single statement;
+    `inserted` must hold at most one row per patient.
+    """
+    latest_entry = func.jsonb_build_object(
+        "test_result_id", cast(inserted.c.test_result_id, String),
+        "result", inserted.c.result,
+        # Same format as _latest_entry and REBUILD_SQL
+        "test_date", func.to_char(inserted.c.test_date, 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+    )
+    return _merge_test_result_deltas(pg_insert(HealthSummary).from_select(
+        ["summary_id", "patient_id", "test_result_count", "latest_results", "last_test_date", "last_updated"],
+        select(
+            func.gen_random_uuid(),
+            inserted.c.patient_id,
+            literal(1),
+            func.jsonb_build_object(cast(inserted.c.test_type_id, String), latest_entry, type_=JSONB),
+            inserted.c.test_date,
+            func.now(),
+        ),
+        # The remaining columns take their server defaults
+        include_defaults=False,
+    ))
+
+
+async def apply_note(db, patient_id: UUID, created_at: datetime) -> None:
+    """Count a newly inserted note in the patient's summary; runs in the caller's transaction."""
+    stmt = pg_insert(HealthSummary).values(
+        summary_id=uuid4(),
+        patient_id=patient_id,
+        note_count=1,
+        last_note_at=created_at,
+        last_updated=func.now(),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[HealthSummary.patient_id],
+        set_={
+            "note_count": HealthSummary.note_count + 1,
+            "last_note_at": func.greatest(HealthSummary.last_note_at, stmt.excluded.last_note_at),
+            "last_updated": func.now(),
+        },
+    ))
+
+
+# Recompute the maintained columns for a batch of patients; only rows that drifted are written
+REBUILD_SQL = text(
+    """
+    INSERT INTO health_summaries (
+        summary_id, patient_id, test_result_count, latest_results, last_test_date,
+        note_count, last_note_at, last_updated
+    )
+    SELECT gen_random_uuid(), p.patient_id, coalesce(t.test_result_count, 0),
+           coalesce(l.latest_results, '{}'::jsonb), t.last_test_date,
+           coalesce(n.note_count, 0), n.last_note_at, now()
+    FROM unnest(CAST(:patient_ids AS uuid[])) AS p (patient_id)
+    LEFT JOIN (
+        SELECT patient_id, count(*) AS test_result_count, max(test_date) AS last_test_date
+        FROM test_results WHERE patient_id = ANY(CAST(:patient_ids AS uuid[]))
+        GROUP BY patient_id
+    ) AS t USING (patient_id)
+    LEFT JOIN (
+        SELECT patient_id, jsonb_object_agg(CAST(test_type_id AS text), jsonb_build_object(
+            'test_result_id', CAST(test_result_id AS text),
+            'result', result,
+            'test_date', to_char(test_date, 'YYYY-MM-DD"T"HH24:MI:SS.US')
+        )) AS latest_results
+        FROM (
+            SELECT DISTINCT ON (patient_id, test_type_id) patient_id, test_type_id, test_result_id, result, test_date
+            FROM test_results WHERE patient_id = ANY(CAST(:patient_ids AS uuid[]))
+            ORDER BY patient_id, test_type_id, test_date DESC, test_result_id DESC
+        ) AS latest
+        GROUP BY patient_id
+    ) AS l USING (patient_id)
+    LEFT JOIN (
+        SELECT patient_id, count(*) AS note_count, max(created_at) AS last_note_at
+        FROM notes WHERE patient_id = ANY(CAST(:patient_ids AS uuid[]))
+        GROUP BY patient_id
+    ) AS n USING (patient_id)
+    ON CONFLICT (patient_id) DO UPDATE SET
+        test_result_count = excluded.test_result_count,
+        latest_results = excluded.latest_results,
+        last_test_date = excluded.last_test_date,
+        note_count = excluded.note_count,
+        last_note_at = excluded.last_note_at,
+        last_updated = now()
+    WHERE (health_summaries.test_result_count, health_summaries.latest_results, health_summaries.last_test_date,
+           health_summaries.note_count, health_summaries.last_note_at)
+        IS DISTINCT FROM (excluded.test_result_count, excluded.latest_results, excluded.last_test_date,
+                          excluded.note_count, excluded.last_note_at)
+    RETURNING patient_id
+    """
+)
+
+
+async def _rebuild_batch(session_factory, patient_ids: list) -> int:
+    async with session_factory() as db:
+        async with db.begin():
+            # Lock the summary rows first. A concurrent delta either committed before the lock
+            # (and is seen by the recompute below) or applies on top of the rebuilt row after us.
+            await db.execute(
+                pg_insert(HealthSummary)
+                .values([{"summary_id": uuid4(), "patient_id": patient_id} for patient_id in patient_ids])
+                .on_conflict_do_nothing(index_elements=[HealthSummary.patient_id])
+            )
+            await db.execute(
+                select(HealthSummary.summary_id)
+                .filter(HealthSummary.patient_id.in_(patient_ids))
+                .order_by(HealthSummary.patient_id)
+                .with_for_update()
+            )
+            result = await db.execute(REBUILD_SQL, {"patient_ids": patient_ids})
+            return len(result.all())
+
+
+async def rebuild_summaries(session_factory, patient_ids: Optional[list] = None,
+                            batch_size: int = SUMMARY_REBUILD_BATCH_SIZE) -> dict:
+    """Recompute summaries for patient_ids (default: every patient), one transaction per batch."""
+    checked = repaired = 0
+    if patient_ids is not None:
+        patient_ids = sorted(set(patient_ids))
+        for batch in (patient_ids[i:i + batch_size] for i in range(0, len(patient_ids), batch_size)):
+            repaired += await _rebuild_batch(session_factory, batch)
+            checked += len(batch)
+        return {"patients": checked, "repaired": repaired}
+    last_id = None
+    while True:
+        async with session_factory() as db:
+            query = select(Patient.patient_id).order_by(Patient.patient_id).limit(batch_size)
+            if last_id is not None:
+                query = query.filter(Patient.patient_id > last_id)
+            batch = list((await db.execute(query)).scalars().all())
+        if not batch:
+            break
+        repaired += await _rebuild_batch(session_factory, batch)
+        checked += len(batch)
+        last_id = batch[-1]
+    return {"patients": checked, "repaired": repaired}
+
+
+class SummaryRebuildJob:
+    """Periodically repairs summary drift in the background.
+
+    Every worker runs the job, but a session advisory lock lets only one of them rebuild
+    at a time; the others skip that round.
+    """
+
+    def __init__(self, engine, interval_seconds: float, batch_size: int = SUMMARY_REBUILD_BATCH_SIZE):
+        self.engine = engine
+        self.session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task = None
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_run = None
+
+    async def run_once(self) -> Optional[dict]:
+        # The lock belongs to this connection, which stays checked out for the whole run
+        async with self.engine.connect() as lock_conn:
+            locked = await lock_conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": SUMMARY_REBUILD_LOCK_ID})
+            await lock_conn.commit()
+            if not locked:
+                self.skipped += 1
+                return None
+            try:
+                start = time.perf_counter()
+                result = await rebuild_summaries(self.session_factory, batch_size=self.batch_size)
+                result["seconds"] = time.perf_counter() - start
+            finally:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SUMMARY_REBUILD_LOCK_ID})
+                await lock_conn.commit()
+        self.runs += 1
+        self.last_run = result
+        if result["repaired"]:
+            logger.warning("Repaired %d of %d health summaries", result["repaired"], result["patients"])
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception:
+                self.failures += 1
+                logger.exception("Health summary rebuild failed")
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_run": self.last_run,
+        }
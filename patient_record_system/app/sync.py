@@ -0,0 +1,70 @@
+"""Delta sync: what changed for a hospital since a token.
+
+Triggers append a row to `changes` for every insert, update and delete of a patient,
+test result, note or consent (see migration 0009). A sync page is a range scan of
+ix_changes_hospital_txid from the caller's token, so its cost follows the number of
+changes, not the size of the tables.
+
+Changes are ordered by (txid, change_id), the writing transaction first. A page only
+reads changes of transactions older than the oldest one still running, so a write
+that commits late can never land behind a token that was already handed out; a long
+open transaction only delays what is returned, it never drops anything.
+"""
+from sqlalchemy import BigInteger, Text, cast, tuple_
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import Change
+from typing import NamedTuple
+from uuid import UUID
+
+ENTITIES = ("patient", "test_result", "note", "consent")
+
+# A token before every change
+START = (0, 0)
+
+
+class SyncPage(NamedTuple):
+    # entity -> ids whose latest change in the page is an insert or update
+    upserted: dict
+    # (entity, entity_id, changed_at) of rows whose latest change in the page is a delete
+    deleted: list
+    # (txid, change_id) of the last change read; START if nothing has changed yet
+    position: tuple
+    has_more: bool
+
+
+def completed_before():
+    # Transactions with a smaller id have all committed or aborted
+    return cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+
+def changes_query(hospital_id: UUID, since: tuple = START, limit: int = 500):
+    return (
+        select(Change.txid, Change.change_id, Change.entity, Change.entity_id, Change.deleted, Change.changed_at)
+        .filter(
+            Change.hospital_id == hospital_id,
+            tuple_(Change.txid, Change.change_id) > tuple_(*since),
+            Change.txid < completed_before(),
+        )
+        .order_by(Change.txid, Change.change_id)
+        .limit(limit)
+    )
+
+
+def fold_changes(rows, since: tuple, limit: int) -> SyncPage:
+    """Latest change per row from up to limit + 1 rows of changes_query."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    for row in rows:
+        # Later changes replace earlier ones, so each row is reported once
+        latest[(row["entity"], row["entity_id"])] = row
+    upserted = {entity: [] for entity in ENTITIES}
+    deleted = []
+    for (entity, entity_id), row in latest.items():
+        if row["deleted"]:
+            deleted.append((entity, entity_id, row["changed_at"]))
+        else:
+            upserted[entity].append(entity_id)
+    position = (rows[-1]["txid"], rows[-1]["change_id"]) if rows else since
+    return SyncPage(upserted, deleted, position, has_more)
@@ -0,0 +1,119 @@
+"""Patient timeline: test results, notes, the health summary and active consents as one feed.
+
+Every source is a branch of a single UNION ALL ordered newest first. Each branch applies
+the time window, the keyset cursor and the page limit itself, so every branch is an
+index range scan on (patient_id, <time column>) and a page costs one round trip no
+matter how many entries it holds. Rows with no time (the columns are nullable) have no
+place in the feed and are left out, so every entry can be turned into a cursor.
+"""
+from sqlalchemy import JSON, DateTime, String, literal, or_, tuple_, union_all
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.models import TestResult, Note, HealthSummary, Consent
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken to already be UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # test_results.test_date is a timestamp without time zone holding UTC
+    return as_utc(value).replace(tzinfo=None)
+
+
+def _branch(kind: str, entry_id, occurred_at, data, time_column, cursor_time, filters,
+            since, until, cursor, limit):
+    query = select(
+        literal(kind, String).label("kind"),
+        entry_id.label("entry_id"),
+        occurred_at.label("occurred_at"),
+        func.json_build_object(*data, type_=JSON).label("data"),
+    ).filter(*filters, time_column.is_not(None))
+    if since is not None:
+        query = query.filter(time_column >= cursor_time(since))
+    if until is not None:
+        query = query.filter(time_column < cursor_time(until))
+    if cursor is not None:
+        cursor_at, cursor_id = cursor
+        query = query.filter(tuple_(time_column, entry_id) < tuple_(cursor_time(cursor_at), cursor_id))
+    return query.order_by(time_column.desc().nulls_last(), entry_id.desc()).limit(limit)
+
+
+def timeline_query(patient_id: UUID, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   cursor: Optional[tuple] = None, limit: int = 100):
+    """Up to limit entries for patient_id with since <= occurred_at < until, newest first.
+
+    cursor is the (occurred_at, entry_id) of the last entry of the previous page.
+    """
+    window = dict(since=since, until=until, cursor=cursor, limit=limit)
+    branches = [
+        _branch(
+            "test_result",
+            TestResult.test_result_id,
+            func.timezone("UTC", TestResult.test_date, type_=DateTime(timezone=True)),
+            (
+                "test_type_id", TestResult.test_type_id,
+                "result", TestResult.result,
+                "created_by_hospital_id", TestResult.created_by_hospital_id,
+            ),
+            TestResult.test_date,
+            _naive_utc,
+            [TestResult.patient_id == patient_id],
+            **window,
+        ),
+        _branch(
+            "note",
+            Note.note_id,
+            Note.created_at,
+            ("user_id", Note.user_id, "content", Note.content),
+            Note.created_at,
+            as_utc,
+            [Note.patient_id == patient_id],
+            **window,
+        ),
+        _branch(
+            "health_summary",
+            HealthSummary.summary_id,
+            HealthSummary.last_updated,
+            (
+                "diagnoses", HealthSummary.diagnoses,
+                "medications", HealthSummary.medications,
+                "allergies", HealthSummary.allergies,
+            ),
+            HealthSummary.last_updated,
+            as_utc,
+            [HealthSummary.patient_id == patient_id],
+            **window,
+        ),
+        _branch(
+            "consent",
+            Consent.consent_id,
+            Consent.granted_at,
+            (
+                "hospital_id", Consent.hospital_id,
+                "user_id", Consent.user_id,
+                "access_type", Consent.access_type,
+                "expires_at", Consent.expires_at,
+            ),
+            Consent.granted_at,
+            as_utc,
+            [
+                Consent.patient_id == patient_id,
+                Consent.revoked_at.is_(None),
+                or_(Consent.expires_at.is_(None), Consent.expires_at > func.now()),
+            ],
+            **window,
+        ),
+    ]
+    entries = union_all(*branches).subquery("timeline")
+    return (
+        select(entries)
+        .order_by(entries.c.occurred_at.desc().nulls_last(), entries.c.entry_id.desc())
+        .limit(limit)
+    )
@@ -0,0 +1,112 @@
+"""Compare app.analytics' NumPy summaries with the same statistics as a per-row Python loop.
+
+No database is needed. The loop gets Python lists, as it would from fetched rows; the
+NumPy path gets the packed bytes the slice query returns and pays for unpacking them:
+
+    python -m benchmarks.analytics --sizes 100000 1000000 10000000
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import math
+import random
+import time
+
+from app.analytics import DAY_DTYPE, PERCENTILES, VALUE_DTYPE, summarize, unpack
+import numpy as np
+
+
+def make_slice(count, seed=0):
+    rng = random.Random(seed)
+    # Roughly glucose in mmol/L over about three years
+    values = [round(rng.lognormvariate(1.7, 0.25), 1) for _ in range(count)]
+    days = [19000 + rng.randrange(1100) for _ in range(count)]
+    return values, days
+
+
+def percentile(ordered, p):
+    # Linear interpolation between closest ranks, as numpy.percentile does by default
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def python_summary(values, days, low, high, window_days):
+    count = len(values)
+    total = 0.0
+    below = above = 0
+    minimum, maximum = math.inf, -math.inf
+    by_day = {}
+    for value, day in zip(values, days):
+        total += value
+        minimum = min(minimum, value)
+        maximum = max(maximum, value)
+        if value < low:
+            below += 1
+        elif value > high:
+            above += 1
+        day_count, day_sum = by_day.get(day, (0, 0.0))
+        by_day[day] = (day_count + 1, day_sum + value)
+    mean = total / count
+    variance = sum((value - mean) ** 2 for value in values) / count
+    ordered = sorted(values)
+    daily = []
+    for day in sorted(by_day):
+        window_count = window_sum = 0
+        for offset in range(window_days):
+            day_count, day_sum = by_day.get(day - offset, (0, 0.0))
+            window_count += day_count
+            window_sum += day_sum
+        day_count, day_sum = by_day[day]
+        daily.append((day, day_count, day_sum / day_count, window_sum / window_count))
+    return {
+        "count": count,
+        "min": minimum,
+        "max": maximum,
+        "mean": mean,
+        "std": math.sqrt(variance),
+        "percentiles": {f"p{p}": percentile(ordered, p) for p in PERCENTILES},
+        "below_range": below,
+        "above_range": above,
+        "daily": daily,
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(args):
+    print(f"{'results':>10} {'python':>12} {'numpy':>12} {'speedup':>8}")
+    for size in args.sizes:
+        values, days = make_slice(size)
+        packed = np.array(values, dtype=VALUE_DTYPE).tobytes(), np.array(days, dtype=DAY_DTYPE).tobytes()
+        python_seconds, expected = timed(lambda: python_summary(values, days, args.low, args.high, args.window_days))
+        numpy_seconds, actual = min(
+            (timed(lambda: summarize(*unpack(*packed), args.low, args.high, args.window_days))
+             for _ in range(args.repeat)),
+            key=lambda r: r[0],
+        )
+        assert actual["count"] == expected["count"] and len(actual["daily"]) == len(expected["daily"])
+        assert (actual["below_range"], actual["above_range"]) == (expected["below_range"], expected["above_range"])
+        assert all(math.isclose(actual["percentiles"][k], v) for k, v in expected["percentiles"].items())
+        assert math.isclose(actual["daily"][-1]["rolling_mean"], expected["daily"][-1][3])
+        print(
+            f"{size:>10} {python_seconds * 1000:>10.0f}ms {numpy_seconds * 1000:>10.0f}ms "
+            f"{python_seconds / numpy_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000, 10000000])
+    parser.add_argument("--repeat", type=int, default=3, help="numpy runs per size; the fastest is reported")
+    parser.add_argument("--low", type=float, default=3.9)
+    parser.add_argument("--high", type=float, default=7.8)
+    parser.add_argument("--window-days", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,302 @@
+"""Throughput and latency for every main endpoint, with a regression check against a baseline.
+
+Seeds the database with generate_synthetic_data (deterministic and resumable, so a
+second run with the same arguments loads nothing), runs the app in-process through
+httpx's ASGI transport, and drives one endpoint at a time with --concurrency client
+loops for --duration seconds. The write endpoints only touch WRITE_PATIENTS patients
+that no read endpoint uses, and every row they create is deleted (with its change log
+rows) before the next endpoint runs, so each run reads the same dataset as the
+baseline. The report (requests/s and p50/p95/p99 per endpoint) is written to --output:
+
+    python -m benchmarks.endpoints --patients 100000 --test-results 1000000 --output baseline.json
+
+With --baseline the run fails (exit status 1) if any endpoint's --metric is more than
+--threshold slower than in the baseline report and by at least --min-delta-ms:
+
+    python -m benchmarks.endpoints --patients 100000 --test-results 1000000 --baseline baseline.json
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import delete
+
+import generate_synthetic_data
+from app.main import app, AsyncSessionLocal
+from app.models import Change, Note, TestResult
+from app.rollups import rebuild_rollups
+from app.summary import rebuild_summaries
+from benchmarks.login_storm import summarize
+from generate_synthetic_data import TEST_TYPES, entity_id, license_number, patient_unique_id
+
+# Patients whose tokens the patient endpoints rotate through
+PATIENT_LOGINS = 20
+# Patients of the benchmark hospital that the hospital endpoints rotate through
+HOSPITAL_PATIENTS = 1000
+# The benchmark hospital's last patients, which take every write and are never read
+WRITE_PATIENTS = 20
+# Write endpoint -> the model and key of the row each request creates
+CREATED_ROWS = {
+    "POST /hospitals/patients/{id}/test_results/": (TestResult, "test_result_id"),
+    "POST /hospitals/patients/{id}/notes": (Note, "note_id"),
+}
+DELETE_BATCH_SIZE = 1000
+
+
+class Context:
+    """Credentials and ids derived from the generator plan, shared by all endpoint requests."""
+
+    def __init__(self, plan, seed: int, password: str):
+        self.plan = plan
+        self.rng = random.Random(seed)
+        self.password = password
+        self.hospital_headers = None
+        self.patient_headers = []
+        # Patients are assigned to hospitals round robin, so every plan.hospitals-th one is the first hospital's
+        hospital_patients = range(0, plan.patients, plan.hospitals)
+        writes = min(WRITE_PATIENTS, len(hospital_patients) // 2)
+        read_patients = hospital_patients[:len(hospital_patients) - writes][:HOSPITAL_PATIENTS]
+        self.patient_ids = [str(entity_id(plan, "patient", i)) for i in read_patients]
+        self.write_patient_ids = [
+            str(entity_id(plan, "patient", i)) for i in hospital_patients[len(hospital_patients) - writes:]
+        ]
+        # model -> ids of the rows the write endpoints created
+        self.created = {model: [] for model, _ in CREATED_ROWS.values()}
+
+    def patient_id(self) -> str:
+        return self.rng.choice(self.patient_ids)
+
+    def write_patient_id(self) -> str:
+        return self.rng.choice(self.write_patient_ids)
+
+    def patient(self) -> dict:
+        return self.rng.choice(self.patient_headers)
+
+    def test_type_id(self) -> str:
+        return str(entity_id(self.plan, "test_type", self.rng.randrange(len(TEST_TYPES))))
+
+
+def token_request(ctx):
+    return "POST", "/token", {"data": {
+        "grant_type": "hospital",
+        "username": license_number(ctx.plan, 0),
+        "password": ctx.password,
+    }}
+
+
+# name -> builds (method, path, httpx request kwargs) for one request
+ENDPOINTS = {
+    "POST /token": token_request,
+    "GET /hospitals/": lambda ctx: ("GET", "/hospitals/", {"headers": ctx.hospital_headers}),
+    "GET /hospitals/patients/": lambda ctx: ("GET", "/hospitals/patients/", {"headers": ctx.hospital_headers}),
+    "GET /hospitals/patients/{id}": lambda ctx: (
+        "GET", f"/hospitals/patients/{ctx.patient_id()}", {"headers": ctx.hospital_headers}
+    ),
+    "GET /hospitals/patients/{id}/timeline": lambda ctx: (
+        "GET", f"/hospitals/patients/{ctx.patient_id()}/timeline", {"headers": ctx.hospital_headers}
+    ),
+    "GET /hospitals/patients/{id}/summary": lambda ctx: (
+        "GET", f"/hospitals/patients/{ctx.patient_id()}/summary", {"headers": ctx.hospital_headers}
+    ),
+    "GET /hospitals/search": lambda ctx: (
+        "GET", "/hospitals/search", {"params": {"q": ctx.rng.choice(["fever", "blood pressure", "Smi"])},
+                                     "headers": ctx.hospital_headers}
+    ),
+    "GET /hospitals/stats": lambda ctx: ("GET", "/hospitals/stats", {"headers": ctx.hospital_headers}),
+    "GET /sync": lambda ctx: ("GET", "/sync", {"headers": ctx.hospital_headers}),
+    "GET /hospitals/analytics/test_types/{id}": lambda ctx: (
+        "GET", f"/hospitals/analytics/test_types/{ctx.test_type_id()}", {"headers": ctx.hospital_headers}
+    ),
+    "POST /hospitals/patients/{id}/test_results/": lambda ctx: (
+        "POST", f"/hospitals/patients/{ctx.write_patient_id()}/test_results/", {"headers": ctx.hospital_headers, "json": {
+            "test_type_id": ctx.test_type_id(),
+            "result": f"{ctx.rng.uniform(3.5, 11.0):.1f} mmol/L",
+            "test_date": datetime.now(timezone.utc).date().isoformat(),
+        }}
+    ),
+    "POST /hospitals/patients/{id}/notes": lambda ctx: (
+        "POST", f"/hospitals/patients/{ctx.write_patient_id()}/notes", {"headers": ctx.hospital_headers, "json": {
+            "content": "Benchmark follow up, patient stable",
+        }}
+    ),
+    "GET /patients/me/": lambda ctx: ("GET", "/patients/me/", {"headers": ctx.patient()}),
+    "GET /patients/me/summary": lambda ctx: ("GET", "/patients/me/summary", {"headers": ctx.patient()}),
+    "GET /patients/me/consents": lambda ctx: ("GET", "/patients/me/consents", {"headers": ctx.patient()}),
+    "GET /patients/test_results/": lambda ctx: ("GET", "/patients/test_results/", {"headers": ctx.patient()}),
+    "GET /test_types/": lambda ctx: ("GET", "/test_types/", {}),
+    "GET /health": lambda ctx: ("GET", "/health", {}),
+}
+
+
+async def bearer(client, grant_type, username, password) -> dict:
+    response = await client.post("/token", data={"grant_type": grant_type, "username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_endpoint(client, ctx, build, concurrency, duration, warmup, created=None):
+    samples, errors = [], {}
+
+    async def worker(deadline, record):
+        while time.perf_counter() < deadline:
+            method, path, kwargs = build(ctx)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if created is not None and response.status_code == 201:
+                model, key = created
+                ctx.created[model].append(response.json()[key])
+            if record:
+                if response.status_code < 400:
+                    samples.append(elapsed)
+                else:
+                    errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    # Warm up caches and the connection pool before measuring
+    await asyncio.gather(*(worker(time.perf_counter() + warmup, False) for _ in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        **summarize(samples),
+        "requests_per_second": len(samples) / elapsed,
+        "errors": errors,
+    }
+
+
+async def delete_created_rows(ctx) -> int:
+    """Remove what the write endpoints added, so the next run reads the same dataset."""
+    deleted = 0
+    for model, ids in ctx.created.items():
+        key = model.__table__.primary_key.columns.values()[0]
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[start:start + DELETE_BATCH_SIZE]
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(delete(model).where(key.in_(batch)))
+                # Both the insert's change and the delete's tombstone
+                await db.execute(delete(Change).where(Change.entity_id.in_(batch)))
+                await db.commit()
+            deleted += result.rowcount
+        ids.clear()
+    if deleted:
+        # Summaries and rollups were updated by the writes and are not by the deletes
+        await rebuild_summaries(AsyncSessionLocal, ctx.write_patient_ids)
+        await rebuild_rollups(AsyncSessionLocal, [entity_id(ctx.plan, "hospital", 0)])
+    return deleted
+
+
+def compare(report: dict, baseline: dict, metric: str, threshold: float, min_delta_ms: float) -> list:
+    """Endpoints that regressed against the baseline, as human-readable lines."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        if current["errors"] and not before["errors"]:
+            regressions.append(f"{name}: errors {current['errors']} (baseline had none)")
+        if current[metric] is None or before[metric] is None:
+            continue
+        delta = current[metric] - before[metric]
+        if current[metric] > before[metric] * (1 + threshold) and delta >= min_delta_ms:
+            regressions.append(
+                f"{name}: {metric} {current[metric]:.1f}ms vs {before[metric]:.1f}ms baseline (+{delta:.1f}ms)"
+            )
+    return regressions
+
+
+async def run(args, plan):
+    ctx = Context(plan, args.seed, args.password)
+    names = [name for name in ENDPOINTS if not args.only or any(part in name for part in args.only)]
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            ctx.hospital_headers = await bearer(client, "hospital", license_number(plan, 0), args.password)
+            ctx.patient_headers = [
+                await bearer(client, "patient", patient_unique_id(plan, i), args.password)
+                for i in range(0, min(plan.patients, PATIENT_LOGINS * plan.hospitals), plan.hospitals)
+            ]
+            endpoints = {}
+            for name in names:
+                try:
+                    endpoints[name] = await run_endpoint(
+                        client, ctx, ENDPOINTS[name], args.concurrency, args.duration, args.warmup,
+                        CREATED_ROWS.get(name),
+                    )
+                finally:
+                    # Before the next endpoint runs, so every endpoint reads the seeded dataset
+                    if name in CREATED_ROWS:
+                        print(f"{name}: deleted {await delete_created_rows(ctx):,} created rows", file=sys.stderr)
+                print(
+                    f"{name}: {endpoints[name]['requests_per_second']:,.0f} req/s, "
+                    f"p50 {endpoints[name]['p50_ms'] or 0:.1f}ms, p95 {endpoints[name]['p95_ms'] or 0:.1f}ms, "
+                    f"p99 {endpoints[name]['p99_ms'] or 0:.1f}ms",
+                    file=sys.stderr,
+                )
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "plan": {key: value for key, value in vars(plan).items() if key != "password_hash"},
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "endpoints": endpoints,
+    }
+
+
+def main(args):
+    # Seeding runs before the benchmark's event loop; it uses its own processes and engine
+    seed_args = [
+        "--seed", str(args.seed),
+        "--patients", str(args.patients),
+        "--test-results", str(args.test_results),
+        "--notes", str(args.notes),
+        "--consents", str(args.consents),
+        "--chunk-size", str(args.chunk_size),
+        "--password", args.password,
+    ]
+    if args.workers:
+        seed_args += ["--workers", str(args.workers)]
+    plan = generate_synthetic_data.main(generate_synthetic_data.build_parser().parse_args(seed_args))
+    report = asyncio.run(run(args, plan))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.metric, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--test-results", type=int, default=100_000)
+    parser.add_argument("--notes", type=int, default=20_000)
+    parser.add_argument("--consents", type=int, default=2_000)
+    parser.add_argument("--chunk-size", type=int, default=generate_synthetic_data.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help="generator processes (default: one per CPU)")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client loops per endpoint")
+    parser.add_argument("--duration", type=float, default=5.0, help="measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds per endpoint")
+    parser.add_argument("--only", nargs="*", help="only endpoints whose name contains one of these")
+    parser.add_argument("--output", default="benchmark_endpoints.json")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    main(parser.parse_args())
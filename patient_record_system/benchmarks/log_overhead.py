@@ -0,0 +1,102 @@
+"""Requests/s with logging off, written synchronously, and through the queue pipeline.
+
+Each mode logs at DEBUG with SQL statements enabled, which is what the app used to do
+out of the box, except "off" (WARNING only). "sync" writes from the event loop thread
+like logging.basicConfig; "queue" and "sampled" go through app.logs, the latter keeping
+1% of SQLAlchemy and httpx records. Output goes to --log-file so a terminal does not skew it:
+
+    python -m benchmarks.log_overhead --duration 5 --concurrency 16
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from app.logs import TEXT_FORMAT, LogPipeline
+from app.main import app
+from benchmarks.login_storm import login, seed, summarize
+
+# The pool logger is named after the pool class, which lives in app.database
+SAMPLED = {"sqlalchemy": 0.01, "app.database.InstrumentedQueuePool": 0.01, "httpx": 0.01}
+
+
+def configure(mode, stream):
+    """Install the mode's handlers on the root logger; returns the pipeline, if any."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING if mode == "off" else logging.INFO)
+    if mode == "off":
+        root.setLevel(logging.WARNING)
+        return None
+    if mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.setLevel(logging.DEBUG)
+        root.addHandler(handler)
+        return None
+    pipeline = LogPipeline(level="DEBUG", sampling=SAMPLED if mode == "sampled" else None, stream=stream)
+    pipeline.install()
+    return pipeline
+
+
+async def drive(client, requests, concurrency, duration):
+    samples = []
+
+    async def worker(deadline):
+        i = 0
+        while time.perf_counter() < deadline:
+            path, headers = requests[i % len(requests)]
+            i += 1
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            samples.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+    return {"requests_per_second": len(samples) / (time.perf_counter() - start), **summarize(samples)}
+
+
+async def main(args):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    with open(args.log_file, "a") as stream:
+        configure("off", stream)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            license_number, unique_id = await seed(client)
+            hospital = await login(client, "hospital", license_number)
+            patient = await login(client, "patient", unique_id)
+            requests = [
+                ("/patients/me/", {"Authorization": f"Bearer {patient.json()['access_token']}"}),
+                ("/hospitals/patients/", {"Authorization": f"Bearer {hospital.json()['access_token']}"}),
+            ]
+            for mode in args.modes:
+                pipeline = configure(mode, stream)
+                await drive(client, requests, args.concurrency, args.warmup)
+                results[mode] = await drive(client, requests, args.concurrency, args.duration)
+                if pipeline is not None:
+                    start = time.perf_counter()
+                    pipeline.stop()
+                    results[mode]["drain_seconds"] = time.perf_counter() - start
+                    results[mode]["pipeline"] = pipeline.stats()
+        configure("off", stream)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["off", "sync", "queue", "sampled"],
+                        choices=["off", "sync", "queue", "sampled"])
+    parser.add_argument("--duration", type=float, default=5.0, help="measured seconds per mode")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--log-file", default=os.devnull)
+    asyncio.run(main(parser.parse_args()))
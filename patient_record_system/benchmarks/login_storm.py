@@ -0,0 +1,138 @@
+"""Measure /health and /patients/me/ latency while a burst of logins hits /token.
+
+Runs the app in-process through httpx's ASGI transport, so any blocking work on
+the event loop shows up directly in the probe latencies:
+
+    python -m benchmarks.login_storm --storm-concurrency 32 --duration 10
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date
+
+import httpx
+
+from app.main import app, AsyncSessionLocal, hashing_executor
+from app.models import User, Patient
+
+PASSWORD = "password123"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples) if samples else None,
+    }
+
+
+async def seed(client):
+    license_number = f"BENCH-{uuid.uuid4().hex[:8]}"
+    response = await client.post("/hospitals/", json={
+        "name": "Login Storm Hospital",
+        "license_number": license_number,
+        "address": {"city": "Bench"},
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+    hospital_id = response.json()["hospital_id"]
+    unique_id = f"BENCH-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"{unique_id.lower()}@bench.local",
+            password_hash=await hashing_executor.hash(PASSWORD),
+            role="patient",
+        )
+        db.add(user)
+        await db.flush()
+        db.add(Patient(
+            user_id=user.user_id,
+            unique_id=unique_id,
+            dob=date(1980, 1, 1),
+            created_by_hospital_id=hospital_id,
+        ))
+        await db.commit()
+    return license_number, unique_id
+
+
+async def login(client, grant_type, username):
+    return await client.post("/token", data={
+        "grant_type": grant_type,
+        "username": username,
+        "password": PASSWORD,
+    })
+
+
+async def probe(client, path, headers, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(0.005)
+
+
+async def storm(client, license_number, stop, counts):
+    while not stop.is_set():
+        response = await login(client, "hospital", license_number)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def run_phase(client, headers, license_number, duration, storm_concurrency):
+    stop = asyncio.Event()
+    health, me, counts = [], [], {}
+    tasks = [
+        asyncio.create_task(probe(client, "/health", {}, stop, health)),
+        asyncio.create_task(probe(client, "/patients/me/", headers, stop, me)),
+    ]
+    tasks += [
+        asyncio.create_task(storm(client, license_number, stop, counts))
+        for _ in range(storm_concurrency)
+    ]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        "storm_concurrency": storm_concurrency,
+        "logins_by_status": counts,
+        "/health": summarize(health),
+        "/patients/me/": summarize(me),
+    }
+
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        license_number, unique_id = await seed(client)
+        response = await login(client, "patient", unique_id)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        report = {
+            "hashing": hashing_executor.stats(),
+            "idle": await run_phase(client, headers, license_number, args.duration, 0),
+            "storm": await run_phase(client, headers, license_number, args.duration, args.storm_concurrency),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--storm-concurrency", type=int, default=32, help="concurrent login loops")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,141 @@
+"""Measure /hospitals/search latency against a hospital with many notes.
+
+Seeds a fresh hospital with --patients patients and --notes notes (generated inside
+Postgres, so a million rows take seconds), then times a mix of queries in-process:
+
+    python -m benchmarks.search --notes 1000000 --iterations 50
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from app.main import app, AsyncSessionLocal, patient_search
+from benchmarks.login_storm import PASSWORD, login, summarize
+
+VOCABULARY = [
+    "patient", "reports", "pain", "fever", "cough", "stable", "improved", "worsening", "follow", "up",
+    "prescribed", "dose", "blood", "pressure", "elevated", "normal", "review", "labs", "imaging", "chest",
+    "headache", "nausea", "fatigue", "sleep", "diet", "exercise", "referral", "cardiology", "neurology",
+    "asthma", "diabetes", "insulin", "allergy", "rash", "wound", "healing", "discharge", "admitted",
+]
+RARE_WORD = "migraine"
+FIRST_NAMES = ["Ada", "Grace", "Alan", "Edsger", "Barbara", "Donald", "Frances", "John", "Margaret", "Ken"]
+LAST_NAMES = ["Lovelace", "Hopper", "Turing", "Dijkstra", "Liskov", "Knuth", "Allen", "Backus", "Hamilton", "Thompson"]
+
+
+async def seed(client, patients, notes):
+    license_number = f"SEARCH-{uuid.uuid4().hex[:8]}"
+    response = await client.post("/hospitals/", json={
+        "name": "Search Bench Hospital",
+        "license_number": license_number,
+        "address": {"city": "Bench"},
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+    hospital_id = response.json()["hospital_id"]
+    tag = license_number.lower()
+    params = {
+        "tag": tag,
+        "license_number": license_number,
+        "hospital_id": hospital_id,
+        "patients": patients,
+        "notes": notes,
+        "vocabulary": VOCABULARY,
+        "first_names": FIRST_NAMES,
+        "last_names": LAST_NAMES,
+        "rare": RARE_WORD,
+    }
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(
+            """
+            INSERT INTO users (user_id, email, password_hash, role, first_name, last_name)
+            SELECT gen_random_uuid(), :tag || '-' || g || '@bench.local', 'unused', 'patient',
+                   (CAST(:first_names AS text[]))[1 + g % 10], (CAST(:last_names AS text[]))[1 + (g / 10) % 10] || g
+            FROM generate_series(1, :patients) AS g
+            """
+        ), params)
+        await db.execute(text(
+            """
+            INSERT INTO patients (patient_id, user_id, unique_id, dob, contact_phone, created_by_hospital_id, created_at)
+            SELECT gen_random_uuid(), user_id, :license_number || '-' || lpad(CAST(n AS text), 7, '0'),
+                   DATE '1980-01-01', '(555) ' || lpad(CAST(n AS text), 7, '0'), CAST(:hospital_id AS uuid), now()
+            FROM (
+                SELECT user_id, row_number() OVER (ORDER BY email) AS n
+                FROM users WHERE email LIKE :tag || '-%'
+            ) AS u
+            """
+        ), params)
+        # About one note in a thousand mentions the rare word
+        await db.execute(text(
+            """
+            INSERT INTO notes (note_id, patient_id, content, created_at)
+            SELECT gen_random_uuid(), p.ids[1 + g % p.total],
+                   array_to_string(ARRAY(
+                       SELECT (CAST(:vocabulary AS text[]))[1 + floor(random() * 38)]
+                       FROM generate_series(1, 10 + g % 3)
+                   ), ' ') || CASE WHEN g % 1000 = 0 THEN ' ' || :rare ELSE '' END,
+                   now()
+            FROM generate_series(1, :notes) AS g,
+                 (SELECT array_agg(patient_id) AS ids, count(*) AS total
+                  FROM patients WHERE created_by_hospital_id = CAST(:hospital_id AS uuid)) AS p
+            """
+        ), params)
+        await db.commit()
+        await db.execute(text("ANALYZE users"))
+        await db.execute(text("ANALYZE patients"))
+        await db.execute(text("ANALYZE notes"))
+        await db.commit()
+        await patient_search.detect(db)
+    return license_number
+
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        license_number = await seed(client, args.patients, args.notes)
+        seed_seconds = time.perf_counter() - start
+        response = await login(client, "hospital", license_number)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        queries = {
+            "rare note term": RARE_WORD,
+            "common note term": "fever",
+            "note phrase": '"blood pressure"',
+            "surname prefix": LAST_NAMES[3][:5],
+            "full name": f"{FIRST_NAMES[2]} {LAST_NAMES[1]}",
+            "phone digits": "5550001",
+            "unique_id prefix": f"{license_number}-00001",
+        }
+        report = {
+            "notes": args.notes,
+            "patients": args.patients,
+            "seed_seconds": seed_seconds,
+            "name_matching": "trigram" if patient_search.trigram else "full_text_prefix",
+        }
+        for name, q in queries.items():
+            samples = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                response = await client.get("/hospitals/search", params={"q": q}, headers=headers)
+                samples.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            report[name] = {"q": q, "hits": len(response.json()), **summarize(samples)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Compare the ORM -> Pydantic -> JSON response path with the row-based fast path.
+
+No database is needed; rows are synthesized in memory:
+
+    python -m benchmarks.serialization --sizes 1000 10000 100000
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app.main import PatientResponse, PATIENT_COLUMNS
+from app.models import Patient
+from app.serialization import RowSerializer
+
+try:
+    # asyncpg hands back its own UUID subclass; use it so the fast path pays the same cost
+    from asyncpg.pgproto.pgproto import UUID as DriverUUID
+except ImportError:
+    DriverUUID = uuid.UUID
+
+
+def make_rows(count):
+    hospital_id = DriverUUID(str(uuid.uuid4()))
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "patient_id": DriverUUID(str(uuid.uuid4())),
+            "user_id": DriverUUID(str(uuid.uuid4())),
+            "unique_id": f"2025-HOSP001-{i:06d}",
+            "dob": date(1980, 1, 1 + i % 28),
+            "gender": "female",
+            "contact_phone": "555-555-0100",
+            "emergency_contact": {"name": "Kin", "phone": "555-555-0101", "relation": "sibling"},
+            "created_by_hospital_id": hospital_id,
+            "created_at": now,
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def orm_path(rows):
+    patients = [Patient(**row) for row in rows]
+    start = time.perf_counter()
+    content = jsonable_encoder([PatientResponse.model_validate(p) for p in patients])
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    return time.perf_counter() - start, len(body)
+
+
+def fast_path(rows, validate):
+    serializer = RowSerializer(PatientResponse, validate=validate)
+    start = time.perf_counter()
+    body = serializer.render(serializer.rows(rows))
+    return time.perf_counter() - start, len(body)
+
+
+def best_of(fn, repeat):
+    return min((fn() for _ in range(repeat)), key=lambda r: r[0])
+
+
+def main(args):
+    assert [c.key for c in PATIENT_COLUMNS] == list(make_rows(1)[0])
+    print(f"{'rows':>8} {'orm+pydantic':>14} {'typeadapter':>14} {'orjson':>14} {'speedup':>8}")
+    for size in args.sizes:
+        rows = make_rows(size)
+        orm_seconds, _ = best_of(lambda: orm_path(rows), args.repeat)
+        validated_seconds, _ = best_of(lambda: fast_path(rows, True), args.repeat)
+        fast_seconds, _ = best_of(lambda: fast_path(rows, False), args.repeat)
+        print(
+            f"{size:>8} {orm_seconds * 1000:>12.1f}ms {validated_seconds * 1000:>12.1f}ms "
+            f"{fast_seconds * 1000:>12.1f}ms {orm_seconds / fast_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
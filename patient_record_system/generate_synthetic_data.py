@@ -1,215 +1,474 @@
+"""Deterministic bulk synthetic data for load testing.
+
+Rows are generated in fixed-size chunks by a pool of worker processes. Each worker
+COPYs its chunk straight into Postgres and records it in synthetic_data_chunks in the
+same transaction. A chunk depends only on (seed, table, chunk number), so the same
+arguments always produce the same data, and a rerun after an interruption skips the
+chunks that already finished. Raising a target count later only generates the missing
+rows. --hospitals, --staff and --chunk-size decide which ids and owners every row gets,
+so they are recorded per seed in synthetic_data_plans and cannot change on a resume.
+
+    python generate_synthetic_data.py --seed 42 --patients 1000000 --test-results 50000000
+
+Every account uses the same password (--password), hashed once per run.
+"""
+import argparse
 import asyncio
-from datetime import datetime, timedelta
+import json
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Tuple
+
+import asyncpg
 from faker import Faker
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from passlib.hash import pbkdf2_sha256
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.future import select
-from sqlalchemy import func
-import uuid
-import random
-import os
-from dotenv import load_dotenv
-from app.models.hospital import Hospital
-from app.models.user import User
-from app.models.patient import Patient
-from app.models.test_type import TestType
-from app.models.test_result import TestResult
-from app.models.consent import Consent
-from app.models.health_summary import HealthSummary
-from app.models.note import Note
-from passlib.context import CryptContext
-
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL not found in .env file")
-
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-fake = Faker()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def format_phone_number(phone):
-    """Truncate phone number to 20 characters and remove extensions."""
-    # Remove any extensions (e.g., 'x1234')
-    phone = phone.split('x')[0]
-    # Truncate to 20 characters (though VARCHAR(30) allows more)
-    return phone[:20]
-
-async def generate_synthetic_data():
-    async with AsyncSessionLocal() as db:
-        try:
-            # 1. Insert Users
-            users = []
-            for _ in range(5):  # Admins
-                users.append(User(
-                    email=fake.email(),
-                    password_hash=pwd_context.hash("password123"),
-                    role="admin",
-                    hospital_id=None,
-                    first_name=fake.first_name(),
-                    last_name=fake.last_name(),
-                ))
-            for _ in range(10):  # Doctors
-                users.append(User(
-                    email=fake.email(),
-                    password_hash=pwd_context.hash("password123"),
-                    role="doctor",
-                    hospital_id=None,
-                    first_name=fake.first_name(),
-                    last_name=fake.last_name(),
-                ))
-            for _ in range(10):  # Staff
-                users.append(User(
-                    email=fake.email(),
-                    password_hash=pwd_context.hash("password123"),
-                    role="staff",
-                    hospital_id=None,
-                    first_name=fake.first_name(),
-                    last_name=fake.last_name(),
-                ))
-            for _ in range(25):  # Patients
-                users.append(User(
-                    email=fake.email(),
-                    password_hash=pwd_context.hash("password123"),
-                    role="patient",
-                    hospital_id=None,
-                    first_name=fake.first_name(),
-                    last_name=fake.last_name(),
-                ))
-            db.add_all(users)
-            await db.commit()
-            print("Inserted 50 users")
-
-            # 2. Insert Hospitals
-            admin_users = (await db.execute(select(User).filter(User.role == "admin"))).scalars().all()
-            hospitals = [
-                Hospital(
-                    name=f"{fake.city()} General Hospital",
-                    license_number=f"HOSP{random.randint(100, 999)}",
-                    address={"street": fake.street_address(), "city": fake.city(), "state": fake.state(), "zip": fake.zipcode()},
-                    contact_email=fake.email(),
-                    contact_phone=format_phone_number(fake.phone_number()),  # Format phone number
-                    admin_user_id=random.choice(admin_users).user_id,
-                ) for _ in range(5)
-            ]
-            db.add_all(hospitals)
-            await db.commit()
-            print("Inserted 5 hospitals")
-
-            # Update users with hospital_id
-            hospitals = (await db.execute(select(Hospital))).scalars().all()
-            hospital_ids = [h.hospital_id for h in hospitals]
-            for user in users:
-                if user.role in ["admin", "doctor", "staff"]:
-                    user.hospital_id = random.choice(hospital_ids)
-            await db.commit()
-            print("Updated user hospital IDs")
-
-            # 3. Insert Patients
-            patient_users = (await db.execute(select(User).filter(User.role == "patient"))).scalars().all()
-            patients = []
-            for user in patient_users:
-                hospital = random.choice(hospitals)
-                patients.append(Patient(
-                    user_id=user.user_id,
-                    unique_id=f"{datetime.now().year}-{hospital.license_number}-{random.randint(100000, 999999)}",
-                    dob=fake.date_of_birth(minimum_age=18, maximum_age=80),
-                    gender=random.choice(["male", "female", "other"]),
-                    contact_phone=format_phone_number(fake.phone_number()),  # Format phone number
-                    emergency_contact={"name": fake.name(), "phone": format_phone_number(fake.phone_number()), "relation": random.choice(["spouse", "parent", "sibling"])},
-                    created_by_hospital_id=hospital.hospital_id,
-                ))
-            db.add_all(patients)
-            await db.commit()
-            print("Inserted 25 patients")
-
-            # 4. Insert Test Types
-            test_types = [
-                TestType(name="Complete Blood Count", standard_code="LOINC:58410-2"),
-                TestType(name="X-Ray Chest", standard_code="LOINC:42272-5"),
-                TestType(name="MRI Brain", standard_code="LOINC:24590-2"),
-                TestType(name="Lipid Panel", standard_code="LOINC:57698-3"),
-                TestType(name="Blood Glucose", standard_code="LOINC:2345-7"),
-                TestType(name="Urinalysis", standard_code="LOINC:24356-8"),
-                TestType(name="ECG", standard_code="LOINC:11524-6"),
-                TestType(name="CT Abdomen", standard_code="LOINC:78970-6"),
-                TestType(name="Hemoglobin A1c", standard_code="LOINC:4548-4"),
-                TestType(name="Thyroid Panel", standard_code="LOINC:24348-5"),
-            ]
-            db.add_all(test_types)
-            await db.commit()
-            print("Inserted 10 test types")
-
-            # 5. Insert Test Results
-            patients = (await db.execute(select(Patient))).scalars().all()
-            test_types = (await db.execute(select(TestType))).scalars().all()
-            users = (await db.execute(select(User).filter(User.role.in_(["doctor", "staff"])))).scalars().all()
-            test_results = []
-            for _ in range(100):
-                patient = random.choice(patients)
-                test_type = random.choice(test_types)
-                test_results.append(TestResult(
-                    patient_id=patient.patient_id,
-                    hospital_id=patient.created_by_hospital_id,
-                    test_type_id=test_type.test_type_id,
-                    file_url=f"https://s3.amazonaws.com/mock-bucket/test-results/{uuid.uuid4()}.pdf",
-                    result_data={
-                        "value": random.uniform(5.0, 15.0),
-                        "unit": random.choice(["g/dL", "mg/dL", "mmol/L"]),
-                        "reference_range": "Normal"
-                    },
-                    uploaded_by=random.choice(users).user_id,
-                ))
-            db.add_all(test_results)
-            await db.commit()
-            print("Inserted 100 test results")
-
-            # 6. Insert Consents
-            consents = []
-            for patient in patients:
-                for _ in range(2):  # 2 consents per patient
-                    consents.append(Consent(
-                        patient_id=patient.patient_id,
-                        hospital_id=patient.created_by_hospital_id,
-                        user_id=random.choice(users).user_id,
-                        access_type=random.choice(["view", "edit"]),
-                        expires_at=datetime.utcnow() + timedelta(days=30),
-                    ))
-            db.add_all(consents)
-            await db.commit()
-            print("Inserted 50 consents")
-
-            # 7. Insert Health Summaries
-            health_summaries = []
-            for patient in patients:
-                health_summaries.append(HealthSummary(
-                    patient_id=patient.patient_id,
-                    diagnoses=[{"code": "E11.9", "system": "ICD-10", "display": "Type 2 diabetes mellitus"}],
-                    medications=[{"name": "Metformin", "dose": "500mg", "frequency": "twice daily"}],
-                    allergies=[{"name": "Penicillin", "reaction": "Rash"}],
-                ))
-            db.add_all(health_summaries)
-            await db.commit()
-            print("Inserted 25 health summaries")
-
-            # 8. Insert Notes
-            notes = []
-            for _ in range(50):
-                patient = random.choice(patients)
-                notes.append(Note(
-                    patient_id=patient.patient_id,
-                    user_id=random.choice(users).user_id,
-                    content=fake.sentence(nb_words=20),
-                ))
-            db.add_all(notes)
-            await db.commit()
-            print("Inserted 50 notes")
-
-            print("Synthetic data inserted successfully!")
-        except Exception as e:
-            print(f"Error inserting synthetic data: {str(e)}")
-            await db.rollback()
+from sqlalchemy.pool import NullPool
+
+from app.catalog import TEST_TYPES_CATALOG, bump_catalog_version
+from app.config import settings
+from app.consents import CONSENTS_CATALOG
+from app.database import create_engine
+from app.migrations import check_schema
+from app.summary import SummaryRebuildJob
+from app.rollups import rebuild_rollups
+
+# Entity ids are uuid5(NAMESPACE, "<seed>:<kind>:<index>") so any chunk can reference
+# rows generated by another chunk (or another process) without looking them up
+NAMESPACE = uuid.UUID("0c6f8f52-3a9e-4d7b-9a51-6f2d0f6b1e37")
+# Timestamps are spread backwards from a fixed point so reruns produce identical rows
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+DEFAULT_CHUNK_SIZE = 50_000
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+TEST_TYPES = [
+    # name, LOINC code, unit, low, high (unit None: qualitative result)
+    ("Complete Blood Count", "LOINC:58410-2", "10^9/L", 4.0, 11.0),
+    ("X-Ray Chest", "LOINC:42272-5", None, None, None),
+    ("MRI Brain", "LOINC:24590-2", None, None, None),
+    ("Lipid Panel", "LOINC:57698-3", "mmol/L", 3.0, 7.5),
+    ("Blood Glucose", "LOINC:2345-7", "mmol/L", 3.5, 11.0),
+    ("Urinalysis", "LOINC:24356-8", None, None, None),
+    ("ECG", "LOINC:11524-6", None, None, None),
+    ("CT Abdomen", "LOINC:78970-6", None, None, None),
+    ("Hemoglobin A1c", "LOINC:4548-4", "%", 4.0, 10.0),
+    ("Thyroid Panel", "LOINC:24348-5", "mIU/L", 0.3, 6.0),
+]
+QUALITATIVE_RESULTS = ["Normal", "No acute findings", "Abnormal, follow up advised", "Inconclusive"]
+STAFF_ROLES = ["admin", "doctor", "doctor", "staff", "staff", "staff"]
+NOTE_WORDS = (
+    "patient reports pain fever cough stable improved worsening follow up prescribed dose blood pressure "
+    "elevated normal review labs imaging chest headache nausea fatigue sleep diet exercise referral "
+    "cardiology neurology asthma diabetes insulin allergy rash wound healing discharge admitted"
+).split()
+DIAGNOSES = [
+    {"code": "E11.9", "system": "ICD-10", "display": "Type 2 diabetes mellitus"},
+    {"code": "I10", "system": "ICD-10", "display": "Essential hypertension"},
+    {"code": "J45.909", "system": "ICD-10", "display": "Asthma"},
+    {"code": "E78.5", "system": "ICD-10", "display": "Hyperlipidemia"},
+]
+MEDICATIONS = [
+    {"name": "Metformin", "dose": "500mg", "frequency": "twice daily"},
+    {"name": "Lisinopril", "dose": "10mg", "frequency": "daily"},
+    {"name": "Salbutamol", "dose": "100mcg", "frequency": "as needed"},
+    {"name": "Atorvastatin", "dose": "20mg", "frequency": "daily"},
+]
+ALLERGIES = [{"name": "Penicillin", "reaction": "Rash"}, {"name": "Peanuts", "reaction": "Anaphylaxis"}]
+
+PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS synthetic_data_chunks (
+        seed BIGINT NOT NULL,
+        table_name VARCHAR NOT NULL,
+        chunk_no INTEGER NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        loaded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+        PRIMARY KEY (seed, table_name, chunk_no)
+    )
+"""
+
+# The parts of a Plan that existing rows depend on, fixed when a seed is first loaded
+PLAN_TABLE = """
+    CREATE TABLE IF NOT EXISTS synthetic_data_plans (
+        seed BIGINT NOT NULL PRIMARY KEY,
+        hospitals INTEGER NOT NULL,
+        staff INTEGER NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    )
+"""
+FIXED_PLAN_FIELDS = ("hospitals", "staff", "chunk_size")
+
+
+@dataclass(frozen=True)
+class Plan:
+    seed: int
+    hospitals: int
+    staff: int
+    patients: int
+    test_results: int
+    notes: int
+    consents: int
+    chunk_size: int
+    password_hash: str
+
+
+def entity_id(plan: Plan, kind: str, index: int) -> uuid.UUID:
+    return uuid.uuid5(NAMESPACE, f"{plan.seed}:{kind}:{index}")
+
+
+def random_id(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def license_number(plan: Plan, hospital: int) -> str:
+    return f"S{plan.seed}-HOSP{hospital + 1:03d}"
+
+
+def hospital_of(plan: Plan, patient: int) -> int:
+    return patient % plan.hospitals
+
+
+def patient_unique_id(plan: Plan, patient: int) -> str:
+    return f"{BASE_TIME.year}-{license_number(plan, hospital_of(plan, patient))}-{patient:07d}"
+
+
+def before(rng: random.Random, days: int) -> datetime:
+    return BASE_TIME - timedelta(seconds=rng.randrange(days * 86400))
+
+
+def hospital_rows(plan, rng, fake, start, stop):
+    for i in range(start, stop):
+        address = {"street": fake.street_address(), "city": fake.city(), "state": fake.state_abbr(), "zip": fake.zipcode()}
+        yield (
+            entity_id(plan, "hospital", i), f"{fake.city()} General Hospital", license_number(plan, i),
+            json.dumps(address), fake.company_email(), fake.phone_number()[:20], plan.password_hash,
+            before(rng, 3650),
+        )
+
+
+def test_type_rows(plan, rng, fake, start, stop):
+    for i in range(start, stop):
+        name, code, *_ = TEST_TYPES[i]
+        yield entity_id(plan, "test_type", i), name, code, BASE_TIME
+
+
+def user_rows(plan, rng, fake, start, stop):
+    # The first plan.staff users work at the hospitals; the rest log in as patients
+    for i in range(start, stop):
+        first_name, last_name = fake.first_name(), fake.last_name()
+        email = f"{first_name}.{last_name}.{plan.seed}.{i}@example.test".lower().replace(" ", "").replace("'", "")
+        if i < plan.staff:
+            user_id, role, hospital_id = entity_id(plan, "staff", i), rng.choice(STAFF_ROLES), entity_id(plan, "hospital", i % plan.hospitals)
+        else:
+            user_id, role, hospital_id = entity_id(plan, "patient_user", i - plan.staff), "patient", None
+        yield user_id, email, plan.password_hash, role, hospital_id, first_name, last_name, before(rng, 3650)
+
+
+def patient_rows(plan, rng, fake, start, stop):
+    for i in range(start, stop):
+        hospital = hospital_of(plan, i)
+        emergency_contact = {
+            "name": fake.name(),
+            "phone": fake.phone_number()[:20],
+            "relation": rng.choice(["spouse", "parent", "sibling"]),
+        }
+        yield (
+            entity_id(plan, "patient", i), entity_id(plan, "patient_user", i),
+            patient_unique_id(plan, i),
+            date(1940, 1, 1) + timedelta(days=rng.randrange(65 * 365)), rng.choice(["male", "female", "other"]),
+            fake.phone_number()[:20], json.dumps(emergency_contact), entity_id(plan, "hospital", hospital),
+            before(rng, 3650),
+        )
+
+
+def health_summary_rows(plan, rng, fake, start, stop):
+    # Counters are filled in afterwards by the summary rebuild
+    for i in range(start, stop):
+        yield (
+            entity_id(plan, "summary", i), entity_id(plan, "patient", i),
+            json.dumps(rng.sample(DIAGNOSES, rng.randint(0, 2))),
+            json.dumps(rng.sample(MEDICATIONS, rng.randint(0, 2))),
+            json.dumps(rng.sample(ALLERGIES, rng.randint(0, 1))),
+            BASE_TIME,
+        )
+
+
+def test_result_rows(plan, rng, fake, start, stop):
+    for _ in range(start, stop):
+        patient = rng.randrange(plan.patients)
+        test_type = rng.randrange(len(TEST_TYPES))
+        _, _, unit, low, high = TEST_TYPES[test_type]
+        result = f"{rng.uniform(low, high):.1f} {unit}" if unit else rng.choice(QUALITATIVE_RESULTS)
+        taken_at = before(rng, 5 * 365)
+        yield (
+            random_id(rng), entity_id(plan, "patient", patient), entity_id(plan, "test_type", test_type), result,
+            taken_at.replace(tzinfo=None), entity_id(plan, "hospital", hospital_of(plan, patient)),
+            taken_at + timedelta(hours=rng.randint(1, 72)),
+        )
+
+
+def note_rows(plan, rng, fake, start, stop):
+    for _ in range(start, stop):
+        patient = rng.randrange(plan.patients)
+        author = entity_id(plan, "staff", rng.randrange(plan.staff)) if plan.staff else None
+        content = " ".join(rng.choices(NOTE_WORDS, k=rng.randint(8, 30))).capitalize() + "."
+        yield random_id(rng), entity_id(plan, "patient", patient), author, content, before(rng, 5 * 365)
+
+
+def consent_rows(plan, rng, fake, start, stop):
+    for _ in range(start, stop):
+        patient = rng.randrange(plan.patients)
+        owner = hospital_of(plan, patient)
+        hospital = (owner + rng.randrange(1, plan.hospitals)) % plan.hospitals if plan.hospitals > 1 else owner
+        granted_at = before(rng, 365)
+        revoked_at = granted_at + timedelta(days=rng.randint(1, 30)) if rng.random() < 0.1 else None
+        yield (
+            random_id(rng), entity_id(plan, "patient", patient), entity_id(plan, "hospital", hospital),
+            entity_id(plan, "patient_user", patient), rng.choice(["view", "edit"]), granted_at,
+            granted_at + timedelta(days=rng.randint(30, 730)), revoked_at,
+        )
+
+
+class Table(NamedTuple):
+    name: str
+    columns: Tuple[str, ...]
+    count: Callable[[Plan], int]
+    rows: Callable
+
+
+# In dependency order; tables in the same phase only reference earlier phases
+PHASES = [
+    [
+        Table("hospitals", ("hospital_id", "name", "license_number", "address", "contact_email", "contact_phone",
+                            "password_hash", "created_at"), lambda p: p.hospitals, hospital_rows),
+        Table("test_types", ("test_type_id", "name", "description", "created_at"),
+              lambda p: len(TEST_TYPES), test_type_rows),
+    ],
+    [
+        Table("users", ("user_id", "email", "password_hash", "role", "hospital_id", "first_name", "last_name",
+                        "created_at"), lambda p: p.staff + p.patients, user_rows),
+    ],
+    [
+        Table("patients", ("patient_id", "user_id", "unique_id", "dob", "gender", "contact_phone",
+                           "emergency_contact", "created_by_hospital_id", "created_at"),
+              lambda p: p.patients, patient_rows),
+    ],
+    [
+        Table("health_summaries", ("summary_id", "patient_id", "diagnoses", "medications", "allergies",
+                                   "last_updated"), lambda p: p.patients, health_summary_rows),
+        Table("test_results", ("test_result_id", "patient_id", "test_type_id", "result", "test_date",
+                               "created_by_hospital_id", "created_at"), lambda p: p.test_results, test_result_rows),
+        Table("notes", ("note_id", "patient_id", "user_id", "content", "created_at"), lambda p: p.notes, note_rows),
+        Table("consents", ("consent_id", "patient_id", "hospital_id", "user_id", "access_type", "granted_at",
+                           "expires_at", "revoked_at"), lambda p: p.consents, consent_rows),
+    ],
+]
+TABLES = {table.name: table for phase in PHASES for table in phase}
+
+_fake = None
+
+
+def _faker() -> Faker:
+    # One Faker per worker process; it is reseeded for every chunk
+    global _fake
+    if _fake is None:
+        _fake = Faker()
+    return _fake
+
+
+def chunk_rows(plan: Plan, table: Table, chunk_no: int) -> list:
+    rng = random.Random(f"{plan.seed}:{table.name}:{chunk_no}")
+    fake = _faker()
+    fake.seed_instance(rng.getrandbits(64))
+    start = chunk_no * plan.chunk_size
+    return list(table.rows(plan, rng, fake, start, min(start + plan.chunk_size, table.count(plan))))
+
+
+async def _copy_chunk(dsn: str, plan: Plan, table: Table, chunk_no: int, skip: int) -> int:
+    records = chunk_rows(plan, table, chunk_no)
+    conn = await asyncpg.connect(dsn)
+    try:
+        async with conn.transaction():
+            await conn.copy_records_to_table(table.name, records=records[skip:], columns=table.columns)
+            await conn.execute(
+                """
+                INSERT INTO synthetic_data_chunks (seed, table_name, chunk_no, chunk_size, rows)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (seed, table_name, chunk_no) DO UPDATE SET rows = excluded.rows, loaded_at = now()
+                """,
+                plan.seed, table.name, chunk_no, plan.chunk_size, len(records),
+            )
+    finally:
+        await conn.close()
+    return len(records) - skip
+
+
+def load_chunk(dsn: str, plan: Plan, table_name: str, chunk_no: int, skip: int) -> Tuple[str, int]:
+    """Worker entry point: generate one chunk and COPY the rows not loaded yet."""
+    return table_name, asyncio.run(_copy_chunk(dsn, plan, TABLES[table_name], chunk_no, skip))
+
+
+def _check_fixed_plan(plan: Plan, recorded) -> None:
+    changed = [
+        f"--{name.replace('_', '-')} {getattr(recorded, name)}"
+        for name in FIXED_PLAN_FIELDS if getattr(recorded, name) != getattr(plan, name)
+    ]
+    if changed:
+        raise SystemExit(
+            f"Seed {plan.seed} was loaded with {', '.join(changed)}; rerun with the same values to resume "
+            "or top up, or use another --seed"
+        )
+
+
+async def prepare(engine, plan: Plan) -> dict:
+    await check_schema(engine)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(PROGRESS_TABLE)
+        await conn.exec_driver_sql(PLAN_TABLE)
+        fixed = {name: getattr(plan, name) for name in FIXED_PLAN_FIELDS}
+        inserted = await conn.scalar(
+            text(
+                "INSERT INTO synthetic_data_plans (seed, hospitals, staff, chunk_size) "
+                "VALUES (:seed, :hospitals, :staff, :chunk_size) ON CONFLICT (seed) DO NOTHING RETURNING seed"
+            ),
+            {"seed": plan.seed, **fixed},
+        )
+        result = await conn.execute(
+            text("SELECT hospitals, staff, chunk_size FROM synthetic_data_plans WHERE seed = :seed"),
+            {"seed": plan.seed},
+        )
+        _check_fixed_plan(plan, result.one())
+        result = await conn.execute(
+            text("SELECT table_name, chunk_no, chunk_size, rows FROM synthetic_data_chunks WHERE seed = :seed"),
+            {"seed": plan.seed},
+        )
+        done = {}
+        for table_name, chunk_no, chunk_size, rows in result:
+            if chunk_size != plan.chunk_size:
+                raise SystemExit(
+                    f"Seed {plan.seed} was loaded with --chunk-size {chunk_size}; rerun with that size to resume"
+                )
+            done[(table_name, chunk_no)] = rows
+    if inserted is not None and done:
+        print(
+            f"Seed {plan.seed} was loaded before its plan was recorded; --hospitals and --staff are taken to be "
+            "the values it was loaded with"
+        )
+    return done
+
+
+def pending_chunks(plan: Plan, table: Table, done: dict):
+    """(chunk_no, rows already loaded) for every chunk that is missing rows."""
+    total = table.count(plan)
+    for chunk_no in range((total + plan.chunk_size - 1) // plan.chunk_size):
+        expected = min(plan.chunk_size, total - chunk_no * plan.chunk_size)
+        loaded = done.get((table.name, chunk_no), 0)
+        if loaded < expected:
+            yield chunk_no, loaded
+
+
+async def finish(engine, plan: Plan, rebuild_summaries: bool):
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        # Running API workers reload their catalogs on the next check
+        await bump_catalog_version(db, TEST_TYPES_CATALOG)
+        await bump_catalog_version(db, CONSENTS_CATALOG)
+        await db.commit()
+    # COPY bypasses the write path, so the dashboard rollups are always recounted
+    start = time.perf_counter()
+    rollups = await rebuild_rollups(session_factory)
+    print(f"Rebuilt dashboard rollups for {rollups['hospitals']:,} hospitals in {time.perf_counter() - start:.1f}s")
+    if rebuild_summaries:
+        return await SummaryRebuildJob(engine, interval_seconds=0).run_once()
+
+
+def main(args):
+    # A fixed salt keeps the hash (and so every generated row) identical across runs
+    password_hash = pbkdf2_sha256.using(salt=f"synthetic-{args.seed}".encode()).hash(args.password)
+    plan = Plan(
+        seed=args.seed,
+        hospitals=args.hospitals,
+        staff=args.staff,
+        patients=args.patients,
+        test_results=args.test_results,
+        notes=args.notes,
+        consents=args.consents,
+        chunk_size=args.chunk_size,
+        password_hash=password_hash,
+    )
+    dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    engine = create_engine(poolclass=NullPool)
+    done = asyncio.run(prepare(engine, plan))
+
+    started = time.perf_counter()
+    loaded = 0
+    # spawn: workers start clean instead of inheriting the parent's event loop and engine
+    with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for phase in PHASES:
+            futures = set()
+            remaining = {}
+            for table in phase:
+                chunks = list(pending_chunks(plan, table, done))
+                remaining[table.name] = sum(
+                    min(plan.chunk_size, table.count(plan) - chunk_no * plan.chunk_size) - skip
+                    for chunk_no, skip in chunks
+                )
+                skipped = table.count(plan) - remaining[table.name]
+                if skipped:
+                    print(f"{table.name}: {skipped:,} rows already loaded, resuming")
+                futures |= {pool.submit(load_chunk, dsn, plan, table.name, chunk_no, skip) for chunk_no, skip in chunks}
+            reported_at = time.perf_counter()
+            while futures:
+                finished, futures = wait(futures, timeout=PROGRESS_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    table_name, rows = future.result()
+                    remaining[table_name] -= rows
+                    loaded += rows
+                now = time.perf_counter()
+                if now - reported_at >= PROGRESS_INTERVAL_SECONDS or not futures:
+                    reported_at = now
+                    pending = ", ".join(f"{name} {rows:,}" for name, rows in remaining.items() if rows)
+                    print(
+                        f"{loaded:,} rows in {now - started:.1f}s ({loaded / (now - started):,.0f} rows/s)"
+                        + (f"; remaining: {pending}" if pending else "")
+                    )
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {loaded:,} rows in {elapsed:.1f}s ({loaded / elapsed if elapsed else 0:,.0f} rows/s)")
+
+    result = asyncio.run(finish(engine, plan, not args.skip_summaries))
+    if result is not None:
+        print(f"Rebuilt health summaries for {result['patients']:,} patients in {result['seconds']:.1f}s")
+    print(f"Log in as hospital {license_number(plan, 0)} or patient {patient_unique_id(plan, 0)} "
+          f"with password {args.password!r}")
+    return plan
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hospitals", type=int, default=5)
+    parser.add_argument("--staff", type=int, default=25, help="admin, doctor and staff users")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--test-results", type=int, default=10_000)
+    parser.add_argument("--notes", type=int, default=2_000)
+    parser.add_argument("--consents", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per COPY")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--skip-summaries", action="store_true", help="do not rebuild health summaries afterwards")
+    return parser
+
 
 if __name__ == "__main__":
-    asyncio.run(generate_synthetic_data())
\ No newline at end of file
+    main(build_parser().parse_args())
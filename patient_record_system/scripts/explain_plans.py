@@ -0,0 +1,130 @@
+"""Print EXPLAIN plans for the endpoint queries with and without the hot path indexes.
+
+Nothing is dropped or locked beyond what the queries themselves take, so this is safe to
+point at a live database. For the "before" plans the indexes created by migration 0002
+are hidden from the planner of this session only: with the hypopg extension installed
+(hypopg_hide_index, 1.4+) exactly those indexes are hidden; otherwise index and bitmap
+scans are switched off for the transaction, which also hides every other index and so
+overstates the "before" cost. --analyze executes each query twice, in transactions that
+are rolled back, so the create_test_result insert leaves nothing behind.
+
+    python -m scripts.explain_plans [--analyze]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+from datetime import date
+from sqlalchemy import func, text
+from sqlalchemy.future import select
+
+from app.analytics import slice_query
+from app.database import engine
+from app.main import hospital_patients_query, patient_test_results_query, test_result_insert_query
+from app.migrations.m0002_hot_path_indexes import INDEXES
+from app.models import Hospital, Patient, TestResult, TestType, Consent
+from app.pagination import DEFAULT_PAGE_SIZE
+from app.timeline import timeline_query
+
+
+async def sample_ids(conn):
+    hospital_id = await conn.scalar(
+        select(Patient.created_by_hospital_id)
+        .group_by(Patient.created_by_hospital_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    patient_id = await conn.scalar(
+        select(TestResult.patient_id).group_by(TestResult.patient_id).order_by(func.count().desc()).limit(1)
+    )
+    if patient_id is None:
+        patient_id = await conn.scalar(select(Patient.patient_id).limit(1))
+    unique_id = await conn.scalar(select(Patient.unique_id).filter(Patient.patient_id == patient_id))
+    created_at = await conn.scalar(select(Patient.created_at).filter(Patient.patient_id == patient_id))
+    test_type_id = await conn.scalar(select(TestType.test_type_id).limit(1))
+    return hospital_id, patient_id, unique_id, created_at, test_type_id
+
+
+def endpoint_queries(hospital_id, patient_id, unique_id, created_at, test_type_id):
+    """The statements the endpoints run, built by the same helpers."""
+    page = DEFAULT_PAGE_SIZE + 1
+    return {
+        "list_hospital_patients": hospital_patients_query(hospital_id).limit(page),
+        "list_hospital_patients (cursor)": hospital_patients_query(hospital_id, keyset=(created_at, patient_id)).limit(page),
+        "list_hospital_patients (unique_id)": hospital_patients_query(hospital_id, unique_id).limit(page),
+        "create_test_result": test_result_insert_query(
+            patient_id, hospital_id, test_type_id, "5.4 mmol/L", date.today()
+        ),
+        "get_patient_test_results": patient_test_results_query(patient_id).limit(page),
+        "get_patient_timeline": timeline_query(patient_id, limit=page),
+        "get_test_type_analytics": slice_query(hospital_id, test_type_id),
+        "list_patient_consents": select(Consent)
+        .filter(Consent.patient_id == patient_id)
+        .order_by(Consent.granted_at.desc()),
+        "login (hospital)": select(Hospital).filter(Hospital.license_number == "HOSP001"),
+    }
+
+
+async def explain_all(conn, queries, analyze):
+    plans = {}
+    for name, query in queries.items():
+        compiled = query.compile(dialect=conn.dialect)
+        params = compiled.construct_params()
+        prefix = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+        result = await conn.exec_driver_sql(
+            f"{prefix} {compiled}", tuple(params[key] for key in compiled.positiontup)
+        )
+        plans[name] = "\n".join(row[0] for row in result)
+    return plans
+
+
+async def can_hide_indexes(conn) -> bool:
+    return bool(await conn.scalar(text(
+        "SELECT count(*) FROM pg_proc WHERE proname = 'hypopg_hide_index'"
+    )))
+
+
+async def hide_hot_path_indexes(conn, hypopg: bool) -> str:
+    """Hide the indexes of migration 0002 from this session's planner, until rollback or unhide."""
+    if hypopg:
+        for name in INDEXES:
+            await conn.execute(
+                text("SELECT hypopg_hide_index(CAST(:name AS regclass)) WHERE to_regclass(:name) IS NOT NULL"),
+                {"name": name},
+            )
+        return "hot path indexes hidden with hypopg"
+    for setting in ("enable_indexscan", "enable_indexonlyscan", "enable_bitmapscan"):
+        await conn.exec_driver_sql(f"SET LOCAL {setting} = off")
+    return "all index scans disabled (install hypopg to hide only the hot path indexes)"
+
+
+async def main(args):
+    try:
+        async with engine.connect() as conn:
+            queries = endpoint_queries(*await sample_ids(conn))
+            await conn.rollback()
+            hypopg = await can_hide_indexes(conn)
+            hidden = await hide_hot_path_indexes(conn, hypopg)
+            before = await explain_all(conn, queries, args.analyze)
+            if hypopg:
+                await conn.execute(text("SELECT hypopg_unhide_all_indexes()"))
+            await conn.rollback()
+            after = await explain_all(conn, queries, args.analyze)
+    finally:
+        await engine.dispose()
+    print(f"before: {hidden}\n")
+    for name in queries:
+        print(f"=== {name}")
+        print("--- before")
+        print(before[name])
+        print("--- after")
+        print(after[name])
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analyze", action="store_true", help="run EXPLAIN ANALYZE (executes the queries)")
+    asyncio.run(main(parser.parse_args()))
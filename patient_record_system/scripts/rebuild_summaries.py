@@ -0,0 +1,38 @@
+"""Recompute incrementally maintained health summaries from test results and notes.
+
+Only rows that drifted are rewritten; the output reports how many that was:
+
+    python -m scripts.rebuild_summaries [--patient PATIENT_ID ...] [--batch-size N]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+from uuid import UUID
+
+from app.database import engine
+from app.summary import SUMMARY_REBUILD_BATCH_SIZE, SummaryRebuildJob, rebuild_summaries
+
+
+async def main(args):
+    try:
+        if args.patient:
+            job = SummaryRebuildJob(engine, interval_seconds=0)
+            result = await rebuild_summaries(job.session_factory, args.patient, batch_size=args.batch_size)
+        else:
+            result = await SummaryRebuildJob(engine, interval_seconds=0, batch_size=args.batch_size).run_once()
+            if result is None:
+                print("Another rebuild is running; nothing done")
+                return
+    finally:
+        await engine.dispose()
+    print(f"Checked {result['patients']} patients, repaired {result['repaired']} summaries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patient", type=UUID, action="append", help="only rebuild this patient (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=SUMMARY_REBUILD_BATCH_SIZE)
+    asyncio.run(main(parser.parse_args()))
@@ -4,21 +4,32 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
 import httpx
+import csv
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from app.main import app, get_db
-from app.models import Base, Hospital, User, Patient
+from sqlalchemy.pool import NullPool
+from app.main import app, get_db, create_access_token
+from app.database import create_engine, get_read_db
+from app.models import Base, Hospital, User, Patient, Note, Consent, HealthSummary
+from app.hashing import pwd_context
+from app.migrations import upgrade
+from app.summary import rebuild_summaries
+from app.rollups import rebuild_rollups
+from app.sync import changes_query
+from app.consents import ConsentIndex
 from sqlalchemy.future import select
-from dotenv import load_dotenv
+from sqlalchemy import event, text
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import time
 import os
 
-# Load environment variables
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-
 # Test database setup
-test_engine = create_async_engine(DATABASE_URL, echo=True)
+# NullPool: sessions are opened from both the test loop and the TestClient's loop
+test_engine = create_engine(poolclass=NullPool)
 TestAsyncSessionLocal = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
 
 # Override dependency for testing
@@ -27,6 +38,7 @@ async def override_get_db():
         yield session
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 client = TestClient(app)
 
@@ -106,4 +118,854 @@ async def test_create_patient():
     assert response.status_code == 201
     patient = response.json()
     assert patient["unique_id"] == "2025-HOSP999-999999"
-    assert patient["gender"] == "male"
\ No newline at end of file
+    assert patient["gender"] == "male"
+
+def create_patient_user():
+    async def _create():
+        async with TestAsyncSessionLocal() as session:
+            user = User(email=f"{uuid4().hex}@example.com", password_hash="unused", role="patient")
+            session.add(user)
+            await session.commit()
+            return str(user.user_id)
+    return asyncio.run(_create())
+
+def create_admin_user():
+    async def _create():
+        async with TestAsyncSessionLocal() as session:
+            user = User(email=f"{uuid4().hex}@example.com", password_hash=pwd_context.hash("password123"), role="admin")
+            session.add(user)
+            await session.commit()
+            return user.email
+    return asyncio.run(_create())
+
+def create_test_type(test_client, name=None):
+    email = create_admin_user()
+    response = test_client.post("/token", data={"grant_type": "user", "username": email, "password": "password123"})
+    assert response.status_code == 200
+    response = test_client.post(
+        "/test_types/",
+        json={"name": name or f"Test Type {uuid4().hex[:6]}"},
+        headers={"Authorization": f"Bearer {response.json()['access_token']}"},
+    )
+    assert response.status_code == 201
+    return response.json()["test_type_id"]
+
+@pytest.fixture(scope="module")
+def hospital_client():
+    asyncio.run(upgrade(test_engine))
+    with TestClient(app) as test_client:
+        license_number = f"HOSP-{uuid4().hex[:8]}"
+        response = test_client.post("/hospitals/", json={
+            "name": "Fixture Hospital",
+            "license_number": license_number,
+            "address": {"city": "Test City"},
+            "password": "password123",
+        })
+        assert response.status_code == 201
+        hospital = response.json()
+        response = test_client.post("/token", data={
+            "grant_type": "hospital",
+            "username": license_number,
+            "password": "password123",
+        })
+        assert response.status_code == 200
+        test_client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield test_client, hospital
+
+def register_patient(test_client, hospital, **fields):
+    patient_data = {
+        "user_id": create_patient_user(),
+        "unique_id": f"2025-{hospital['license_number']}-{uuid4().hex[:6]}",
+        "dob": "1980-01-01",
+        "created_by_hospital_id": hospital["hospital_id"],
+        **fields,
+    }
+    response = test_client.post("/hospitals/patients/", json=patient_data)
+    assert response.status_code == 201
+    return response.json()
+
+def test_list_hospital_patients_keyset_pagination(hospital_client):
+    test_client, hospital = hospital_client
+    created = {register_patient(test_client, hospital)["patient_id"] for _ in range(5)}
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = test_client.get("/hospitals/patients/", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen += [p["patient_id"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert created <= set(seen)
+    assert len(seen) == len(set(seen))
+
+def test_list_hospital_patients_ndjson_stream(hospital_client):
+    test_client, hospital = hospital_client
+    register_patient(test_client, hospital)
+    response = test_client.get("/hospitals/patients/", params={"stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows and all(r["created_by_hospital_id"] == hospital["hospital_id"] for r in rows)
+    assert len(rows) == len(test_client.get("/hospitals/patients/", params={"limit": 1000}).json())
+
+def test_list_hospital_patients_rejects_bad_cursor(hospital_client):
+    test_client, _ = hospital_client
+    response = test_client.get("/hospitals/patients/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_bulk_create_patients_ndjson(hospital_client):
+    test_client, hospital = hospital_client
+    existing = register_patient(test_client, hospital)
+    user_id = create_patient_user()
+    unique_id = f"BULK-{uuid4().hex[:8]}"
+    rows = [
+        {"user_id": user_id, "unique_id": unique_id, "dob": "1990-05-01"},
+        {"user_id": user_id, "unique_id": unique_id, "dob": "1990-05-01"},
+        {"user_id": user_id, "unique_id": existing["unique_id"], "dob": "1990-05-01"},
+        {"user_id": str(uuid4()), "unique_id": f"BULK-{uuid4().hex[:8]}", "dob": "1990-05-01"},
+        {"user_id": user_id, "unique_id": f"BULK-{uuid4().hex[:8]}"},
+    ]
+    body = "\n".join(json.dumps(r) for r in rows) + "\nnot json\n"
+    response = test_client.post(
+        "/hospitals/patients/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert [r["status"] for r in result["results"]] == ["accepted"] + ["rejected"] * 5
+    assert result["accepted"] == 1 and result["rejected"] == 5
+    listed = test_client.get("/hospitals/patients/", params={"unique_id": unique_id}).json()
+    assert [p["patient_id"] for p in listed] == [result["results"][0]["patient_id"]]
+
+def test_bulk_create_patients_csv(hospital_client):
+    test_client, hospital = hospital_client
+    user_id = create_patient_user()
+    body = "user_id,unique_id,dob,gender,emergency_contact\n" + "".join(
+        f'{user_id},CSV-{uuid4().hex[:8]},1985-02-0{i + 1},female,"{{""name"": ""Kin {i}""}}"\n' for i in range(3)
+    )
+    response = test_client.post("/hospitals/patients/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 3
+
+def test_bulk_create_patients_rejects_malformed_bodies(hospital_client):
+    test_client, _ = hospital_client
+    response = test_client.post(
+        "/hospitals/patients/bulk", content="unique_id\n\xe9t\xe9\n".encode("latin-1"),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Body must be UTF-8"
+
+    user_id = create_patient_user()
+    # A field over csv.field_size_limit() makes the reader raise csv.Error mid-stream
+    oversized = "x" * (csv.field_size_limit() + 1)
+    body = f"user_id,unique_id,dob\n{user_id},CSV-{uuid4().hex[:8]},1985-02-01\n{user_id},{oversized},1985-02-01\n"
+    response = test_client.post("/hospitals/patients/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    result = response.json()
+    assert [r["status"] for r in result["results"]] == ["accepted", "rejected"]
+    assert result["results"][1]["error"].startswith("Invalid CSV: field larger than field limit")
+
+def test_bulk_create_patients_rejects_unknown_content_type(hospital_client):
+    test_client, _ = hospital_client
+    response = test_client.post("/hospitals/patients/bulk", content="{}", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+def test_bulk_create_test_results_partial_success(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    test_type_id = create_test_type(test_client)
+    rows = [
+        {"patient_id": patient["patient_id"], "test_type_id": test_type_id, "result": "5.4 mmol/L", "test_date": "2025-01-02"},
+        {"patient_id": patient["patient_id"], "test_type_id": test_type_id, "result": "5.9 mmol/L", "test_date": "2025-01-03"},
+        {"patient_id": str(uuid4()), "test_type_id": test_type_id, "result": "1", "test_date": "2025-01-03"},
+        {"patient_id": patient["patient_id"], "test_type_id": str(uuid4()), "result": "1", "test_date": "2025-01-03"},
+        {"patient_id": patient["patient_id"], "test_type_id": test_type_id, "result": "1"},
+    ]
+    body = "\n".join(json.dumps(r) for r in rows)
+    response = test_client.post(
+        "/hospitals/test_results/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["accepted"] == 2
+    assert [e["row"] for e in result["errors"]] == [3, 4, 5]
+
+def test_create_test_type_updates_catalog(hospital_client):
+    test_client, hospital = hospital_client
+    name = f"Catalog Type {uuid4().hex[:6]}"
+    test_type_id = create_test_type(test_client, name)
+    assert any(t["test_type_id"] == test_type_id for t in test_client.get("/test_types/").json())
+    patient = register_patient(test_client, hospital)
+    response = test_client.post(
+        f"/hospitals/patients/{patient['patient_id']}/test_results/",
+        json={"test_type_id": test_type_id, "result": "positive", "test_date": "2025-03-01"},
+    )
+    assert response.status_code == 201
+    assert response.json()["test_type_name"] == name
+    response = test_client.post(
+        f"/hospitals/patients/{patient['patient_id']}/test_results/",
+        json={"test_type_id": str(uuid4()), "result": "positive", "test_date": "2025-03-01"},
+    )
+    assert response.status_code == 400
+
+def test_create_test_type_requires_admin(hospital_client):
+    test_client, _ = hospital_client
+    response = test_client.post("/test_types/", json={"name": "Not allowed"})
+    assert response.status_code == 401
+
+def test_db_health_reports_pool_wait(hospital_client):
+    test_client, _ = hospital_client
+    response = test_client.get("/health/db")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["checkouts"] >= 1
+    assert stats["wait_histogram"]["le_inf"] == stats["checkouts"]
+
+def scrape_metrics(test_client):
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+def test_metrics_report_db_work_per_route_template(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    labels = '{method="GET",route="/hospitals/patients/{patient_id}",status="2xx"}'
+    before = scrape_metrics(test_client)
+    for _ in range(2):
+        assert test_client.get(f"/hospitals/patients/{patient['patient_id']}").status_code == 200
+    test_client.get(f"/no-such-route/{uuid4()}")
+    after = scrape_metrics(test_client)
+    assert after[f"http_request_duration_seconds_count{labels}"] - before.get(f"http_request_duration_seconds_count{labels}", 0) == 2
+    assert after[f"http_request_db_queries_sum{labels}"] - before.get(f"http_request_db_queries_sum{labels}", 0) >= 2
+    assert after[f"http_request_db_rows_total{labels}"] - before.get(f"http_request_db_rows_total{labels}", 0) >= 2
+    # Unmatched paths share one series instead of adding a label value per URL
+    assert not any("no-such-route" in name for name in after)
+    assert after['http_request_duration_seconds_count{method="GET",route="unmatched",status="4xx"}'] >= 1
+
+def test_fast_list_serialization_matches_response_model(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital, emergency_contact={"name": "Kin"})
+    listed = test_client.get("/hospitals/patients/", params={"unique_id": patient["unique_id"]}).json()
+    assert listed == [patient]
+
+def add_timeline_records(patient_id, notes=0, consents=0, summary=False):
+    async def _add():
+        async with TestAsyncSessionLocal() as session:
+            now = datetime.now(timezone.utc)
+            for i in range(notes):
+                session.add(Note(patient_id=patient_id, content=f"note {i}", created_at=now - timedelta(hours=i)))
+            for i in range(consents):
+                session.add(Consent(patient_id=patient_id, access_type="read", granted_at=now - timedelta(days=i)))
+            session.add(Consent(patient_id=patient_id, access_type="read", revoked_at=now))
+            if summary:
+                session.add(HealthSummary(patient_id=patient_id, diagnoses=["asthma"], last_updated=now))
+            await session.commit()
+    asyncio.run(_add())
+
+def count_queries():
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def test_patient_timeline_uses_fixed_query_count(hospital_client):
+    test_client, hospital = hospital_client
+    test_type_id = create_test_type(test_client)
+    small = register_patient(test_client, hospital)
+    large = register_patient(test_client, hospital)
+    add_timeline_records(small["patient_id"], notes=1)
+    add_timeline_records(large["patient_id"], notes=20, consents=5, summary=True)
+    for day in range(1, 16):
+        response = test_client.post(
+            f"/hospitals/patients/{large['patient_id']}/test_results/",
+            json={"test_type_id": test_type_id, "result": str(day), "test_date": f"2025-01-{day:02d}"},
+        )
+        assert response.status_code == 201
+
+    counts = {}
+    for patient in (small, large):
+        statements, stop = count_queries()
+        try:
+            response = test_client.get(f"/hospitals/patients/{patient['patient_id']}/timeline", params={"limit": 1000})
+        finally:
+            stop()
+        assert response.status_code == 200
+        counts[patient["patient_id"]] = len(statements)
+    assert counts[small["patient_id"]] == counts[large["patient_id"]] == 2
+
+    timeline = response.json()
+    assert timeline["patient"] == large
+    kinds = [e["kind"] for e in timeline["entries"]]
+    assert kinds.count("test_result") == 15 and kinds.count("note") == 20
+    assert kinds.count("consent") == 5 and kinds.count("health_summary") == 1
+    occurred = [e["occurred_at"] for e in timeline["entries"]]
+    assert occurred == sorted(occurred, reverse=True)
+    assert all(e["data"]["test_type_name"] for e in timeline["entries"] if e["kind"] == "test_result")
+
+def counted(request):
+    statements, stop = count_queries()
+    try:
+        response = request()
+    finally:
+        stop()
+    return response, len(statements)
+
+def test_writes_take_a_single_statement(hospital_client):
+    test_client, hospital = hospital_client
+    test_type_id = create_test_type(test_client)
+    warmup = register_patient(test_client, hospital)
+    test_client.post(
+        f"/hospitals/patients/{warmup['patient_id']}/test_results/",
+        json={"test_type_id": test_type_id, "result": "warm", "test_date": "2025-01-01"},
+    )
+    patient_data = {
+        "user_id": create_patient_user(),
+        "unique_id": f"2025-{hospital['license_number']}-{uuid4().hex[:6]}",
+        "dob": "1980-01-01",
+        "created_by_hospital_id": hospital["hospital_id"],
+    }
+
+    response, statements = counted(lambda: test_client.post("/hospitals/patients/", json=patient_data))
+    assert response.status_code == 201 and statements == 1
+    patient = response.json()
+    response, statements = counted(lambda: test_client.post("/hospitals/patients/", json=patient_data))
+    assert response.status_code == 400 and statements == 1
+    assert response.json()["detail"] == "Patient with this unique_id already exists"
+
+    response, statements = counted(
+        lambda: test_client.patch(f"/hospitals/patients/{patient['patient_id']}", json={"dob": "1981-02-03"})
+    )
+    assert response.status_code == 200 and statements == 1
+    assert response.json()["dob"] == "1981-02-03" and response.json()["updated_at"] is not None
+    assert test_client.patch(f"/hospitals/patients/{uuid4()}", json={"gender": "x"}).status_code == 404
+
+    response, statements = counted(lambda: test_client.post(
+        f"/hospitals/patients/{patient['patient_id']}/test_results/",
+        json={"test_type_id": test_type_id, "result": "5.4 mmol/L", "test_date": "2025-02-01"},
+    ))
+    assert response.status_code == 201 and statements == 1
+    assert response.json()["test_date"] == "2025-02-01" and response.json()["test_type_name"]
+    summary = test_client.get(f"/hospitals/patients/{patient['patient_id']}/summary").json()
+    assert summary["test_result_count"] == 1
+    response = test_client.post(
+        f"/hospitals/patients/{uuid4()}/test_results/",
+        json={"test_type_id": str(uuid4()), "result": "1", "test_date": "2025-02-01"},
+    )
+    assert response.status_code == 404
+
+def test_patient_timeline_pages_by_time_window(hospital_client):
+    test_client, hospital = hospital_client
+    test_type_id = create_test_type(test_client)
+    patient = register_patient(test_client, hospital)
+    for day in range(1, 8):
+        test_client.post(
+            f"/hospitals/patients/{patient['patient_id']}/test_results/",
+            json={"test_type_id": test_type_id, "result": str(day), "test_date": f"2025-02-{day:02d}"},
+        )
+    url = f"/hospitals/patients/{patient['patient_id']}/timeline"
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "since": "2025-02-02T00:00:00Z", "until": "2025-02-07T00:00:00Z"}
+        response = test_client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [e["data"]["result"] for e in response.json()["entries"]]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["6", "5", "4", "3", "2"]
+    assert test_client.get(f"/hospitals/patients/{uuid4()}/timeline").status_code == 404
+
+def test_patient_timeline_skips_undated_rows(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    add_timeline_records(patient["patient_id"], notes=2)
+
+    undated_id = str(uuid4())
+
+    async def execute(statement):
+        async with TestAsyncSessionLocal() as session:
+            await session.execute(text(statement), {"id": undated_id, "patient_id": patient["patient_id"]})
+            await session.commit()
+    asyncio.run(execute(
+        "INSERT INTO notes (note_id, patient_id, content, created_at) VALUES (:id, :patient_id, 'undated', NULL)"
+    ))
+
+    url = f"/hospitals/patients/{patient['patient_id']}/timeline"
+    seen, cursor = [], None
+    while True:
+        response = test_client.get(url, params={"limit": 1, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [e["data"]["content"] for e in response.json()["entries"] if e["kind"] == "note"]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    # The hospital is shared with the other tests
+    asyncio.run(execute("DELETE FROM notes WHERE note_id = :id AND patient_id = :patient_id"))
+    assert seen == ["note 0", "note 1"]
+
+def test_health_summary_is_maintained_on_write(hospital_client):
+    test_client, hospital = hospital_client
+    glucose, sodium = create_test_type(test_client), create_test_type(test_client)
+    patient = register_patient(test_client, hospital)
+    url = f"/hospitals/patients/{patient['patient_id']}"
+    for test_type_id, result, test_date in [(glucose, "5.1", "2025-01-02"), (glucose, "6.3", "2025-01-09"), (sodium, "140", "2025-01-05")]:
+        response = test_client.post(f"{url}/test_results/", json={"test_type_id": test_type_id, "result": result, "test_date": test_date})
+        assert response.status_code == 201
+    rows = [
+        {"patient_id": patient["patient_id"], "test_type_id": glucose, "result": "4.9", "test_date": "2024-12-30"},
+        {"patient_id": patient["patient_id"], "test_type_id": sodium, "result": "138", "test_date": "2025-01-07"},
+    ]
+    response = test_client.post(
+        "/hospitals/test_results/bulk", content="\n".join(json.dumps(r) for r in rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["accepted"] == 2
+    assert test_client.post(f"{url}/notes", json={"content": "Follow up in a week"}).status_code == 201
+
+    summary = test_client.get(f"{url}/summary").json()
+    assert summary["test_result_count"] == 5 and summary["note_count"] == 1
+    assert summary["last_test_date"] == "2025-01-09"
+    assert {r["test_type_id"]: r["result"] for r in summary["latest_results"]} == {glucose: "6.3", sodium: "138"}
+    # The deltas produce exactly what a full rebuild computes
+    result = asyncio.run(rebuild_summaries(TestAsyncSessionLocal, [UUID(patient["patient_id"])]))
+    assert result == {"patients": 1, "repaired": 0}
+
+def test_health_summary_rebuild_repairs_drift(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    add_timeline_records(patient["patient_id"], notes=3)
+    assert test_client.get(f"/hospitals/patients/{patient['patient_id']}/summary").json()["note_count"] == 0
+    result = asyncio.run(rebuild_summaries(TestAsyncSessionLocal, [UUID(patient["patient_id"])]))
+    assert result == {"patients": 1, "repaired": 1}
+    summary = test_client.get(f"/hospitals/patients/{patient['patient_id']}/summary").json()
+    assert summary["note_count"] == 3 and summary["last_note_at"] is not None
+
+def test_patient_details_revalidate_against_the_row(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': patient['patient_id'], 'type': 'patient'})}"}
+    response = test_client.get("/patients/me/", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert test_client.get("/patients/me/", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    # Written as another worker would: this worker's cached principal is not invalidated
+    async def update_elsewhere():
+        async with TestAsyncSessionLocal() as session:
+            await session.execute(
+                text("UPDATE patients SET gender = 'updated', updated_at = now() WHERE patient_id = :id"),
+                {"id": patient["patient_id"]},
+            )
+            await session.commit()
+    asyncio.run(update_elsewhere())
+    response = test_client.get("/patients/me/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["gender"] == "updated" and response.headers["ETag"] != etag
+
+def test_cross_hospital_reads_require_consent(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    license_number = f"HOSP-{uuid4().hex[:8]}"
+    other = test_client.post("/hospitals/", json={
+        "name": "Other Hospital", "license_number": license_number, "address": {}, "password": "password123",
+    }).json()
+    token = test_client.post("/token", data={
+        "grant_type": "hospital", "username": license_number, "password": "password123",
+    }).json()["access_token"]
+    other_headers = {"Authorization": f"Bearer {token}"}
+    patient_headers = {"Authorization": f"Bearer {create_access_token({'sub': patient['patient_id'], 'type': 'patient'})}"}
+    urls = [f"/hospitals/patients/{patient['patient_id']}{suffix}" for suffix in ("", "/timeline", "/summary")]
+    assert all(test_client.get(url, headers=other_headers).status_code == 404 for url in urls)
+
+    expired = test_client.post("/patients/me/consents", headers=patient_headers, json={
+        "hospital_id": other["hospital_id"], "expires_at": "2020-01-01T00:00:00Z",
+    })
+    assert expired.status_code == 201
+    assert test_client.get(urls[0], headers=other_headers).status_code == 404
+
+    consent = test_client.post("/patients/me/consents", headers=patient_headers, json={"hospital_id": other["hospital_id"]})
+    assert consent.status_code == 201
+    assert all(test_client.get(url, headers=other_headers).status_code == 200 for url in urls)
+    assert test_client.get(urls[0], headers=other_headers).json() == patient
+    # Consent grants reads only
+    response = test_client.post(f"{urls[0]}/notes", headers=other_headers, json={"content": "not allowed"})
+    assert response.status_code == 404
+
+    listed = test_client.get("/patients/me/consents", headers=patient_headers).json()
+    assert {c["consent_id"] for c in listed} == {consent.json()["consent_id"], expired.json()["consent_id"]}
+    response = test_client.delete(f"/patients/me/consents/{consent.json()['consent_id']}", headers=patient_headers)
+    assert response.status_code == 204
+    assert all(test_client.get(url, headers=other_headers).status_code == 404 for url in urls)
+    response = test_client.delete(f"/patients/me/consents/{consent.json()['consent_id']}", headers=patient_headers)
+    assert response.status_code == 404
+
+def test_other_workers_apply_consent_changes_from_the_change_log(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    patient_headers = {"Authorization": f"Bearer {create_access_token({'sub': patient['patient_id'], 'type': 'patient'})}"}
+    hospital_id, patient_id = UUID(hospital["hospital_id"]), UUID(patient["patient_id"])
+    # Stands in for another worker: nothing invalidates it, it only polls
+    worker = ConsentIndex(ttl_seconds=60)
+
+    async def refresh():
+        worker._checked_at = 0.0
+        async with TestAsyncSessionLocal() as session:
+            await worker.refresh_if_stale(session)
+    asyncio.run(refresh())
+    assert worker.reloads == 1 and not worker.allows(hospital_id, patient_id)
+
+    consent = test_client.post("/patients/me/consents", headers=patient_headers, json={"hospital_id": hospital["hospital_id"]})
+    asyncio.run(refresh())
+    assert worker.allows(hospital_id, patient_id)
+    test_client.delete(f"/patients/me/consents/{consent.json()['consent_id']}", headers=patient_headers)
+    asyncio.run(refresh())
+    assert not worker.allows(hospital_id, patient_id)
+    assert worker.reloads == 1 and worker.updates == 2
+
+def create_named_patient_user(first_name, last_name):
+    async def _create():
+        async with TestAsyncSessionLocal() as session:
+            user = User(
+                email=f"{uuid4().hex}@example.com", password_hash="unused", role="patient",
+                first_name=first_name, last_name=last_name,
+            )
+            session.add(user)
+            await session.commit()
+            return str(user.user_id)
+    return asyncio.run(_create())
+
+def test_search_ranks_patients_and_notes(hospital_client):
+    test_client, hospital = hospital_client
+    surname = f"Zq{uuid4().hex[:6]}"
+    named = register_patient(
+        test_client, hospital, user_id=create_named_patient_user("Ada", surname), contact_phone="(555) 013-7788"
+    )
+    noted = register_patient(test_client, hospital)
+    for content in ("Patient reports persistent migraines", "Migraine improved after treatment", "Routine checkup"):
+        test_client.post(f"/hospitals/patients/{noted['patient_id']}/notes", json={"content": content})
+
+    hits = test_client.get("/hospitals/search", params={"q": surname}).json()
+    assert [(h["kind"], h["patient_id"]) for h in hits] == [("patient", named["patient_id"])]
+    assert hits[0]["last_name"] == surname
+
+    assert named["patient_id"] in [h["patient_id"] for h in test_client.get("/hospitals/search", params={"q": "555013"}).json()]
+    hits = test_client.get("/hospitals/search", params={"q": named["unique_id"]}).json()
+    assert hits[0]["patient_id"] == named["patient_id"] and hits[0]["score"] == 1.0
+
+    notes = []
+    cursor = None
+    while True:
+        params = {"q": "migraine", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        response = test_client.get("/hospitals/search", params=params)
+        assert response.status_code == 200
+        notes += [h for h in response.json() if h["patient_id"] == noted["patient_id"]]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(notes) == 2 and all(h["kind"] == "note" and "<b>" in h["snippet"] for h in notes)
+    assert notes[0]["score"] >= notes[1]["score"]
+    assert test_client.get("/hospitals/search", params={"q": "x"}).status_code == 422
+
+def test_search_ranks_only_the_newest_note_candidates(hospital_client, monkeypatch):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    term = f"rash{uuid4().hex[:8]}"
+    ids = []
+    for content in (f"Old {term}", f"New {term}"):
+        response = test_client.post(f"/hospitals/patients/{patient['patient_id']}/notes", json={"content": content})
+        ids.append(response.json()["note_id"])
+    monkeypatch.setattr("app.search.NOTE_CANDIDATES", 1)
+    for _ in range(3):
+        hits = test_client.get("/hospitals/search", params={"q": term}).json()
+        assert [h["hit_id"] for h in hits] == [ids[1]]
+
+def test_patient_reads_are_audited(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    assert test_client.get(f"/hospitals/patients/{patient['patient_id']}").status_code == 200
+    assert test_client.get("/hospitals/patients/", params={"unique_id": patient["unique_id"]}).status_code == 200
+    assert test_client.get("/health/audit").json()["running"]
+
+    email = create_admin_user()
+    response = test_client.post("/token", data={"grant_type": "user", "username": email, "password": "password123"})
+    admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert test_client.get("/audit/events").status_code == 401
+    # Events are written by the background flusher, not by the request
+    for _ in range(50):
+        response = test_client.get("/audit/events", params={"patient_id": patient["patient_id"]}, headers=admin)
+        if len(response.json()) == 2:
+            break
+        time.sleep(0.1)
+    assert response.status_code == 200
+    events = response.json()
+    assert [e["action"] for e in events] == ["patient.list", "patient.read"]
+    assert all(e["actor_type"] == "hospital" and e["actor_id"] == hospital["hospital_id"] for e in events)
+
+    response = test_client.get(
+        "/audit/events", params={"patient_id": patient["patient_id"], "limit": 1}, headers=admin
+    )
+    assert response.json()[0]["action"] == "patient.list"
+    response = test_client.get(
+        "/audit/events",
+        params={"patient_id": patient["patient_id"], "cursor": response.headers["X-Next-Cursor"]},
+        headers=admin,
+    )
+    assert [e["action"] for e in response.json()] == ["patient.read"]
+
+def test_search_and_export_are_audited_per_patient(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    assert test_client.get("/hospitals/search", params={"q": patient["unique_id"]}).status_code == 200
+    exported = [json.loads(line) for line in test_client.get("/hospitals/patients/", params={"stream": "true"}).text.splitlines()]
+    assert patient["patient_id"] in [row["patient_id"] for row in exported]
+
+    email = create_admin_user()
+    response = test_client.post("/token", data={"grant_type": "user", "username": email, "password": "password123"})
+    admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for _ in range(50):
+        events = test_client.get("/audit/events", params={"patient_id": patient["patient_id"]}, headers=admin).json()
+        if len(events) == 2:
+            break
+        time.sleep(0.1)
+    assert [e["action"] for e in events] == ["patient.export", "patient.search"]
+
+def test_test_type_analytics_summarize_numeric_results(hospital_client):
+    test_client, hospital = hospital_client
+    test_type_id = create_test_type(test_client, "Glucose")
+    patient = register_patient(test_client, hospital)
+    other = register_patient(test_client, hospital)
+    results = [
+        (patient, "4.0 mmol/L", "2025-01-01"), (patient, "6.0 mmol/L", "2025-01-01"),
+        (patient, "8.0 mmol/L", "2025-01-03"), (other, "12 mmol/L", "2025-01-20"),
+        (other, "95 mg/dL", "2025-01-02"), (other, "haemolysed", "2025-01-02"),
+    ]
+    for owner, result, test_date in results:
+        response = test_client.post(
+            f"/hospitals/patients/{owner['patient_id']}/test_results/",
+            json={"test_type_id": test_type_id, "result": result, "test_date": test_date},
+        )
+        assert response.status_code == 201
+    assert response.json()["result_value"] is None
+
+    response = test_client.get(
+        f"/hospitals/analytics/test_types/{test_type_id}", params={"low": 4.5, "high": 10, "window_days": 3}
+    )
+    assert response.status_code == 200
+    analytics = response.json()
+    assert analytics["test_type_name"] == "Glucose" and analytics["non_numeric"] == 1
+    mmol, mg = analytics["units"]
+    assert mmol["unit"] == "mmol/L" and mmol["count"] == 4 and mmol["patients"] == 2
+    assert (mmol["min"], mmol["max"], mmol["mean"]) == (4.0, 12.0, 7.5)
+    assert mmol["percentiles"]["p50"] == 7.0
+    assert (mmol["below_range"], mmol["above_range"]) == (1, 1)
+    assert [(d["day"], d["count"], d["mean"], d["rolling_mean"]) for d in mmol["daily"]] == [
+        ("2025-01-01", 2, 5.0, 5.0), ("2025-01-03", 1, 8.0, 6.0), ("2025-01-20", 1, 12.0, 12.0),
+    ]
+    assert mg["unit"] == "mg/dL" and mg["count"] == 1
+
+    response = test_client.get(
+        f"/hospitals/analytics/test_types/{test_type_id}",
+        params={"patient_id": patient["patient_id"], "since": "2025-01-02"},
+    )
+    assert [u["count"] for u in response.json()["units"]] == [1]
+    assert test_client.get(f"/hospitals/analytics/test_types/{uuid4()}").status_code == 404
+
+def test_hospital_stats_read_rollups_maintained_on_write(hospital_client):
+    test_client, hospital = hospital_client
+    test_type_id = create_test_type(test_client)
+    params = {"since": "2025-06-01", "until": "2025-06-08"}
+    before = test_client.get("/hospitals/stats", params=params).json()
+    patient = register_patient(test_client, hospital)
+    rows = [{"user_id": create_patient_user(), "unique_id": f"BULK-{uuid4().hex[:8]}", "dob": "1990-05-01"}]
+    response = test_client.post(
+        "/hospitals/patients/bulk", content=json.dumps(rows[0]), headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.json()["accepted"] == 1
+    response = test_client.post(
+        f"/hospitals/patients/{patient['patient_id']}/test_results/",
+        json={"test_type_id": test_type_id, "result": "5.4 mmol/L", "test_date": "2025-06-02"},
+    )
+    assert response.status_code == 201
+    rows = [
+        {"patient_id": patient["patient_id"], "test_type_id": test_type_id, "result": "6", "test_date": day}
+        for day in ("2025-06-02", "2025-06-03", "2025-07-01")
+    ]
+    response = test_client.post(
+        "/hospitals/test_results/bulk", content="\n".join(json.dumps(r) for r in rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["accepted"] == 3
+
+    stats = test_client.get("/hospitals/stats", params=params).json()
+    assert stats["patient_count"] == before["patient_count"] + 2
+    assert stats["test_result_count"] == before["test_result_count"] + 4
+    assert sum(m["count"] for m in stats["patients_per_month"]) >= 2
+    daily = [(d["day"], d["count"]) for d in stats["test_results_per_day"] if d["test_type_id"] == test_type_id]
+    assert daily == [("2025-06-02", 2), ("2025-06-03", 1)]
+    assert test_client.get("/hospitals/stats", params={"since": "2024-01-01", "until": "2025-06-01"}).status_code == 400
+
+    # Every write above kept the rollups exact; drift is found and repaired by a rebuild
+    hospital_id = UUID(hospital["hospital_id"])
+    assert asyncio.run(rebuild_rollups(TestAsyncSessionLocal, [hospital_id])) == {"hospitals": 1, "repaired": 0}
+    async def drift():
+        async with TestAsyncSessionLocal() as session:
+            params = {"hospital_id": hospital_id}
+            await session.execute(text("UPDATE hospital_totals SET patient_count = 0 WHERE hospital_id = :hospital_id"), params)
+            await session.execute(text("DELETE FROM test_results_daily WHERE hospital_id = :hospital_id"), params)
+            await session.commit()
+    asyncio.run(drift())
+    result = asyncio.run(rebuild_rollups(TestAsyncSessionLocal, [hospital_id]))
+    assert result["repaired"] >= 3
+    assert test_client.get("/hospitals/stats", params=params).json() == stats
+
+def test_patient_list_etag_revalidates(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    params = {"unique_id": patient["unique_id"]}
+    response = test_client.get("/hospitals/patients/", params=params)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    etag = response.headers["ETag"]
+
+    response = test_client.get("/hospitals/patients/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    assert test_client.patch(f"/hospitals/patients/{patient['patient_id']}", json={"gender": "f"}).status_code == 200
+    response = test_client.get("/hospitals/patients/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["gender"] == "f"
+    assert response.headers["ETag"] != etag
+
+def test_list_responses_are_cached_until_written(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    params = {"unique_id": patient["unique_id"]}
+    before = test_client.get("/health/cache").json()["responses"]
+    first = test_client.get("/hospitals/patients/", params=params)
+    second = test_client.get("/hospitals/patients/", params=params)
+    assert second.content == first.content and second.headers["ETag"] == first.headers["ETag"]
+    after = test_client.get("/health/cache").json()["responses"]
+    assert after["backend"] == "memory"
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+    assert test_client.patch(f"/hospitals/patients/{patient['patient_id']}", json={"gender": "m"}).status_code == 200
+    assert test_client.get("/hospitals/patients/", params=params).json()[0]["gender"] == "m"
+
+    listed = {h["hospital_id"] for h in test_client.get("/hospitals/").json()}
+    response = test_client.post("/hospitals/", json={
+        "name": "Cached Hospital",
+        "license_number": f"HOSP-{uuid4().hex[:8]}",
+        "address": {"city": "Test City"},
+        "password": "password123",
+    })
+    assert response.json()["hospital_id"] not in listed
+    assert response.json()["hospital_id"] in {h["hospital_id"] for h in test_client.get("/hospitals/").json()}
+
+def test_pages_read_from_a_lagging_replica_are_not_cached(hospital_client):
+    test_client, hospital = hospital_client
+    patient = register_patient(test_client, hospital)
+    params = {"unique_id": patient["unique_id"]}
+    replica = {}
+
+    # A replica that has not applied anything since its first read: one snapshot held open
+    async def lagging_replica():
+        if "session" not in replica:
+            replica["session"] = TestAsyncSessionLocal()
+            await replica["session"].connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            await replica["session"].execute(text("SELECT 1"))
+        replica["session"].info["replica"] = "lagging"
+        try:
+            yield replica["session"]
+        finally:
+            if replica.get("close"):
+                await replica["session"].close()
+
+    app.dependency_overrides[get_read_db] = lagging_replica
+    try:
+        assert test_client.get("/hospitals/patients/", params=params).json()[0]["gender"] is None
+        assert test_client.patch(f"/hospitals/patients/{patient['patient_id']}", json={"gender": "x"}).status_code == 200
+        before = test_client.get("/health/cache").json()["responses"]
+        replica["close"] = True
+        # The replica still serves the old row after the write bumped the generation...
+        assert test_client.get("/hospitals/patients/", params=params).json()[0]["gender"] is None
+    finally:
+        app.dependency_overrides[get_read_db] = override_get_db
+    # ...but it was not stored, so the next read from the primary sees the write
+    assert test_client.get("/hospitals/patients/", params=params).json()[0]["gender"] == "x"
+    after = test_client.get("/health/cache").json()["responses"]
+    assert after["stores"] - before["stores"] == 1
+
+def sync_all(test_client, token=None, **params):
+    pages = []
+    while True:
+        response = test_client.get("/sync", params={**params, **({"since": token} if token else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        token = pages[-1]["next_token"]
+        if not pages[-1]["has_more"]:
+            return pages, token
+
+def test_sync_returns_changes_since_token(hospital_client):
+    test_client, hospital = hospital_client
+    _, token = sync_all(test_client)
+    patient = register_patient(test_client, hospital)
+    url = f"/hospitals/patients/{patient['patient_id']}"
+    test_type_id = create_test_type(test_client)
+    assert test_client.post(f"{url}/test_results/", json={
+        "test_type_id": test_type_id, "result": "5.1 mmol/L", "test_date": "2025-01-02",
+    }).status_code == 201
+    note = test_client.post(f"{url}/notes", json={"content": "Synced"}).json()
+    assert test_client.patch(url, json={"gender": "f"}).status_code == 200
+
+    paged, _ = sync_all(test_client, token, limit=1)
+    assert len(paged) == 4
+    pages, token = sync_all(test_client, token)
+    assert len(pages) == 1 and pages[0]["next_token"] == paged[-1]["next_token"]
+    # The patient was written twice but is sent once, as it is now
+    assert [(p["patient_id"], p["gender"]) for p in pages[0]["patients"]] == [(patient["patient_id"], "f")]
+    assert [r["result_value"] for r in pages[0]["test_results"]] == [5.1]
+    assert [n["note_id"] for n in pages[0]["notes"]] == [note["note_id"]]
+
+    pages, unchanged = sync_all(test_client, token)
+    assert unchanged == token and not any(pages[0][k] for k in ("patients", "test_results", "notes", "tombstones"))
+
+    async def delete_note():
+        async with TestAsyncSessionLocal() as session:
+            await session.execute(text("DELETE FROM notes WHERE note_id = CAST(:note_id AS uuid)"), note)
+            await session.commit()
+    asyncio.run(delete_note())
+    pages, _ = sync_all(test_client, token)
+    assert pages[0]["notes"] == []
+    assert [(t["entity"], t["entity_id"]) for t in pages[0]["tombstones"]] == [("note", note["note_id"])]
+    assert test_client.get("/sync", params={"since": "bogus"}).status_code == 400
+
+def test_sync_waits_for_transactions_still_in_flight(hospital_client):
+    hospital_id = uuid4()
+    insert = text("INSERT INTO changes (hospital_id, entity, entity_id) VALUES (:hospital_id, 'note', :entity_id)")
+
+    async def run():
+        async with TestAsyncSessionLocal() as slow, TestAsyncSessionLocal() as fast, TestAsyncSessionLocal() as reader:
+            await slow.execute(insert, {"hospital_id": hospital_id, "entity_id": uuid4()})
+            await fast.execute(insert, {"hospital_id": hospital_id, "entity_id": uuid4()})
+            await fast.commit()
+            # The committed change sorts after the open transaction's, so neither is released yet
+            before = (await reader.execute(changes_query(hospital_id))).all()
+            await reader.commit()
+            await slow.commit()
+            after = (await reader.execute(changes_query(hospital_id))).all()
+            return before, after
+
+    before, after = asyncio.run(run())
+    assert before == [] and len(after) == 2
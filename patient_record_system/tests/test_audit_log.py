@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import pytest
+from uuid import uuid4
+from app.audit import AuditLog, AuditLogSaturated
+from app.database import engine
+
+class RecordingAuditLog(AuditLog):
+    def __init__(self, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.batches_written = []
+        self.fail = False
+        self.release = None
+
+    async def _write(self, batch):
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.batches_written.append(list(batch))
+
+def test_events_are_written_in_batches_by_size_and_on_stop():
+    async def run():
+        audit = RecordingAuditLog(batch_size=3, flush_interval_seconds=60)
+        audit.start()
+        actor_id = uuid4()
+        await audit.record("hospital", actor_id, "patient.list", [uuid4() for _ in range(4)])
+        await asyncio.sleep(0.05)
+        # The full batch goes out at once; the remainder waits for the interval
+        assert [len(batch) for batch in audit.batches_written] == [3]
+        await audit.record("patient", actor_id, "test_results.read", [uuid4()], record_count=7)
+        await audit.stop()
+        return audit
+
+    audit = asyncio.run(run())
+    assert [len(batch) for batch in audit.batches_written] == [3, 2]
+    assert audit.batches_written[1][-1]["record_count"] == 7
+    assert audit.stats()["written"] == 5 and audit.stats()["pending"] == 0
+
+def test_failed_writes_are_retried_without_losing_events():
+    async def run():
+        audit = RecordingAuditLog(batch_size=10, flush_interval_seconds=0.01, retry_seconds=0.01)
+        audit.fail = True
+        audit.start()
+        await audit.record("hospital", uuid4(), "patient.read", [uuid4(), uuid4()])
+        await asyncio.sleep(0.05)
+        assert audit.stats()["failures"] >= 1 and audit.stats()["pending"] == 2
+        audit.fail = False
+        await asyncio.sleep(0.05)
+        await audit.stop()
+        return audit
+
+    audit = asyncio.run(run())
+    assert sum(len(batch) for batch in audit.batches_written) == 2
+
+def test_full_buffer_applies_backpressure_then_rejects():
+    async def run():
+        audit = RecordingAuditLog(max_pending=2, batch_size=2, enqueue_timeout_seconds=0.05)
+        audit.release = asyncio.Event()
+        audit.start()
+        await audit.record("hospital", uuid4(), "patient.list", [uuid4(), uuid4()])
+        with pytest.raises(AuditLogSaturated):
+            await audit.record("hospital", uuid4(), "patient.read", [uuid4()])
+        # Room made while a caller waits lets it through
+        audit.enqueue_timeout_seconds = 1.0
+        waiting = asyncio.create_task(audit.record("hospital", uuid4(), "patient.read", [uuid4()]))
+        await asyncio.sleep(0)
+        audit.release.set()
+        await waiting
+        await audit.stop()
+        return audit
+
+    audit = asyncio.run(run())
+    assert audit.stats()["rejected"] == 1
+    assert sum(len(batch) for batch in audit.batches_written) == 3
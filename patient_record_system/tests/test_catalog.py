@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+from uuid import uuid4
+from app import catalog
+
+
+def counting_catalog():
+    test_types = catalog.TestTypeCatalog(ttl_seconds=60, min_reload_interval=1.0)
+    test_types.version = 1
+    test_types._checked_at = time.monotonic()
+
+    async def load(db):
+        # Yield while "querying" so the other misses queue on the lock
+        await asyncio.sleep(0.01)
+        test_types._loaded_at = time.monotonic()
+        test_types.reloads += 1
+
+    test_types._load = load
+    return test_types
+
+
+def test_concurrent_misses_share_one_reload():
+    test_types = counting_catalog()
+
+    async def run():
+        return await asyncio.gather(*(test_types.get(None, uuid4()) for _ in range(20)))
+
+    assert asyncio.run(run()) == [None] * 20
+    assert test_types.reloads == 1
+
+
+def test_misses_reload_again_after_the_interval():
+    test_types = counting_catalog()
+    asyncio.run(test_types.get(None, uuid4()))
+    asyncio.run(test_types.get(None, uuid4()))
+    assert test_types.reloads == 1
+    test_types._loaded_at -= 1.0
+    asyncio.run(test_types.get(None, uuid4()))
+    assert test_types.reloads == 2
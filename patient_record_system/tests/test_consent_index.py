@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import math
+from uuid import uuid4
+from app.consents import ConsentIndex
+
+
+def index_with(intervals):
+    index = ConsentIndex()
+    index._intervals = intervals
+    return index
+
+
+def test_allows_only_inside_interval():
+    hospital_id, patient_id = uuid4(), uuid4()
+    index = index_with({(hospital_id, patient_id): ((100.0, 200.0),)})
+    assert not index.allows(hospital_id, patient_id, at=99.0)
+    assert index.allows(hospital_id, patient_id, at=100.0)
+    assert not index.allows(hospital_id, patient_id, at=200.0)
+    assert not index.allows(uuid4(), patient_id, at=150.0)
+
+
+def test_any_interval_grants_access():
+    hospital_id, patient_id = uuid4(), uuid4()
+    index = index_with({(hospital_id, patient_id): ((0.0, 10.0), (50.0, math.inf))})
+    assert index.allows(hospital_id, patient_id, at=5.0)
+    assert not index.allows(hospital_id, patient_id, at=20.0)
+    assert index.allows(hospital_id, patient_id, at=1e12)
+    assert index.stats()["checks"] == 3 and index.stats()["allowed"] == 2
@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+import json
+import logging
+from app.logs import REDACTED, LogPipeline, SamplingFilter
+
+
+def capture(pipeline):
+    logger = logging.getLogger(f"test_logs.{id(pipeline)}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(pipeline.handler)
+    return logger
+
+
+def test_records_are_written_as_redacted_json():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream)
+    logger = capture(pipeline)
+    pipeline.start()
+    logger.info("Login for %s with password=%s", "HOSP001", "hunter2", extra={"username": "HOSP001", "token": "abc"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    pipeline.stop()
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["message"] == f"Login for HOSP001 with password={REDACTED}"
+    assert first["username"] == "HOSP001" and first["token"] == REDACTED
+    assert first["level"] == "INFO" and first["logger"] == logger.name
+    assert "hunter2" not in stream.getvalue()
+    assert "ValueError: boom" in second["exc_info"]
+
+
+def test_sampling_uses_most_specific_logger_and_keeps_warnings():
+    sampler = SamplingFilter({"sqlalchemy": 0.5, "sqlalchemy.engine": 0.0}, random_source=lambda: 0.25)
+    assert sampler.rate_for("sqlalchemy.engine.Engine") == 0.0
+    assert sampler.rate_for("sqlalchemy.pool") == 0.5
+    assert sampler.rate_for("app.main") == 1.0
+    record = logging.LogRecord("sqlalchemy.engine.Engine", logging.INFO, "", 0, "SELECT 1", None, None)
+    assert not sampler.filter(record)
+    record.levelno = logging.WARNING
+    assert sampler.filter(record)
+    assert sampler.filter(logging.LogRecord("sqlalchemy.pool", logging.DEBUG, "", 0, "checkout", None, None))
+    assert sampler.sampled_out == 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    pipeline = LogPipeline(queue_size=2, stream=io.StringIO())
+    logger = capture(pipeline)
+    for i in range(5):
+        logger.info("record %d", i)
+    assert pipeline.stats()["dropped"] == 3
+    pipeline.start()
+    pipeline.stop()
+    assert pipeline.stats()["queued"] == 0
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+from app.principal_cache import PrincipalCache
+
+def test_hit_and_miss_counters():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    assert cache.get("hospital", "h1") is None
+    cache.set("hospital", "h1", "principal")
+    assert cache.get("hospital", "h1") == "principal"
+    assert cache.get("user", "h1") is None  # keyed by type as well as subject
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_lru_eviction():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    cache.set("patient", "a", 1)
+    cache.set("patient", "b", 2)
+    cache.get("patient", "a")
+    cache.set("patient", "c", 3)
+    assert cache.get("patient", "b") is None
+    assert cache.get("patient", "a") == 1
+    assert cache.get("patient", "c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=0.01)
+    cache.set("user", "u1", "principal")
+    time.sleep(0.02)
+    assert cache.get("user", "u1") is None
+
+def test_invalidate():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    cache.set("patient", "p1", "principal")
+    cache.invalidate("patient", "p1")
+    assert cache.get("patient", "p1") is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_disabled_cache_never_stores():
+    cache = PrincipalCache(max_entries=0, ttl_seconds=60)
+    cache.set("hospital", "h1", "principal")
+    assert cache.get("hospital", "h1") is None
+
+class VersionSession:
+    """Stands in for a session; execute returns the principals catalog version."""
+
+    def __init__(self, version):
+        self.version = version
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        version = self.version
+        return type("Result", (), {"scalar": lambda _: version})()
+
+def test_version_bump_from_another_worker_clears_entries():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60, check_seconds=60)
+    db = VersionSession(3)
+    asyncio.run(cache.refresh_if_stale(db))
+    cache.set("patient", "p1", "principal")
+    db.version = 4
+    # Checked at most once per check_seconds
+    asyncio.run(cache.refresh_if_stale(db))
+    assert cache.get("patient", "p1") == "principal" and db.queries == 1
+    cache._checked_at -= 60
+    asyncio.run(cache.refresh_if_stale(db))
+    assert cache.get("patient", "p1") is None
+    assert cache.stats()["version"] == 4
@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+from starlette.requests import Request
+from app.database import READ_YOUR_WRITES_COOKIE, ReadRouter, ReadYourWritesMiddleware, Replica, create_engine, engine, get_read_db
+import app.database as database
+
+def make_router(strategy="round_robin", count=2, **kwargs):
+    replicas = [Replica(f"replica-{i}", engine) for i in range(count)]
+    return ReadRouter(replicas, strategy=strategy, **kwargs)
+
+def make_request(cookie=None):
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_round_robin_rotates_over_replicas():
+    router = make_router()
+    assert [router.choose().name for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+
+def test_least_busy_prefers_idle_replica():
+    router = make_router(strategy="least_busy")
+    router.replicas[0].in_flight = 3
+    assert router.choose().name == "replica-1"
+
+def test_failed_replica_is_skipped_until_retry():
+    router = make_router(retry_seconds=60)
+    router.mark_failed(router.replicas[0])
+    assert {router.choose().name for _ in range(4)} == {"replica-1"}
+    router.mark_failed(router.replicas[1])
+    assert router.choose() is None
+
+def test_read_your_writes_stickiness_expires():
+    router = make_router(read_your_writes_seconds=0.05)
+    marker = router.write_marker()
+    assert router.is_sticky(marker)
+    assert not router.is_sticky(None) and not router.is_sticky("garbage")
+    # Any router with the same window honours the marker, as another worker would
+    assert make_router(read_your_writes_seconds=0.05).is_sticky(marker)
+    asyncio.run(asyncio.sleep(0.06))
+    assert not router.is_sticky(marker)
+
+def test_far_future_markers_are_ignored():
+    router = make_router(read_your_writes_seconds=5)
+    assert not router.is_sticky(str(time.time() + 3600))
+
+def test_successful_writes_set_the_marker_cookie():
+    router = make_router()
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200 if scope["path"] == "/ok" else 422, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(method, path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        scope = {"type": "http", "method": method, "path": path, "headers": []}
+        await ReadYourWritesMiddleware(endpoint, router)(scope, None, send)
+        return [value.decode() for name, value in messages[0]["headers"] if name == b"set-cookie"]
+
+    cookies = asyncio.run(call("POST", "/ok"))
+    assert len(cookies) == 1 and cookies[0].startswith(f"{READ_YOUR_WRITES_COOKIE}=")
+    assert asyncio.run(call("POST", "/invalid")) == []
+    assert asyncio.run(call("GET", "/ok")) == []
+
+def test_get_read_db_reads_the_primary_after_a_write(monkeypatch):
+    router = make_router()
+    monkeypatch.setattr(database, "read_router", router)
+
+    async def open_session(cookie=None):
+        dependency = get_read_db(make_request(cookie))
+        session = await dependency.__anext__()
+        replica = session.info.get("replica")
+        await dependency.aclose()
+        await engine.dispose()
+        return replica
+
+    assert asyncio.run(open_session()) is not None
+    assert asyncio.run(open_session(f"{READ_YOUR_WRITES_COOKIE}={router.write_marker()}")) is None
+    assert router.sticky_reads == 1
+
+def test_get_read_db_falls_back_to_primary_when_replica_is_down(monkeypatch):
+    unreachable = Replica("down", create_engine("postgresql+asyncpg://nobody@127.0.0.1:1/none"))
+    router = ReadRouter([unreachable], retry_seconds=60)
+    monkeypatch.setattr(database, "read_router", router)
+
+    async def open_session():
+        dependency = get_read_db(make_request())
+        session = await dependency.__anext__()
+        bind = session.bind
+        await dependency.aclose()
+        await unreachable.engine.dispose()
+        await engine.dispose()
+        return bind
+
+    assert asyncio.run(open_session()) is engine
+    assert not unreachable.healthy
+    assert router.primary_reads == 1
@@ -0,0 +1,139 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+from app.response_cache import BUMP_BATCH_SIZE, MemoryBackend, RedisBackend, ResponseCache
+
+class FakeRedis:
+    """Local stand-in for a Redis server shared by several workers."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiries = {}
+        self.fail = False
+        self.round_trips = 0
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        return self.values.get(key)
+
+    async def getex(self, key, px=None):
+        value = await self.get(key)
+        if value is not None:
+            self.expiries[key] = px
+        return value
+
+    async def set(self, key, value, px=None):
+        self.values[key] = value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def incr(self, key):
+        self.commands.append(("incr", key, None))
+
+    def pexpire(self, key, ms):
+        self.commands.append(("pexpire", key, ms))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command, key, ms in self.commands:
+            if command == "incr":
+                self.redis.values[key] = str(int(self.redis.values.get(key, 0)) + 1).encode()
+            else:
+                self.redis.expiries[key] = ms
+
+def test_memory_backend_is_bounded_by_bytes():
+    async def run():
+        cache = ResponseCache(MemoryBackend(max_bytes=1000), max_entry_bytes=600)
+        keys = []
+        for page in range(4):
+            keys.append(await cache.key("hospital_patients", "h1", "h1", [("cursor", str(page))]))
+            await cache.set(keys[-1], b"x" * 300, {"ETag": f'"{page}"'})
+        await cache.set(await cache.key("hospital_patients", "h1", "h1", [("limit", "500")]), b"x" * 700)
+        return cache, keys
+
+    cache, keys = asyncio.run(run())
+    stats = cache.stats()
+    # Each entry is its body plus a small envelope, so only the newest two of 300 bytes fit
+    assert stats["entries"] == 2 and stats["bytes"] <= 1000
+    assert stats["evictions"] == 2 and stats["too_large"] == 1
+    assert asyncio.run(cache.get(keys[0])) is None
+    hit = asyncio.run(cache.get(keys[3]))
+    assert hit.body == b"x" * 300 and hit.headers == {"ETag": '"3"'}
+
+def test_keys_separate_principals_and_queries():
+    async def run():
+        cache = ResponseCache(MemoryBackend())
+        return {
+            await cache.key("hospital_patients", "h1", "h1", [("limit", "2"), ("unique_id", "a")]),
+            await cache.key("hospital_patients", "h1", "h1", [("unique_id", "a"), ("limit", "2")]),
+            await cache.key("hospital_patients", "h1", "h2", [("limit", "2"), ("unique_id", "a")]),
+            await cache.key("hospital_patients", "h1", "h1", [("limit", "3"), ("unique_id", "a")]),
+        }
+
+    # Parameter order does not matter
+    assert len(asyncio.run(run())) == 3
+
+def test_shared_backend_invalidation_reaches_every_worker():
+    redis = FakeRedis()
+    workers = [ResponseCache(RedisBackend(redis)), ResponseCache(RedisBackend(redis))]
+
+    async def run():
+        key = await workers[0].key("hospitals", "all")
+        await workers[0].set(key, b"[]", meta={"count": 0})
+        assert (await workers[1].get(await workers[1].key("hospitals", "all"))).meta == {"count": 0}
+        await workers[1].invalidate("hospitals", "all")
+        assert await workers[0].get(await workers[0].key("hospitals", "all")) is None
+        # Another scope is untouched
+        await workers[0].set(await workers[0].key("hospitals", "other"), b"[]")
+        assert await workers[1].get(await workers[1].key("hospitals", "other")) is not None
+
+    asyncio.run(run())
+    assert workers[0].stats()["misses"] == 1 and workers[1].stats()["invalidations"] == 1
+
+def test_backend_failures_are_misses():
+    redis = FakeRedis()
+    cache = ResponseCache(RedisBackend(redis))
+
+    async def run():
+        key = await cache.key("hospitals", "all")
+        await cache.set(key, b"[]")
+        redis.fail = True
+        return key, await cache.get(key), await cache.key("hospitals", "all")
+
+    key, hit, unavailable = asyncio.run(run())
+    assert key is not None and hit is None and unavailable is None
+    assert cache.stats()["errors"] == 2
+
+def test_bulk_invalidation_is_batched_and_generations_expire():
+    redis = FakeRedis()
+    cache = ResponseCache(RedisBackend(redis), ttl_seconds=30)
+    scopes = [f"p{i}" for i in range(BUMP_BATCH_SIZE + 1)]
+    asyncio.run(cache.invalidate("patient_test_results", *scopes))
+    assert redis.round_trips == 2 and cache.stats()["invalidations"] == len(scopes)
+    assert set(redis.expiries.values()) == {int(cache.generation_ttl_seconds * 1000)}
+
+    memory = MemoryBackend()
+    cache = ResponseCache(memory, ttl_seconds=30)
+    asyncio.run(cache.invalidate("patient_test_results", *scopes))
+    assert cache.stats()["generations"] == len(scopes)
+    # Idle counters are dropped at the next bump once they expire
+    for key, (generation, _) in list(memory._generations.items()):
+        memory._generations[key] = (generation, time.monotonic() - 1)
+    asyncio.run(cache.invalidate("patient_test_results", "p0"))
+    assert cache.stats()["generations"] == 1
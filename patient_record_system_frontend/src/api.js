@@ -2,6 +2,8 @@ import axios from 'axios';
 
 const api = axios.create({
   baseURL: 'http://localhost:8000',
+  // Sends the read-your-writes cookie so reads right after a write go to the primary
+  withCredentials: true,
 });
 
 api.interceptors.request.use((config) => {
@@ -25,6 +27,20 @@ export const login = async (username, password, loginType) => {
   return response.data;
 };
 
+// List endpoints return at most `limit` rows per page and send X-Next-Cursor while more remain
+const PAGE_SIZE = 1000;
+
+const getAllPages = async (url) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const params = cursor ? { limit: PAGE_SIZE, cursor } : { limit: PAGE_SIZE };
+    const response = await api.get(url, { params });
+    rows.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return rows;
+};
 
 export const getHospitals = async () => {
   try {
@@ -58,8 +74,7 @@ export const getUsers = async () => {
 
 export const getHospitalPatients = async () => {
   try {
-    const response = await api.get('/hospitals/patients/');
-    return response.data;
+    return await getAllPages('/hospitals/patients/');
   } catch (error) {
     console.error('Error fetching hospital patients:', error);
     throw error;
@@ -98,8 +113,7 @@ export const getPatientDetails = async () => {
 
 export const getPatientTestResults = async () => {
   try {
-    const response = await api.get('/patients/test_results/');
-    return response.data;
+    return await getAllPages('/patients/test_results/');
   } catch (error) {
     console.error('Error fetching test results:', error);
     throw error;